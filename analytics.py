@@ -0,0 +1,237 @@
+import re
+import sqlite3
+import threading
+import time
+from collections import Counter
+from enum import Enum
+
+import numpy as np
+
+from history_store import HISTORY_DB
+
+
+class Sentiment(str, Enum):
+    POSITIVE = "Positive"
+    NEGATIVE = "Negative"
+    NEUTRAL = "Neutral"
+
+
+class Tone(str, Enum):
+    FRIENDLY = "Friendly"
+    UPSET = "Upset"
+    ANGRY = "Angry"
+    POLITE = "Polite"
+    NEUTRAL = "Neutral"
+
+
+SENTIMENTS = list(Sentiment)
+TONES = list(Tone)
+_SENTIMENT_INDEX = {s: i for i, s in enumerate(SENTIMENTS)}
+_TONE_INDEX = {t: i for i, t in enumerate(TONES)}
+_WORD = re.compile(r"[a-z]+")
+
+
+def normalize_sentiment(value) -> Sentiment:
+    """Map free-form LLM/CRM output ("positive.", "Sentiment: Negative") onto the enum."""
+    words = _WORD.findall(str(value or "").lower())
+    for word in words:
+        for sentiment in SENTIMENTS:
+            if word == sentiment.value.lower():
+                return sentiment
+    return Sentiment.NEUTRAL
+
+
+def normalize_tone(value) -> Tone:
+    words = _WORD.findall(str(value or "").lower())
+    for word in words:
+        for tone in TONES:
+            if word == tone.value.lower():
+                return tone
+    return Tone.NEUTRAL
+
+
+# ---------------- ROLLING COUNTERS ---------------- #
+# Granularities as (bucket_seconds, num_buckets): minutes for the last hour,
+# hours for the last day, days for the last 30 days
+GRANULARITIES = [(60, 60), (3600, 24), (86400, 30)]
+# bucket_seconds of the row holding all-time totals
+ALL_TIME = 0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS analytics_counts (
+    bucket_seconds INTEGER NOT NULL,
+    bucket INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    label TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (bucket_seconds, bucket, kind, label)
+) WITHOUT ROWID;
+"""
+
+UPSERT = (
+    "INSERT INTO analytics_counts VALUES (?, ?, ?, ?, ?) "
+    "ON CONFLICT (bucket_seconds, bucket, kind, label) DO UPDATE SET count = count + excluded.count"
+)
+
+
+WINDOW_UNITS = {"m": 60, "h": 3600, "d": 86400}
+# Longest window the bucketed counters can answer
+ANALYTICS_RETENTION_SECONDS = 30 * 86400
+
+
+def parse_window(window: str) -> int:
+    """'15m', '1h', '24h', '7d' -> seconds."""
+    match = re.fullmatch(r"\s*(\d+)\s*([mhd])\s*", str(window).lower())
+    if not match:
+        raise ValueError(f"Invalid window: {window!r} (use e.g. 15m, 1h, 24h, 7d)")
+    return int(match.group(1)) * WINDOW_UNITS[match.group(2)]
+
+
+class Analytics:
+    """Sentiment/tone counts kept in time buckets in SQLite, shared by every worker.
+
+    Each analysis adds one to its minute, hour and day bucket and to the
+    all-time totals. A window query picks the finest granularity that covers
+    it and sums at most 60 buckets, read from the shared database so every
+    worker reports the same numbers. Buckets older than their granularity
+    covers are deleted as time moves on.
+    """
+
+    def __init__(self, path: str = HISTORY_DB):
+        self.path = path
+        self.crm = None
+        self._conn = None
+        self._lock = threading.Lock()
+        # Newest bucket this worker has pruned behind, per granularity
+        self._pruned = {}
+
+    def _connect(self):
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    @staticmethod
+    def _rows(counts: Counter):
+        return [(*key, count) for key, count in counts.items()]
+
+    @staticmethod
+    def _add(counts: Counter, sentiment, tone, ts: float, now: float):
+        labels = [("sentiment", normalize_sentiment(sentiment).value), ("tone", normalize_tone(tone).value)]
+        for kind, label in labels:
+            counts[ALL_TIME, 0, kind, label] += 1
+            for bucket_seconds, num_buckets in GRANULARITIES:
+                bucket = int(ts // bucket_seconds)
+                # Older than anything this granularity still covers
+                if bucket > int(now // bucket_seconds) - num_buckets:
+                    counts[bucket_seconds, bucket, kind, label] += 1
+
+    def _prune(self, conn, now: float):
+        for bucket_seconds, num_buckets in GRANULARITIES:
+            oldest = int(now // bucket_seconds) - num_buckets
+            if self._pruned.get(bucket_seconds) != oldest:
+                conn.execute("DELETE FROM analytics_counts WHERE bucket_seconds = ? AND bucket <= ?",
+                             (bucket_seconds, oldest))
+                self._pruned[bucket_seconds] = oldest
+
+    def record(self, sentiment, tone, ts: float = None):
+        now = time.time()
+        counts = Counter()
+        self._add(counts, sentiment, tone, now if ts is None else ts, now)
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.executemany(UPSERT, self._rows(counts))
+                self._prune(conn, now)
+
+    def is_empty(self) -> bool:
+        with self._lock:
+            return self._connect().execute("SELECT 1 FROM analytics_counts LIMIT 1").fetchone() is None
+
+    def seed(self, label_counts, events) -> bool:
+        """Backfill empty counters from history; returns False if they already hold data.
+
+        ``label_counts`` are ``(sentiment, tone, count)`` for entries older
+        than the bucketed range, added to the totals only; ``events`` are
+        ``(ts, sentiment, tone)`` tuples for the range itself. The emptiness
+        check and the backfill share one write transaction, so only one
+        worker seeds.
+        """
+        now = time.time()
+        counts = Counter()
+        for sentiment, tone, count in label_counts:
+            counts[ALL_TIME, 0, "sentiment", normalize_sentiment(sentiment).value] += count
+            counts[ALL_TIME, 0, "tone", normalize_tone(tone).value] += count
+        for ts, sentiment, tone in events:
+            self._add(counts, sentiment, tone, ts, now)
+        with self._lock:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                if conn.execute("SELECT 1 FROM analytics_counts LIMIT 1").fetchone() is not None:
+                    conn.rollback()
+                    return False
+                conn.executemany(UPSERT, self._rows(counts))
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+        return True
+
+    def _query(self, sql: str, params) -> np.ndarray:
+        counts = np.zeros(len(SENTIMENTS) + len(TONES), dtype=np.int64)
+        with self._lock:
+            rows = self._connect().execute(sql, params).fetchall()
+        for kind, label, count in rows:
+            if kind == "sentiment":
+                counts[_SENTIMENT_INDEX[Sentiment(label)]] += count
+            else:
+                counts[len(SENTIMENTS) + _TONE_INDEX[Tone(label)]] += count
+        return counts
+
+    def _report(self, counts) -> dict:
+        distribution = {s.value: int(c) for s, c in zip(SENTIMENTS, counts[:len(SENTIMENTS)])}
+        tones = {t.value: int(c) for t, c in zip(TONES, counts[len(SENTIMENTS):])}
+        return {"total": sum(distribution.values()), "distribution": distribution, "tones": tones}
+
+    def window(self, window: str = None, now: float = None) -> dict:
+        """Aggregates for the last ``window`` (e.g. "1h"), or all time when None."""
+        if not window or window == "all":
+            counts = self._query("SELECT kind, label, count FROM analytics_counts WHERE bucket_seconds = ?",
+                                 (ALL_TIME,))
+            return {"window": "all", **self._report(counts)}
+        seconds = parse_window(window)
+        now = time.time() if now is None else now
+        for bucket_seconds, num_buckets in GRANULARITIES:
+            if seconds <= bucket_seconds * num_buckets:
+                current = int(now // bucket_seconds)
+                buckets = -(-seconds // bucket_seconds)
+                counts = self._query(
+                    "SELECT kind, label, SUM(count) FROM analytics_counts "
+                    "WHERE bucket_seconds = ? AND bucket > ? AND bucket <= ? GROUP BY kind, label",
+                    (bucket_seconds, current - buckets, current),
+                )
+                return {"window": window, **self._report(counts)}
+        raise ValueError(f"Window {window!r} is longer than the 30 days kept")
+
+    def load_crm(self, df):
+        """Baseline distribution over the CRM's historical Sentiment column (vectorized)."""
+        labels = df["Sentiment"].astype(str).str.strip().str.lower()
+        counts = np.zeros(len(SENTIMENTS) + len(TONES), dtype=np.int64)
+        for sentiment in SENTIMENTS:
+            counts[_SENTIMENT_INDEX[sentiment]] = int((labels == sentiment.value.lower()).sum())
+        # Anything unrecognised counts as Neutral, like normalize_sentiment()
+        counts[_SENTIMENT_INDEX[Sentiment.NEUTRAL]] += len(labels) - int(counts[:len(SENTIMENTS)].sum())
+        report = self._report(counts)
+        del report["tones"]  # the CRM has no tone column
+        self.crm = report
+        return report
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
@@ -0,0 +1,186 @@
+"""Batch sentiment backfill for CRM exports.
+
+    python backfill.py --crm crm_data.xlsx --out crm_sentiment.parquet --workers 8 --rps 5
+
+Reads the CRM in chunks, classifies each distinct ``Call Feedback`` text
+once through a pool of async workers and
+writes every row with LLM Sentiment / Tone / Explanation columns to Parquet
+or CSV. Rate limiting and retries are the gateway's (llm.py); ``--rps`` and
+``--retries`` set them for this run through ``llm.configure``. Classified texts are appended to a
+checkpoint file as they finish, so re-running after an interruption only
+pays for what is left.
+"""
+import argparse
+import asyncio
+import json
+import os
+
+import pandas as pd
+
+import llm
+from cache import make_key, normalize_text
+from crm_store import CRMWriter
+from sentiment import SENTIMENT_MODEL, SENTIMENT_PROMPT, parse_result
+
+TEXT_COLUMN = "Call Feedback"
+OUTPUT_COLUMNS = ["LLM Sentiment", "LLM Tone", "LLM Explanation"]
+
+
+# ---------------- INPUT ---------------- #
+def iter_crm_chunks(path: str, chunk_size: int):
+    """Yield the CRM as DataFrames of at most ``chunk_size`` rows without loading it whole."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".parquet":
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    elif ext == ".csv":
+        yield from pd.read_csv(path, chunksize=chunk_size)
+    elif ext in (".xlsx", ".xlsm"):
+        from openpyxl import load_workbook
+
+        wb = load_workbook(path, read_only=True)
+        try:
+            rows = wb.active.iter_rows(values_only=True)
+            header = list(next(rows))
+            batch = []
+            for row in rows:
+                batch.append(row)
+                if len(batch) >= chunk_size:
+                    yield pd.DataFrame(batch, columns=header)
+                    batch = []
+            if batch:
+                yield pd.DataFrame(batch, columns=header)
+        finally:
+            wb.close()
+    else:
+        raise ValueError(f"Unsupported CRM format: {ext}")
+
+
+# ---------------- CHECKPOINT ---------------- #
+def load_checkpoint(path: str) -> dict:
+    """text key -> (sentiment, tone, explanation) for everything already classified."""
+    results = {}
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # torn last line from an interrupted run
+                results[record["key"]] = (record["sentiment"], record["tone"], record["explanation"])
+    return results
+
+
+def _ends_torn(path: str) -> bool:
+    """True if the checkpoint's last line was cut off before its newline."""
+    if not os.path.exists(path) or not os.path.getsize(path):
+        return False
+    with open(path, "rb") as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) != b"\n"
+
+
+# ---------------- CLASSIFICATION ---------------- #
+async def classify(text: str):
+    result = await llm.chat_text(
+        model=SENTIMENT_MODEL,
+        messages=[{"role": "user", "content": SENTIMENT_PROMPT.format(text)}],
+        temperature=0
+    )
+    return parse_result(result)
+
+
+async def classify_all(texts: dict, results: dict, checkpoint, workers: int):
+    """Classify every ``key -> text`` not yet in ``results``, checkpointing each one."""
+    queue = asyncio.Queue()
+    for key, text in texts.items():
+        if key not in results:
+            queue.put_nowait((key, text))
+    failures = 0
+
+    async def worker():
+        nonlocal failures
+        while True:
+            try:
+                key, text = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            try:
+                sentiment, tone, explanation = await classify(text)
+            except Exception as e:
+                failures += 1
+                print(f"failed to classify {text[:60]!r}: {e}")
+                continue
+            results[key] = (sentiment, tone, explanation)
+            checkpoint.write(json.dumps({"key": key, "text": text, "sentiment": sentiment,
+                                         "tone": tone, "explanation": explanation}) + "\n")
+            checkpoint.flush()
+
+    await asyncio.gather(*(worker() for _ in range(workers)))
+    return failures
+
+
+# ---------------- OUTPUT ---------------- #
+def output_types(crm_path: str) -> dict:
+    """Column types for the output: the input's own for Parquet, and strings for the LLM columns."""
+    types = {}
+    if os.path.splitext(crm_path)[1].lower() == ".parquet":
+        import pyarrow.parquet as pq
+
+        types.update({field.name: field.type for field in pq.read_schema(crm_path)})
+    types.update({column: "string" for column in OUTPUT_COLUMNS})
+    return types
+
+
+async def run(args):
+    results = load_checkpoint(args.checkpoint)
+    print(f"{len(results)} texts already classified in {args.checkpoint}")
+    llm.configure(rate_limit=args.rps, retries=args.retries)
+    writer = CRMWriter(args.out, output_types(args.crm))
+    rows = failures = 0
+
+    torn = _ends_torn(args.checkpoint)
+    with open(args.checkpoint, "a", encoding="utf-8") as checkpoint:
+        if torn:
+            # Otherwise the first new record would be glued onto the torn line and lost too
+            checkpoint.write("\n")
+        for chunk in iter_crm_chunks(args.crm, args.chunk_size):
+            texts = chunk[TEXT_COLUMN].fillna("").astype(str)
+            keys = texts.map(lambda t: make_key(normalize_text(t), SENTIMENT_MODEL, SENTIMENT_PROMPT))
+
+            # One LLM call per distinct feedback text, not per row
+            distinct = {k: t for k, t in zip(keys, texts) if t.strip()}
+            failures += await classify_all(distinct, results, checkpoint, args.workers)
+
+            labelled = keys.map(lambda k: results.get(k, ("", "", "")))
+            for i, column in enumerate(OUTPUT_COLUMNS):
+                chunk[column] = labelled.map(lambda r: r[i])
+            writer.write(chunk)
+            rows += len(chunk)
+            print(f"{rows} rows written, {len(results)} distinct texts classified")
+
+    writer.close()
+    if failures:
+        print(f"{failures} texts failed; re-run to retry them")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill LLM sentiment for a CRM export.")
+    parser.add_argument("--crm", default="crm_data.xlsx", help="CRM file (.xlsx, .csv or .parquet)")
+    parser.add_argument("--out", default="crm_sentiment.parquet", help="output file (.parquet or .csv)")
+    parser.add_argument("--checkpoint", default="backfill_checkpoint.jsonl")
+    parser.add_argument("--chunk-size", type=int, default=10000)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--rps", type=float, default=5.0, help="max LLM requests per second")
+    parser.add_argument("--retries", type=int, default=None,
+                        help="retries per LLM call (default: LLM_RETRIES)")
+    args = parser.parse_args()
+    failures = asyncio.run(run(args))
+    raise SystemExit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,311 @@
+"""Load benchmark for the API against local fakes of Groq and Google Sheets.
+
+    python benchmark.py --requests 200 --concurrency 16 --llm-latency 0.4 --sheets-latency 0.5
+    python benchmark.py --crm-sizes 500,10000,100000,1000000 --skip-http
+
+Starts ``fake_services`` Groq on a local port, points the real SDK at it
+with GROQ_BASE_URL, swaps the log sinks for ``FakeSheet`` and serves
+``main.app`` with uvicorn. Every endpoint is then driven by a fixed number
+of concurrent clients and reported as throughput and p50/p95/p99 latency.
+Inputs are made unique per request so caches don't hide the LLM cost;
+pass ``--cached`` to measure warm-cache behaviour instead.
+
+The CRM scaling pass indexes synthetic CRMs of growing size (resampled
+from crm_data.xlsx with unique emails and phones) and times index builds,
+indexed lookups and, for the smaller sizes, the old full-DataFrame scan.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from fake_services import FakeSettings, FakeSheet, ServerThread, make_groq_app
+
+ENDPOINTS = ("get_customer", "analyze_text", "analyze_audio", "generate_summary")
+RATE = 16000
+
+
+# ---------------- SYNTHETIC INPUTS ---------------- #
+def synthetic_speech(seconds: float, seed: int, background: np.ndarray = None) -> np.ndarray:
+    """A synthetic speech-like tone with pauses, over the noise floor of temp_audio.npy.
+
+    This is not speech. temp_audio.npy is 8 s of near-silence (peak
+    ~0.006, no frame the VAD calls voiced), so it only supplies the
+    background; the "voice" is harmonics of a wandering 110-220 Hz pitch,
+    amplitude-modulated at a syllable rate and loud enough for the VAD to
+    keep. That exercises VAD trimming and upload sizes, not transcription
+    quality. ``seed`` makes every clip (and so every cache key) different.
+    """
+    rng = np.random.default_rng(seed)
+    n = int(seconds * RATE)
+    t = np.arange(n) / RATE
+    f0 = rng.uniform(110, 220) * (1 + 0.05 * np.sin(2 * np.pi * 0.5 * t))
+    phase = 2 * np.pi * np.cumsum(f0) / RATE
+    voice = sum(np.sin(k * phase) / k for k in range(1, 6))
+    syllables = 0.5 * (1 + np.sin(2 * np.pi * rng.uniform(3, 5) * t))
+    # ~1.5 s of speech, then ~0.6 s of pause
+    talking = (t % 2.1) < 1.5
+    signal = 0.2 * voice * syllables * talking
+
+    if background is None or background.size == 0:
+        background = rng.normal(0, 0.002, n)
+    floor = np.resize(background, n)
+    return (signal + floor + rng.normal(0, 0.001, n)).astype(np.float32)
+
+
+def load_background(path: str = "temp_audio.npy") -> np.ndarray:
+    try:
+        return np.load(path).astype(np.float32).ravel()
+    except OSError:
+        return None
+
+
+def synthetic_crm(base: pd.DataFrame, rows: int, seed: int = 0) -> pd.DataFrame:
+    """Resample ``base`` to ``rows`` customers with unique emails and phones."""
+    df = base.sample(n=rows, replace=True, random_state=seed).reset_index(drop=True)
+    ids = pd.Series(np.arange(rows)).astype(str)
+    df["Email"] = "customer" + ids + "@example.com"
+    df["Phone"] = 910000000000 + np.arange(rows, dtype=np.int64)
+    return df
+
+
+# ---------------- LOAD DRIVER ---------------- #
+def percentile_report(latencies: list, errors: int, elapsed: float) -> dict:
+    ms = np.asarray(latencies) * 1000
+    done = len(latencies)
+    return {
+        "requests": done,
+        "errors": errors,
+        "throughput_rps": round(done / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(float(np.percentile(ms, 50)), 1) if done else None,
+        "p95_ms": round(float(np.percentile(ms, 95)), 1) if done else None,
+        "p99_ms": round(float(np.percentile(ms, 99)), 1) if done else None,
+        "max_ms": round(float(ms.max()), 1) if done else None,
+    }
+
+
+def is_error(response) -> bool:
+    if response.status_code >= 400:
+        return True
+    body = response.json()
+    # Handlers signal failures as {"error": ...} or ({"error": ...}, status) pairs
+    if isinstance(body, list):
+        return True
+    return isinstance(body, dict) and ("error" in body or str(body.get("summary", "")).startswith("Error"))
+
+
+async def run_endpoint(client, make_request, total: int, concurrency: int) -> dict:
+    """Send ``total`` requests from ``concurrency`` closed-loop clients."""
+    import httpx
+
+    latencies, errors = [], 0
+    counter = iter(range(total))
+
+    async def user():
+        nonlocal errors
+        for i in counter:
+            method, path, kwargs = make_request(i)
+            started = time.perf_counter()
+            try:
+                response = await client.request(method, path, **kwargs)
+                failed = is_error(response)
+            except httpx.HTTPError:
+                failed = True
+            latencies.append(time.perf_counter() - started)
+            errors += failed
+
+    started = time.perf_counter()
+    await asyncio.gather(*(user() for _ in range(concurrency)))
+    return percentile_report(latencies, errors, time.perf_counter() - started)
+
+
+def request_factories(crm: pd.DataFrame, args) -> dict:
+    """Per-endpoint ``i -> (method, path, kwargs)`` builders."""
+    import vad
+
+    customers = crm.dropna(subset=["Email"]).to_dict("records")
+    feedback = [str(c.get("Call Feedback", "")) for c in customers]
+    background = load_background()
+    audio_cache = {}
+
+    def customer(i):
+        return customers[i % len(customers)]
+
+    def unique(text, i):
+        return text if args.cached else f"{text} (ref {args.seed}-{i})"
+
+    def audio(i):
+        seed = args.seed if args.cached else args.seed * 1_000_003 + i
+        if seed not in audio_cache:
+            samples = synthetic_speech(args.audio_seconds, seed, background)
+            audio_cache[seed] = vad.to_wav_bytes(samples, RATE)
+        return audio_cache[seed] if args.cached else audio_cache.pop(seed)
+
+    def transcript(i):
+        rng = random.Random(args.seed + i)
+        lines = [f"Agent: How can I help today?\nCustomer: {rng.choice(feedback)}"
+                 for _ in range(max(1, args.transcript_chars // 60))]
+        return unique("\n".join(lines)[:args.transcript_chars], i)
+
+    return {
+        "get_customer": lambda i: ("POST", "/get_customer", {"json": {"email": customer(i)["Email"]}}),
+        "analyze_text": lambda i: ("POST", "/analyze-text", {"json": {
+            "email": customer(i)["Email"], "text": unique(feedback[i % len(feedback)], i)}}),
+        "analyze_audio": lambda i: ("POST", "/analyze-audio", {"files": {
+            "file": (f"bench-{i}.wav", audio(i), "audio/wav")}}),
+        "generate_summary": lambda i: ("POST", "/generate-summary", {"json": {
+            "transcript": transcript(i), "customer": customer(i)["Name"], "sentiment": "Neutral"}}),
+    }
+
+
+def start_app(args):
+    """Start the fake Groq server, configure the environment and serve main.app."""
+    settings = FakeSettings(latency=args.llm_latency, jitter=args.llm_jitter,
+                            transcribe_latency=args.transcribe_latency, error_rate=args.llm_error_rate)
+    groq = ServerThread(make_groq_app(settings)).start()
+
+    workdir = tempfile.mkdtemp(prefix="bench-")
+    os.environ.update({
+        "GROQ_API_KEY": "benchmark",
+        "GROQ_BASE_URL": groq.url,
+        "LOG_BACKEND": "none",
+        "HISTORY_DB": os.path.join(workdir, "history.db"),
+        "SHEET_LOG_SPILL_DIR": workdir,
+    })
+    import main
+
+    # Sheets writes happen on the logger threads; give them realistic latency
+    main.transcript_log.worksheet = FakeSheet(args.sheets_latency)
+    main.ai_response_log.worksheet = FakeSheet(args.sheets_latency)
+    server = ServerThread(main.app).start()
+    return main, groq, server, settings
+
+
+async def benchmark_http(args) -> dict:
+    import httpx
+
+    main, groq, server, settings = start_app(args)
+    results = {}
+    try:
+        factories = request_factories(main.crm.df, args)
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=server.url, timeout=120, limits=limits) as client:
+            for name in args.endpoints:
+                # Warm up connections and lazy imports outside the measured run
+                await run_endpoint(client, lambda i: factories[name](-1 - i), args.concurrency, args.concurrency)
+                results[name] = await run_endpoint(client, factories[name], args.requests, args.concurrency)
+                print_row(name, results[name])
+        results["fake_groq_calls"] = dict(settings.calls)
+        results["sheet_rows"] = {log.name: log.stats["written"] for log in (main.transcript_log, main.ai_response_log)}
+    finally:
+        server.stop()
+        groq.stop()
+    return results
+
+
+# ---------------- CRM SCALING ---------------- #
+def benchmark_crm(args) -> list:
+    from crm_store import CRMStore, normalize_email, read_crm
+
+    base = read_crm(args.crm)
+    rng = np.random.default_rng(args.seed)
+    rows = []
+    for size in args.crm_sizes:
+        df = synthetic_crm(base, size, args.seed)
+        store = CRMStore(None)
+        started = time.perf_counter()
+        store.load_frame(df)
+        build_s = time.perf_counter() - started
+
+        # Two thirds hits, one third misses
+        picks = rng.integers(0, size, args.lookups)
+        emails = [f"customer{p}@example.com" if k % 3 else f"missing{p}@example.com"
+                  for k, p in enumerate(picks)]
+        lookups = []
+        for email in emails:
+            started = time.perf_counter()
+            store.find(email=normalize_email(email))
+            lookups.append(time.perf_counter() - started)
+
+        row = {
+            "rows": size,
+            "index_build_s": round(build_s, 3),
+            "lookup_p50_us": round(float(np.percentile(lookups, 50)) * 1e6, 2),
+            "lookup_p99_us": round(float(np.percentile(lookups, 99)) * 1e6, 2),
+            "scan_p50_ms": None,
+        }
+        if size <= args.scan_max_rows:
+            # The pre-index approach: normalize and filter the whole column per request
+            scans = []
+            for email in emails[:args.scan_lookups]:
+                started = time.perf_counter()
+                match = df[df["Email"].astype(str).str.strip().str.lower() == normalize_email(email)]
+                _ = match.iloc[0] if not match.empty else None
+                scans.append(time.perf_counter() - started)
+            row["scan_p50_ms"] = round(float(np.percentile(scans, 50)) * 1000, 3)
+        rows.append(row)
+        print("  ".join(f"{k}={v}" for k, v in row.items()))
+        del store, df
+    return rows
+
+
+# ---------------- REPORTING ---------------- #
+def print_row(name: str, result: dict):
+    print(f"{name:<18} {result['requests']:>6} {result['errors']:>6} {result['throughput_rps']:>9} "
+          f"{result['p50_ms']:>9} {result['p95_ms']:>9} {result['p99_ms']:>9}")
+
+
+def parse_sizes(value: str) -> list:
+    return [int(float(v)) for v in value.split(",") if v.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the API against fake Groq/Sheets backends.")
+    parser.add_argument("--endpoints", default=",".join(ENDPOINTS),
+                        help=f"comma-separated subset of {', '.join(ENDPOINTS)}")
+    parser.add_argument("--requests", type=int, default=200, help="measured requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--llm-latency", type=float, default=0.3, help="fake Groq seconds per completion")
+    parser.add_argument("--llm-jitter", type=float, default=0.05)
+    parser.add_argument("--transcribe-latency", type=float, default=None)
+    parser.add_argument("--llm-error-rate", type=float, default=0.0)
+    parser.add_argument("--sheets-latency", type=float, default=0.5, help="fake Sheets seconds per append")
+    parser.add_argument("--audio-seconds", type=float, default=8.0)
+    parser.add_argument("--transcript-chars", type=int, default=4000)
+    parser.add_argument("--cached", action="store_true", help="repeat inputs so caches hit")
+    parser.add_argument("--crm", default="crm_data.xlsx", help="CRM the synthetic ones are sampled from (.xlsx, .csv or .parquet)")
+    parser.add_argument("--crm-sizes", type=parse_sizes, default=parse_sizes("500,10000,100000,1000000"))
+    parser.add_argument("--lookups", type=int, default=10000)
+    parser.add_argument("--scan-lookups", type=int, default=50)
+    parser.add_argument("--scan-max-rows", type=int, default=100000)
+    parser.add_argument("--skip-http", action="store_true")
+    parser.add_argument("--skip-crm", action="store_true")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+    args.endpoints = [e.strip() for e in args.endpoints.split(",") if e.strip()]
+    unknown = set(args.endpoints) - set(ENDPOINTS)
+    if unknown:
+        parser.error(f"unknown endpoints: {', '.join(sorted(unknown))}")
+    random.seed(args.seed)
+
+    report = {"settings": {k: v for k, v in vars(args).items() if k != "json"}}
+    if not args.skip_http:
+        print(f"{'endpoint':<18} {'reqs':>6} {'errors':>6} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+        report["http"] = asyncio.run(benchmark_http(args))
+    if not args.skip_crm:
+        print("\nCRM lookup scaling")
+        report["crm"] = benchmark_crm(args)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+def normalize_text(text: str) -> str:
+    """Case-fold and collapse whitespace so trivially different utterances share a key."""
+    return " ".join(str(text).split()).casefold()
+
+
+def make_key(*parts) -> str:
+    """SHA-256 over the given parts; bytes are hashed as-is, everything else as text."""
+    h = hashlib.sha256()
+    for part in parts:
+        data = part if isinstance(part, (bytes, bytearray, memoryview)) else str(part).encode("utf-8")
+        h.update(len(data).to_bytes(8, "big"))
+        h.update(data)
+    return h.hexdigest()
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries also expire after ``ttl`` seconds."""
+
+    def __init__(self, maxsize: int = 10000, ttl: float = 3600.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None:
+                expires, value = item
+                if expires > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def __contains__(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            return item is not None and item[0] > time.monotonic()
+
+    def __len__(self):
+        return len(self._data)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+# Sentiment results for (normalized text, model, prompt) and Whisper transcripts by audio hash
+sentiment_cache = TTLCache(
+    maxsize=int(os.getenv("SENTIMENT_CACHE_SIZE", "10000")),
+    ttl=float(os.getenv("SENTIMENT_CACHE_TTL", "86400")),
+)
+transcription_cache = TTLCache(
+    maxsize=int(os.getenv("TRANSCRIPTION_CACHE_SIZE", "1000")),
+    ttl=float(os.getenv("TRANSCRIPTION_CACHE_TTL", "3600")),
+)
+# Notes for each transcript chunk in map-reduce summaries, by (chunk, model, prompt)
+summary_cache = TTLCache(
+    maxsize=int(os.getenv("SUMMARY_CACHE_SIZE", "5000")),
+    ttl=float(os.getenv("SUMMARY_CACHE_TTL", "21600")),
+)
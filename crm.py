@@ -1,8 +1,21 @@
+"""Synthetic CRM generator.
+
+    python crm.py                                   # 500 customers -> crm_data.xlsx
+    python crm.py --rows 20000000 --out crm_data.parquet --seed 7
+
+Rows are generated a chunk at a time with NumPy, so memory stays flat
+however many customers are asked for, and streamed to Parquet, CSV or
+xlsx (picked from the file extension). The same seed always gives the
+same file.
+"""
+import argparse
+import datetime
+import time
+
+import numpy as np
 import pandas as pd
-import random
-from faker import Faker
 
-fake = Faker()
+from crm_store import CRMWriter
 
 # Indian first and last names
 indian_first_names = ["Aarav", "Vivaan", "Aditya", "Krishna", "Arjun", "Riya", "Ananya", "Isha", "Kavya", "Meera"]
@@ -27,49 +40,103 @@ feedback_map = {
     "Not interested right now": "Negative"
 }
 
-def generate_name():
-    return f"{random.choice(indian_first_names)} {random.choice(indian_last_names)}"
-
-def generate_phone():
-    return f"+91{random.randint(6000000000, 9999999999)}"
-
-def generate_date():
-    return fake.date_between(start_date="-2y", end_date="today")
-
-# Dictionary to keep track of previous purchases for each email
-purchase_history = {}
-
-data = []
-for i in range(500):  # 500 people
-    name = generate_name()
-    email = f"{name.lower().replace(' ', '')}{i}@email.com"
-    phone = generate_phone()
-    product = random.choice(products)
-    invoice = f"INV{1000+i}"
-    date = generate_date()
-    feedback = random.choice(list(feedback_map.keys()))
-    sentiment = feedback_map[feedback]
-
-    # If first time, pre-populate 1–3 random purchases
-    if email not in purchase_history:
-        previous = random.sample(products, k=random.randint(1, 3))
-        purchase_history[email] = previous.copy()
-
-    # Add current purchase to history
-    prev_purchases = purchase_history[email]
-    purchase_history[email].append(product)
-
-    # Store row (latest product + all previous purchases before this one)
-    data.append([
-        name, email, phone, product, invoice, date, feedback, sentiment,
-        ", ".join(prev_purchases) if prev_purchases else "None"
-    ])
-
-df = pd.DataFrame(data, columns=[
+COLUMNS = [
     "Name", "Email", "Phone", "Product",
     "Invoice", "Date of Purchase", "Call Feedback", "Sentiment",
     "Previous Purchases"
-])
+]
+
+# Product popularity falls off Zipf-style down the list
+PRODUCT_WEIGHTS = 1 / np.arange(1, len(products) + 1) ** 0.8
+PRODUCT_WEIGHTS /= PRODUCT_WEIGHTS.sum()
+# Chance a customer had made yet another earlier purchase: the count of
+# previous purchases is geometric, so most have 0-2 and a few have many
+REPEAT_RATE = 0.6
+MAX_PREVIOUS = 12
+# Share of repeat purchases made in the customer's favourite category
+LOYALTY = 0.4
+HISTORY_DAYS = 730  # purchases fall in the last two years
+
+XLSX_MAX_ROWS = 1048575  # sheet limit minus the header row
+# Arrow types of the columns, so every chunk is written with the same schema
+CRM_TYPES = {
+    "Name": "string", "Email": "string", "Phone": "int64", "Product": "string",
+    "Invoice": "string", "Date of Purchase": "timestamp[us]", "Call Feedback": "string",
+    "Sentiment": "string", "Previous Purchases": "string",
+}
+
+_FULL_NAMES = np.array([f"{f} {l}" for f in indian_first_names for l in indian_last_names], dtype=object)
+_EMAIL_STEMS = np.array([n.lower().replace(" ", "") for n in _FULL_NAMES], dtype=object)
+_PRODUCTS = np.array(products, dtype=object)
+_FEEDBACK = np.array(list(feedback_map), dtype=object)
+_SENTIMENTS = np.array(list(feedback_map.values()), dtype=object)
+
+
+def previous_purchases(rng, size: int) -> np.ndarray:
+    """'Books, Books, Toys'-style purchase histories, empty for first-time buyers."""
+    counts = np.minimum(rng.geometric(1 - REPEAT_RATE, size) - 1, MAX_PREVIOUS)
+    favourite = rng.choice(len(products), size, p=PRODUCT_WEIGHTS)
+    width = int(counts.max()) if size else 0
+    picks = rng.choice(len(products), (size, width), p=PRODUCT_WEIGHTS)
+    picks = np.where(rng.random((size, width)) < LOYALTY, favourite[:, None], picks)
+
+    history = np.full(size, "", dtype=object)
+    for j in range(width):
+        has = counts > j
+        history[has] += (", " if j else "") + _PRODUCTS[picks[has, j]]
+    return history
+
+
+def generate_chunk(rng, start: int, size: int, end_date: datetime.date) -> pd.DataFrame:
+    """Customers ``start`` .. ``start + size - 1`` as one DataFrame."""
+    ids = pd.Series(np.arange(start, start + size)).astype(str)
+    name_idx = rng.integers(0, len(_FULL_NAMES), size)
+    feedback_idx = rng.integers(0, len(_FEEDBACK), size)
+    days_ago = rng.integers(0, HISTORY_DAYS + 1, size).astype("timedelta64[D]")
+
+    return pd.DataFrame({
+        "Name": _FULL_NAMES[name_idx],
+        "Email": (pd.Series(_EMAIL_STEMS[name_idx]) + ids + "@email.com").to_numpy(),
+        "Phone": 910000000000 + rng.integers(6000000000, 10000000000, size),
+        "Product": _PRODUCTS[rng.choice(len(products), size, p=PRODUCT_WEIGHTS)],
+        "Invoice": ("INV" + pd.Series(np.arange(1000 + start, 1000 + start + size)).astype(str)).to_numpy(),
+        "Date of Purchase": (np.datetime64(end_date, "D") - days_ago).astype("datetime64[us]"),
+        "Call Feedback": _FEEDBACK[feedback_idx],
+        "Sentiment": _SENTIMENTS[feedback_idx],
+        "Previous Purchases": previous_purchases(rng, size),
+    }, columns=COLUMNS)
+
+
+def generate(path: str, rows: int, seed: int = None, chunk_size: int = 1_000_000,
+             end_date: datetime.date = None):
+    if path.lower().endswith(".xlsx") and rows > XLSX_MAX_ROWS:
+        raise ValueError(f"xlsx holds at most {XLSX_MAX_ROWS} rows; use .parquet or .csv")
+    rng = np.random.default_rng(seed)
+    end_date = end_date or datetime.date.today()
+    writer = CRMWriter(path, CRM_TYPES)
+    started = time.perf_counter()
+    for start in range(0, rows, chunk_size):
+        writer.write(generate_chunk(rng, start, min(chunk_size, rows - start), end_date))
+        if rows > chunk_size:
+            print(f"{min(start + chunk_size, rows)}/{rows} rows ({time.perf_counter() - started:.1f}s)")
+    writer.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic CRM export.")
+    parser.add_argument("--rows", type=int, default=500, help="number of customers")
+    parser.add_argument("--out", default="crm_data.xlsx", help="output file (.xlsx, .csv or .parquet)")
+    parser.add_argument("--seed", type=int, default=None, help="random seed for a reproducible file")
+    parser.add_argument("--chunk-size", type=int, default=1_000_000)
+    parser.add_argument("--end-date", type=datetime.date.fromisoformat, default=None,
+                        help="latest purchase date, YYYY-MM-DD (default: today)")
+    args = parser.parse_args()
+    try:
+        generate(args.out, args.rows, args.seed, args.chunk_size, args.end_date)
+    except ValueError as e:
+        parser.error(str(e))
+    print(f"✅ CRM data with populated Previous Purchases column generated successfully in {args.out}")
+
 
-df.to_excel("crm_data.xlsx", index=False)
-print("✅ CRM data with populated Previous Purchases column generated successfully in crm_data.xlsx")
+if __name__ == "__main__":
+    main()
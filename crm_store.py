@@ -0,0 +1,249 @@
+import logging
+import os
+import threading
+import time
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_email(email) -> str:
+    """Lower-case and strip an email the same way for indexing and lookup."""
+    return str(email).strip().lower()
+
+
+def normalize_phone(phone) -> str:
+    """Strip whitespace, spaces and dashes from a phone number."""
+    return str(phone).strip().replace(" ", "").replace("-", "")
+
+
+def read_crm(path: str) -> pd.DataFrame:
+    """Read a CRM export, choosing the parser from the file extension."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".parquet":
+        return pd.read_parquet(path)
+    if ext == ".csv":
+        return pd.read_csv(path)
+    return pd.read_excel(path)
+
+
+def crm_records(df: pd.DataFrame) -> list:
+    """The rows of ``df`` as dicts, with blank cells as None.
+
+    Empty cells (a first-time buyer's Previous Purchases, say) are read
+    back as NaN, which JSON responses can't carry.
+    """
+    records = df.to_dict("records")
+    blanks = [column for column in df.columns if df[column].hasnans]
+    if blanks:
+        for record in records:
+            for column in blanks:
+                if pd.isna(record[column]):
+                    record[column] = None
+    return records
+
+
+class CRMWriter:
+    """Stream DataFrame chunks to one .parquet, .csv or .xlsx file.
+
+    Writes go to a temporary file that replaces ``path`` on close, so a
+    running API never reloads a half-written CRM. The Parquet schema is
+    fixed by the first chunk: each column takes its type from ``types``
+    (name -> Arrow type or alias) where given, else the chunk's own, with
+    all-blank columns written as strings so later chunks still fit.
+    """
+
+    def __init__(self, path: str, types: dict = None):
+        self.path = path
+        self.types = dict(types or {})
+        self.ext = os.path.splitext(path)[1].lower()
+        if self.ext not in (".parquet", ".csv", ".xlsx"):
+            raise ValueError(f"Unsupported CRM format: {self.ext}")
+        self._tmp = f"{path}.tmp{self.ext}"
+        self._writer = None
+        self._schema = None
+
+    def schema(self, df: pd.DataFrame):
+        import pyarrow as pa
+
+        fields = []
+        for field in pa.Schema.from_pandas(df, preserve_index=False):
+            dtype = self.types.get(field.name)
+            if dtype is not None:
+                dtype = pa.type_for_alias(dtype) if isinstance(dtype, str) else dtype
+            elif df[field.name].isna().all():
+                dtype = pa.string()
+            else:
+                dtype = field.type
+            fields.append(pa.field(field.name, dtype))
+        return pa.schema(fields)
+
+    def write(self, df: pd.DataFrame):
+        if self.ext == ".parquet":
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            if self._writer is None:
+                self._schema = self.schema(df)
+                self._writer = pq.ParquetWriter(self._tmp, self._schema)
+            self._writer.write_table(pa.Table.from_pandas(df, schema=self._schema, preserve_index=False))
+        elif self.ext == ".csv":
+            df.to_csv(self._tmp, mode="a" if self._writer else "w", header=not self._writer, index=False)
+            self._writer = True
+        else:
+            from openpyxl import Workbook
+
+            if self._writer is None:
+                self._writer = Workbook(write_only=True)
+                self._sheet = self._writer.create_sheet()
+                self._sheet.append(list(df.columns))
+            for row in df.itertuples(index=False):
+                self._sheet.append(list(row))
+
+    def close(self):
+        if self._writer is None:
+            return
+        if self.ext == ".parquet":
+            self._writer.close()
+        elif self.ext == ".xlsx":
+            self._writer.save(self._tmp)
+        # Only replace the previous file once the new one is complete
+        os.replace(self._tmp, self.path)
+
+
+class _Snapshot:
+    """One immutable, fully indexed view of the CRM file."""
+
+    __slots__ = ("df", "records", "by_email", "by_phone", "mtime")
+
+    def __init__(self, df, mtime):
+        self.df = df
+        self.mtime = mtime
+        self.records = crm_records(df)
+        self.by_email = {}
+        self.by_phone = {}
+        # First row wins, matching the old `customer_row.iloc[0]` behaviour
+        for record in self.records:
+            email = record.get("Email")
+            if isinstance(email, str) and email.strip():
+                self.by_email.setdefault(normalize_email(email), record)
+            phone = record.get("Phone")
+            if phone is not None and not pd.isna(phone):
+                self.by_phone.setdefault(normalize_phone(phone), record)
+
+
+class CRMStore:
+    """CRM file (.xlsx, .csv or .parquet) loaded once into hash indexes and reloaded when it changes.
+
+    Readers only ever dereference ``self._snapshot``; a reload builds a new
+    snapshot off to the side and swaps the reference in one assignment, so a
+    lookup never sees a half-built index. When the file changes, lookups keep
+    getting the old snapshot while a background thread re-reads it and runs
+    the listeners, so a large CRM never stalls the event loop.
+    """
+
+    def __init__(self, path: str, check_interval: float = 1.0):
+        self.path = path
+        self.check_interval = check_interval
+        self._snapshot = None
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+        self._listeners = []
+        self._reloader = None
+        self._reloader_lock = threading.Lock()
+
+    def on_load(self, callback):
+        """Register ``callback(df)`` to run after every (re)load of the CRM."""
+        self._listeners.append(callback)
+        if self._snapshot is not None:
+            callback(self._snapshot.df)
+        return callback
+
+    def load(self, force: bool = False):
+        """Read the CRM file, swap in the new indexes and run the listeners.
+
+        Blocks for as long as that takes; serving code reaches it through
+        ``_reload_in_background`` instead.
+        """
+        # Held through the listeners too, so they see reloads one at a time and in order
+        with self._lock:
+            mtime = os.path.getmtime(self.path)
+            current = self._snapshot
+            # Another thread may have reloaded while we waited for the lock
+            if not force and current is not None and current.mtime == mtime:
+                return current
+            snapshot = _Snapshot(read_crm(self.path), mtime)
+            self._snapshot = snapshot
+            self._notify(snapshot)
+        return snapshot
+
+    def load_frame(self, df: pd.DataFrame):
+        """Index an in-memory DataFrame instead of the file (benchmarks, generated data)."""
+        with self._lock:
+            snapshot = _Snapshot(df, None)
+            self._snapshot = snapshot
+            self._notify(snapshot)
+        return snapshot
+
+    def _notify(self, snapshot):
+        for callback in self._listeners:
+            callback(snapshot.df)
+
+    def _reload_in_background(self):
+        """Start reloading on a worker thread unless a reload is already running."""
+        with self._reloader_lock:
+            if self._reloader is not None and self._reloader.is_alive():
+                return
+            self._reloader = threading.Thread(target=self._background_load, name="crm-reload", daemon=True)
+            self._reloader.start()
+
+    def _background_load(self):
+        try:
+            self.load()
+        except Exception:
+            # Half-written or unreadable file - keep serving the old data, retry on the next check
+            logger.exception("CRM reload from %s failed", self.path)
+
+    def _current(self):
+        snapshot = self._snapshot
+        if snapshot is None:
+            return self.load()
+        if snapshot.mtime is None:
+            return snapshot  # loaded from memory, nothing to watch
+
+        # Throttle the stat() call so hot lookups stay syscall-free
+        now = time.monotonic()
+        if now < self._next_check:
+            return snapshot
+        self._next_check = now + self.check_interval
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            # File briefly missing (e.g. being rewritten) - keep serving the old data
+            return snapshot
+        if mtime != snapshot.mtime:
+            self._reload_in_background()
+        return snapshot
+
+    @property
+    def df(self):
+        return self._current().df
+
+    def __len__(self):
+        return len(self._current().records)
+
+    def find(self, email: str = "", phone: str = ""):
+        """Return the CRM record for an already normalized email or phone.
+
+        Email is tried first, then phone. The returned dict is shared between
+        requests and must not be mutated.
+        """
+        snapshot = self._current()
+        customer = None
+        if email:
+            customer = snapshot.by_email.get(email)
+        if customer is None and phone:
+            customer = snapshot.by_phone.get(phone)
+        return customer
+
@@ -0,0 +1,270 @@
+import os
+import re
+import threading
+
+import numpy as np
+import pandas as pd
+
+SEARCH_LIMIT = 10
+SEARCH_MAX_LIMIT = 50
+# Each matcher contributes at most this many rows per requested result;
+# a short name prefix can match millions and only the top few are returned
+CANDIDATES_PER_RESULT = 4
+# Fuzzy candidates are counted over the query's rarest trigrams until this many
+# postings are gathered, so common ones like "com" never force a scan of every email
+FUZZY_MAX_POSTINGS = int(os.getenv("SEARCH_FUZZY_MAX_POSTINGS", "100000"))
+FUZZY_CANDIDATES = 200
+FUZZY_MIN_SIMILARITY = 0.3
+# Keys are cut to this many characters before indexing
+KEY_MAX_CHARS = 64
+RESULT_COLUMNS = ["Name", "Email", "Phone", "Product", "Invoice"]
+
+_NON_DIGIT = re.compile(r"\D")
+_PHONE_LIKE = re.compile(r"^\+?[\d\s\-()]+$")
+
+
+def _text(series: pd.Series) -> pd.Series:
+    return series.fillna("").astype(str).str.strip().str.lower().str.slice(0, KEY_MAX_CHARS)
+
+
+def _digits(series: pd.Series) -> pd.Series:
+    """Phone column (int, float or text) as digit strings; missing -> ""."""
+    if pd.api.types.is_numeric_dtype(series):
+        series = pd.to_numeric(series, errors="coerce").astype("Int64").astype(str).replace("<NA>", "")
+    return series.fillna("").astype(str).str.replace(r"\D", "", regex=True)
+
+
+def _encode(values) -> np.ndarray:
+    """Strings -> fixed-width UTF-8 bytes, which NumPy sorts and searches in C."""
+    return pd.Series(values, dtype=object).str.encode("utf-8").to_numpy(dtype=object).astype("S")
+
+
+def _native(value):
+    """NumPy/pandas scalar -> plain Python for JSON; missing -> None."""
+    if value is None or value is pd.NA or (isinstance(value, float) and np.isnan(value)):
+        return None
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def _key(text: str) -> bytes:
+    return text[:KEY_MAX_CHARS].encode("utf-8")
+
+
+def trigrams(value: bytes, stop: bytes = None) -> set:
+    if stop:
+        value = value.split(stop, 1)[0]
+    padded = b" " + value + b" "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class SortedKeys:
+    """Keys sorted once, so exact and prefix lookups are two binary searches."""
+
+    def __init__(self, keys, rows):
+        keys = _encode(keys)
+        rows = np.asarray(rows, dtype=np.int64)
+        keep = keys != b""
+        keys, rows = keys[keep], rows[keep]
+        order = np.argsort(keys, kind="stable")
+        self.keys = keys[order]
+        self.rows = rows[order]
+
+    def _range(self, key: bytes, prefix: bool):
+        # A needle wider than the array would make NumPy copy the whole array to compare
+        if not key or len(key) > self.keys.dtype.itemsize:
+            return 0, 0
+        needle = np.array(key, dtype=self.keys.dtype)
+        lo = int(np.searchsorted(self.keys, needle, side="left"))
+        if not prefix:
+            return lo, int(np.searchsorted(self.keys, needle, side="right"))
+        # First key past the prefix range: bump the last byte (UTF-8 never uses 0xff)
+        upper = np.array(key[:-1] + bytes([key[-1] + 1]), dtype=self.keys.dtype)
+        return lo, int(np.searchsorted(self.keys, upper, side="left"))
+
+    def exact(self, key: str, limit: int = None) -> np.ndarray:
+        lo, hi = self._range(_key(key), prefix=False)
+        return self.rows[lo:hi if limit is None else min(hi, lo + limit)]
+
+    def prefix(self, key: str, limit: int = None) -> np.ndarray:
+        lo, hi = self._range(_key(key), prefix=True)
+        return self.rows[lo:hi if limit is None else min(hi, lo + limit)]
+
+    def distinct(self) -> np.ndarray:
+        if not len(self.keys):
+            return self.keys
+        return self.keys[np.r_[True, self.keys[1:] != self.keys[:-1]]]
+
+
+class TrigramIndex:
+    """Inverted index from byte trigrams to the distinct values containing them.
+
+    Postings are one sorted int32 array with per-trigram offsets (CSR),
+    built with NumPy from the fixed-width byte matrix a chunk at a time.
+    With ``stop`` set (e.g. b"@"), only the part before it is indexed. A
+    query counts shared trigrams over the postings of its rarer trigrams
+    only, then re-scores the best candidates exactly with Dice similarity.
+    """
+
+    def __init__(self, values: np.ndarray, stop: bytes = None, chunk_size: int = 250000):
+        self.values = values
+        self.stop = stop
+        width = values.dtype.itemsize if len(values) else 0
+        pairs = []
+        for start in range(0, len(values), chunk_size):
+            raw = values[start:start + chunk_size].view(np.uint8).reshape(-1, width)
+            present = raw != 0
+            if stop:
+                present &= np.cumsum(raw == stop[0], axis=1) == 0
+            lengths = present.sum(axis=1)
+            # " " + value + " ", zero-padded to a common width
+            b = np.zeros((len(raw), width + 2), dtype=np.int64)
+            b[:, 0] = 32
+            b[:, 1:-1] = np.where(present, raw, 0)
+            b[np.arange(len(raw)), lengths + 1] = 32
+            codes = (b[:, :-2] << 16) | (b[:, 1:-1] << 8) | b[:, 2:]
+            valid = np.arange(width) < lengths[:, None]
+            ids = np.broadcast_to(np.arange(start, start + len(raw), dtype=np.int64)[:, None], codes.shape)
+            pairs.append((codes[valid] << 32) | ids[valid])
+
+        pairs = np.concatenate(pairs) if pairs else np.empty(0, dtype=np.int64)
+        # Sort-based dedupe: much faster than np.unique's hashing at this size
+        pairs.sort()
+        pairs = pairs[np.r_[True, pairs[1:] != pairs[:-1]]] if len(pairs) else pairs
+        self.postings = (pairs & 0xFFFFFFFF).astype(np.int32)
+        codes = (pairs >> 32).astype(np.int32)
+        del pairs
+        starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]]) if len(codes) else codes
+        self.codes = codes[starts]
+        self.offsets = np.append(starts, len(codes))
+        self.sizes = np.bincount(self.postings, minlength=len(values))
+
+    def search(self, query: str, limit: int = FUZZY_CANDIDATES) -> list:
+        """[(value index, similarity)] best first, above FUZZY_MIN_SIMILARITY."""
+        grams = trigrams(_key(query), self.stop)
+        codes = np.array(sorted(int.from_bytes(g, "big") for g in grams), dtype=np.int32)
+        if not len(codes) or not len(self.codes):
+            return []
+        slots = np.searchsorted(self.codes, codes)
+        found = slots < len(self.codes)
+        found[found] = self.codes[slots[found]] == codes[found]
+        slots = slots[found]
+        if not len(slots):
+            return []
+        # Rarest trigrams first, as many as fit the postings budget (at least one)
+        lengths = self.offsets[slots + 1] - self.offsets[slots]
+        order = np.argsort(lengths, kind="stable")
+        take = max(1, int(np.searchsorted(np.cumsum(lengths[order]), FUZZY_MAX_POSTINGS, side="right")))
+        chosen = slots[order[:take]]
+
+        candidates = np.concatenate([self.postings[self.offsets[s]:self.offsets[s + 1]] for s in chosen])
+        ids, counts = np.unique(candidates, return_counts=True)
+        if len(ids) > limit:
+            ids = ids[np.argpartition(-counts, limit)[:limit]]
+
+        scored = []
+        for i in ids.tolist():
+            shared = len(grams & trigrams(self.values[i], self.stop))
+            similarity = 2 * shared / max(1, len(grams) + int(self.sizes[i]))
+            if similarity >= FUZZY_MIN_SIMILARITY:
+                scored.append((i, similarity))
+        scored.sort(key=lambda item: -item[1])
+        return scored
+
+
+class CustomerSearchIndex:
+    """Exact, prefix, phone-suffix and fuzzy lookups over one CRM snapshot."""
+
+    def __init__(self, df: pd.DataFrame = None):
+        self.df = df if df is not None else pd.DataFrame(columns=RESULT_COLUMNS)
+        self.columns = {name: self.df[name].array for name in RESULT_COLUMNS if name in self.df}
+        column = lambda name: (self.df[name] if name in self.df else pd.Series("", index=self.df.index)
+                               ).reset_index(drop=True)
+        rows = np.arange(len(self.df))
+
+        names = _text(column("Name"))
+        emails = _text(column("Email"))
+        phones = _digits(column("Phone"))
+        tokens = names.str.split().explode().dropna()
+
+        self.name = SortedKeys(names, rows)
+        self.name_token = SortedKeys(tokens, tokens.index.to_numpy())
+        self.email = SortedKeys(emails, rows)
+        self.phone = SortedKeys(phones, rows)
+        self.phone_reversed = SortedKeys(phones.str[::-1], rows)
+        self.invoice = SortedKeys(_text(column("Invoice")), rows)
+
+        self.fuzzy_names = TrigramIndex(self.name.distinct())
+        # Every email shares its domain; only the part before "@" tells customers apart
+        self.fuzzy_emails = TrigramIndex(self.email.distinct(), stop=b"@")
+
+    def _matches(self, q: str, cap: int) -> dict:
+        """row -> (score, how it matched); the best match per row wins."""
+        best = {}
+
+        def add(rows, score, match):
+            for row in rows[:cap].tolist():
+                if score > best.get(row, (0.0, ""))[0]:
+                    best[row] = (score, match)
+
+        digits = _NON_DIGIT.sub("", q)
+        if _PHONE_LIKE.match(q) and len(digits) >= 3:
+            add(self.phone.exact(digits), 1.0, "phone")
+            add(self.phone.prefix(digits), 0.8, "phone prefix")
+            add(self.phone_reversed.prefix(digits[::-1]), 0.75, "phone suffix")
+            add(self.invoice.prefix("inv" + digits), 0.7, "invoice prefix")
+            return best
+
+        add(self.invoice.exact(q), 1.0, "invoice")
+        add(self.email.exact(q), 1.0, "email")
+        add(self.email.prefix(q), 0.85, "email prefix")
+        if "@" not in q:
+            add(self.name.exact(q), 0.95, "name")
+            add(self.name.prefix(q), 0.8, "name prefix")
+            add(self.name_token.prefix(q), 0.7, "name prefix")
+            if q.startswith("inv"):
+                add(self.invoice.prefix(q), 0.8, "invoice prefix")
+
+        # Fuzzy matches for typos score below exact ones, scaled by similarity
+        if len(q) >= 3:
+            fields = ((self.fuzzy_emails, self.email, "email"),) if "@" in q else \
+                ((self.fuzzy_names, self.name, "name"), (self.fuzzy_emails, self.email, "email"))
+            for fuzzy, keys, field in fields:
+                taken = 0
+                for value, similarity in fuzzy.search(q):
+                    if taken >= cap:
+                        break
+                    rows = keys.exact(fuzzy.values[value].decode("utf-8", "ignore"), cap - taken)
+                    add(rows, 0.9 * similarity, f"fuzzy {field}")
+                    taken += len(rows)
+        return best
+
+    def search(self, query: str, limit: int = SEARCH_LIMIT) -> list:
+        q = str(query or "").strip().lower()
+        if not q or not len(self.df):
+            return []
+        best = self._matches(q, limit * CANDIDATES_PER_RESULT)
+        ranked = sorted(best, key=lambda row: (-best[row][0], row))[:limit]
+        results = []
+        for row in ranked:
+            # Cell access; a pandas take over millions of Arrow rows costs tens of ms
+            record = {name: _native(values[row]) for name, values in self.columns.items()}
+            score, match = best[row]
+            record.update(score=round(score, 3), match=match)
+            results.append(record)
+        return results
+
+
+class CustomerSearch:
+    """Holds the current index and swaps in a fresh one whenever the CRM reloads."""
+
+    def __init__(self):
+        self.index = CustomerSearchIndex()
+        self._lock = threading.Lock()
+
+    def rebuild(self, df: pd.DataFrame):
+        index = CustomerSearchIndex(df)
+        with self._lock:
+            self.index = index
+
+    def search(self, query: str, limit: int = SEARCH_LIMIT) -> list:
+        return self.index.search(query, max(1, min(limit, SEARCH_MAX_LIMIT)))
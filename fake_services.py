@@ -0,0 +1,234 @@
+"""Local stand-ins for Groq and Google Sheets, for offline runs and load tests.
+
+``make_groq_app()`` serves the two Groq endpoints the app uses
+(``/openai/v1/chat/completions`` and ``/openai/v1/audio/transcriptions``)
+with configurable latency and error rate. Point the real SDK at it with
+``GROQ_BASE_URL=http://127.0.0.1:<port>``:
+
+    python fake_services.py --port 8081 --latency 0.4
+    python fake_services.py --error-rate 0.3 --down llama-3.3-70b-versatile   # exercise retries / fallback
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+import uuid
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from sinks import Sink
+
+_SENTIMENTS = (("Positive", "Friendly"), ("Neutral", "Polite"), ("Negative", "Upset"))
+_NUMBERED = re.compile(r'^(\d+)\. "', re.M)
+
+
+class FakeSettings:
+    """Latency model shared by every request; fields can be changed while serving."""
+
+    def __init__(self, latency: float = 0.3, jitter: float = 0.1,
+                 transcribe_latency: float = None, error_rate: float = 0.0,
+                 tokens_per_second: float = 200.0, down_models=()):
+        self.latency = latency
+        self.jitter = jitter
+        self.transcribe_latency = latency if transcribe_latency is None else transcribe_latency
+        self.error_rate = error_rate
+        self.tokens_per_second = tokens_per_second
+        # Models answered with 503 on every call, as in an outage
+        self.down_models = set(down_models)
+        self.calls = {"chat": 0, "transcribe": 0, "errors": 0}
+        self.models = {}
+
+    def delay(self, base: float) -> float:
+        return max(0.0, base + random.uniform(-self.jitter, self.jitter))
+
+
+def _pick(text: str):
+    """Deterministic sentiment for a text so repeated runs see the same answers."""
+    return _SENTIMENTS[hashlib.sha256(text.encode()).digest()[0] % len(_SENTIMENTS)]
+
+
+def fake_completion(prompt: str) -> str:
+    """Plausible model output for the prompts the app sends."""
+    if "numbered text" in prompt:
+        lines = []
+        for number in _NUMBERED.findall(prompt):
+            sentiment, tone = _pick(prompt + number)
+            lines.append(f"{number}. Sentiment: {sentiment} | Tone: {tone} | Explanation: Fake result.")
+        return "\n".join(lines)
+    if "sentiment detection engine" in prompt:
+        sentiment, tone = _pick(prompt)
+        return f"Sentiment: {sentiment}\nTone: {tone}\nExplanation: Fake result."
+    if "Post-Call Summar" in prompt:
+        return ("Post-Call Summary: Customer\nDate of Call: Not specified\n"
+                "Customer: Customer - Retail\nOverall Sentiment: Neutral\nKey Topics:\n"
+                "- Budget: Not mentioned\n- Phone Requirements: Not mentioned\n"
+                "- Battery Life: Not mentioned\n- Previous Purchases: Not mentioned")
+    return ("Thank you for reaching out! I completely understand, and I'm happy to help "
+            "you find the right option for your needs. ") * 3
+
+
+def _error(settings: FakeSettings):
+    settings.calls["errors"] += 1
+    return JSONResponse(
+        {"error": {"message": "Rate limit reached (fake)", "type": "tokens", "code": "rate_limit_exceeded"}},
+        status_code=429, headers={"retry-after": "0"},
+    )
+
+
+def _unavailable(settings: FakeSettings):
+    settings.calls["errors"] += 1
+    return JSONResponse(
+        {"error": {"message": "Service unavailable (fake)", "type": "internal_server_error"}},
+        status_code=503,
+    )
+
+
+def make_groq_app(settings: FakeSettings = None) -> FastAPI:
+    settings = settings or FakeSettings()
+    app = FastAPI()
+    app.state.settings = settings
+
+    @app.post("/openai/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        settings.calls["chat"] += 1
+        model = body.get("model", "fake")
+        settings.models[model] = settings.models.get(model, 0) + 1
+        if model in settings.down_models:
+            return _unavailable(settings)
+        if random.random() < settings.error_rate:
+            return _error(settings)
+        prompt = "\n".join(str(m.get("content", "")) for m in body.get("messages", []))
+        content = fake_completion(prompt)
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        created = int(time.time())
+
+        if body.get("stream"):
+            async def events():
+                # Time to first token is the base latency, then a steady token rate
+                await asyncio.sleep(settings.delay(settings.latency))
+                for word in re.findall(r"\S+\s*", content):
+                    chunk = {"id": completion_id, "object": "chat.completion.chunk", "created": created,
+                             "model": model, "choices": [{"index": 0, "delta": {"content": word},
+                                                          "finish_reason": None}]}
+                    yield f"data: {json.dumps(chunk)}\n\n"
+                    await asyncio.sleep(1 / settings.tokens_per_second)
+                done = {"id": completion_id, "object": "chat.completion.chunk", "created": created,
+                        "model": model, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}
+                yield f"data: {json.dumps(done)}\n\n"
+                yield "data: [DONE]\n\n"
+
+            return StreamingResponse(events(), media_type="text/event-stream")
+
+        await asyncio.sleep(settings.delay(settings.latency))
+        tokens = len(content) // 4 + 1
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content},
+                         "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": len(prompt) // 4 + 1, "completion_tokens": tokens,
+                      "total_tokens": len(prompt) // 4 + 1 + tokens},
+        }
+
+    @app.post("/openai/v1/audio/transcriptions")
+    async def transcriptions(request: Request):
+        form = await request.form()
+        upload = form.get("file")
+        audio = await upload.read() if upload is not None else b""
+        settings.calls["transcribe"] += 1
+        if form.get("model") in settings.down_models:
+            return _unavailable(settings)
+        if random.random() < settings.error_rate:
+            return _error(settings)
+        await asyncio.sleep(settings.delay(settings.transcribe_latency))
+        # Longer clips give longer transcripts, roughly 2.5 words per second of 16 kHz PCM
+        words = max(1, len(audio) // 12800)
+        sentiment, _ = _pick(hashlib.sha256(audio).hexdigest())
+        phrase = {"Positive": "this phone is great and I love the battery",
+                  "Neutral": "I would like to know more about the plans",
+                  "Negative": "the delivery was late and I am not happy"}[sentiment].split()
+        return {"text": " ".join(phrase[i % len(phrase)] for i in range(words))}
+
+    return app
+
+
+class FakeSheet(Sink):
+    """Worksheet stand-in whose ``append_rows`` blocks for ``latency`` seconds."""
+
+    name = "fake"
+
+    def __init__(self, latency: float = 0.5, error_rate: float = 0.0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rows = 0
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def append_rows(self, rows: list):
+        time.sleep(self.latency)
+        with self._lock:
+            self.calls += 1
+            if random.random() < self.error_rate:
+                raise RuntimeError("Fake Sheets quota exceeded")
+            self.rows += len(rows)
+
+
+class ServerThread:
+    """Run an ASGI app under uvicorn on a background thread."""
+
+    def __init__(self, app, host: str = "127.0.0.1", port: int = 0):
+        self.server = uvicorn.Server(uvicorn.Config(app, host=host, port=port, log_level="warning"))
+        self.host = host
+        self._thread = None
+
+    @property
+    def port(self) -> int:
+        return self.server.servers[0].sockets[0].getsockname()[1]
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def start(self, timeout: float = 10.0):
+        self._thread = threading.Thread(target=self.server.run, daemon=True)
+        self._thread.start()
+        deadline = time.monotonic() + timeout
+        while not self.server.started:
+            if not self._thread.is_alive() or time.monotonic() > deadline:
+                raise RuntimeError("Server failed to start")
+            time.sleep(0.01)
+        return self
+
+    def stop(self):
+        self.server.should_exit = True
+        if self._thread is not None:
+            self._thread.join(10)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a fake Groq API locally.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency", type=float, default=0.3, help="seconds per chat completion")
+    parser.add_argument("--jitter", type=float, default=0.1)
+    parser.add_argument("--transcribe-latency", type=float, default=None)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of calls answered with 429")
+    parser.add_argument("--down", action="append", default=[], metavar="MODEL",
+                        help="answer every call to MODEL with 503 (repeatable)")
+    args = parser.parse_args()
+    settings = FakeSettings(args.latency, args.jitter, args.transcribe_latency, args.error_rate,
+                            down_models=args.down)
+    uvicorn.run(make_groq_app(settings), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
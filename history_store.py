@@ -0,0 +1,165 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+HISTORY_DB = os.getenv("HISTORY_DB", "history.db")
+HISTORY_PAGE_SIZE = 50
+HISTORY_MAX_PAGE_SIZE = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS history (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts REAL NOT NULL,
+    email TEXT,
+    sentiment TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_history_ts ON history (ts);
+CREATE INDEX IF NOT EXISTS idx_history_email ON history (email, id);
+-- Sentiment filters ignore case, so the index has to as well; replaces the BINARY one
+DROP INDEX IF EXISTS idx_history_sentiment;
+CREATE INDEX IF NOT EXISTS idx_history_sentiment_nocase ON history (sentiment COLLATE NOCASE, id);
+-- Results of deferred /analyze-text calls, pending or finished, so any worker can serve the follow-up GET
+CREATE TABLE IF NOT EXISTS deferred (
+    request_id TEXT PRIMARY KEY,
+    data TEXT NOT NULL
+);
+"""
+
+
+def parse_time(value):
+    """Accept epoch seconds or an ISO-8601 string; None passes through."""
+    if value in (None, ""):
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return datetime.fromisoformat(str(value)).timestamp()
+
+
+class HistoryStore:
+    """Conversation history persisted in SQLite and shared by every worker.
+
+    Nothing is kept in memory, so a worker's footprint stays flat however
+    long it runs. Reads are paginated newest-first with an opaque integer
+    cursor (the last id returned).
+    """
+
+    def __init__(self, path: str = HISTORY_DB):
+        self.path = path
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            # WAL lets several uvicorn workers read while one writes
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def add(self, entry: dict, ts: float = None) -> int:
+        ts = time.time() if ts is None else ts
+        email = str(entry.get("Email") or "").strip().lower() or None
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                cur = conn.execute(
+                    "INSERT INTO history (ts, email, sentiment, data) VALUES (?, ?, ?, ?)",
+                    (ts, email, entry.get("sentiment"), json.dumps(entry, default=str)),
+                )
+        return cur.lastrowid
+
+    def page(self, limit: int = HISTORY_PAGE_SIZE, cursor: int = None, email: str = None,
+             sentiment: str = None, since=None, until=None) -> dict:
+        """One page of history, newest first, plus the cursor for the next page."""
+        limit = max(1, min(int(limit), HISTORY_MAX_PAGE_SIZE))
+        clauses, params = [], []
+        if cursor is not None:
+            clauses.append("id < ?")
+            params.append(int(cursor))
+        if email:
+            clauses.append("email = ?")
+            params.append(email.strip().lower())
+        if sentiment:
+            clauses.append("sentiment = ? COLLATE NOCASE")
+            params.append(sentiment)
+        since, until = parse_time(since), parse_time(until)
+        if since is not None:
+            clauses.append("ts >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("ts < ?")
+            params.append(until)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+
+        with self._lock:
+            rows = self._connect().execute(
+                f"SELECT id, data FROM history {where} ORDER BY id DESC LIMIT ?",
+                params + [limit + 1],
+            ).fetchall()
+
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        items = []
+        for row_id, data in rows:
+            item = json.loads(data)
+            item["id"] = row_id
+            items.append(item)
+        return {
+            "items": items,
+            "next_cursor": rows[-1][0] if has_more else None,
+        }
+
+    def count_by_label(self, until: float = None) -> list:
+        """(sentiment, tone, count) per stored pair, optionally only for entries before ``until``."""
+        sql = "SELECT sentiment, json_extract(data, '$.tone') AS tone, COUNT(*) FROM history"
+        params = []
+        if until is not None:
+            sql += " WHERE ts < ?"
+            params.append(until)
+        with self._lock:
+            return self._connect().execute(f"{sql} GROUP BY sentiment, tone", params).fetchall()
+
+    def events_since(self, since: float) -> list:
+        """(ts, sentiment, tone) for every entry at or after ``since``, oldest first."""
+        with self._lock:
+            return self._connect().execute(
+                "SELECT ts, sentiment, json_extract(data, '$.tone') FROM history "
+                "WHERE ts >= ? ORDER BY ts",
+                (since,),
+            ).fetchall()
+
+    def save_deferred(self, request_id: str, result: dict, keep: int):
+        """Store (or replace) a deferred result, dropping all but the ``keep`` newest."""
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                # REPLACE re-inserts the row, so rowid order is last-written order
+                conn.execute(
+                    "INSERT OR REPLACE INTO deferred (request_id, data) VALUES (?, ?)",
+                    (request_id, json.dumps(result, default=str)),
+                )
+                conn.execute(
+                    "DELETE FROM deferred WHERE rowid <= (SELECT MAX(rowid) FROM deferred) - ?",
+                    (keep,),
+                )
+
+    def deferred(self, request_id: str):
+        """The last stored result for ``request_id``, or None if unknown or evicted."""
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT data FROM deferred WHERE request_id = ?", (request_id,)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
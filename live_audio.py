@@ -0,0 +1,164 @@
+import asyncio
+import os
+from collections import deque
+
+# Rolling-window settings for /ws/analyze-audio, in MediaRecorder timeslices
+LIVE_WINDOW_CHUNKS = int(os.getenv("LIVE_WINDOW_CHUNKS", "6"))
+LIVE_STEP_CHUNKS = int(os.getenv("LIVE_STEP_CHUNKS", "2"))
+LIVE_MAX_PENDING = int(os.getenv("LIVE_MAX_PENDING", "2"))
+LIVE_MAX_CHUNK_BYTES = int(os.getenv("LIVE_MAX_CHUNK_BYTES", str(1024 * 1024)))
+
+# Matroska / WebM element ids
+EBML_HEADER = 0x1A45DFA3
+SEGMENT = 0x18538067
+CLUSTER = 0x1F43B675
+
+
+def _read_vint(data: bytes, pos: int, keep_marker: bool):
+    """EBML variable-length integer at ``pos``; returns ``(value, next_pos, all_ones)``."""
+    if pos >= len(data) or data[pos] == 0:
+        raise ValueError("Not an EBML integer")
+    length = 8 - data[pos].bit_length() + 1
+    if pos + length > len(data):
+        raise ValueError("Truncated EBML integer")
+    value = int.from_bytes(data[pos:pos + length], "big")
+    marker = 1 << (7 * length)
+    all_ones = value == 2 * marker - 1
+    if not keep_marker:
+        value -= marker
+    return value, pos + length, all_ones
+
+
+def split_init_segment(chunk: bytes):
+    """Split a WebM stream's first chunk into ``(init_segment, media)``.
+
+    The init segment is everything before the first Cluster: the EBML
+    header plus the Segment's Info and Tracks. The media that follows is
+    ordinary audio. Anything that can't be walked this way (another
+    container, a header cut short) comes back whole as ``(chunk, b"")``.
+    """
+    try:
+        element, pos, _ = _read_vint(chunk, 0, keep_marker=True)
+        size, pos, _ = _read_vint(chunk, pos, keep_marker=False)
+        if element != EBML_HEADER:
+            return chunk, b""
+        pos += size
+        element, pos, _ = _read_vint(chunk, pos, keep_marker=True)
+        _, pos, _ = _read_vint(chunk, pos, keep_marker=False)
+        if element != SEGMENT:
+            return chunk, b""
+        while pos < len(chunk):
+            start = pos
+            element, pos, _ = _read_vint(chunk, pos, keep_marker=True)
+            if element == CLUSTER:
+                return chunk[:start], chunk[start:]
+            size, pos, unknown = _read_vint(chunk, pos, keep_marker=False)
+            if unknown:
+                break
+            pos += size
+    except ValueError:
+        pass
+    return chunk, b""
+
+
+class AudioWindow:
+    """Collect timesliced recorder chunks and cut them into overlapping windows.
+
+    Only the first chunk of a MediaRecorder stream carries the container
+    header. Its init segment is kept and prepended to every window, while the
+    audio after it is held like any other chunk, so it is transcribed only
+    while it is inside the window. Beyond the header just the last
+    ``window_chunks`` chunks are held, which bounds memory no matter how long
+    the call runs. A window is produced every ``step_chunks`` chunks.
+    """
+
+    def __init__(self, window_chunks: int = LIVE_WINDOW_CHUNKS, step_chunks: int = LIVE_STEP_CHUNKS):
+        self.window_chunks = window_chunks
+        self.step_chunks = step_chunks
+        self.header = None
+        self.chunks = deque(maxlen=window_chunks)
+        self.pending = 0
+        self.seq = 0
+
+    def add(self, chunk: bytes):
+        """Add one chunk; return ``(seq, window_bytes)`` when a new window is due."""
+        if self.header is None:
+            self.header, media = split_init_segment(chunk)
+            if media:
+                self.chunks.append(media)
+        else:
+            self.chunks.append(chunk)
+        self.pending += 1
+        if self.pending >= self.step_chunks:
+            return self._cut()
+        return None
+
+    def flush(self):
+        """Return the final window if any chunks arrived since the last one."""
+        if self.pending and self.header is not None:
+            return self._cut()
+        return None
+
+    def _cut(self):
+        self.pending = 0
+        self.seq += 1
+        return self.seq, self.header + b"".join(self.chunks)
+
+
+def merge_transcript(previous: str, window_text: str, max_overlap: int = 50):
+    """Append the part of ``window_text`` not already covered by ``previous``.
+
+    Consecutive windows overlap in time, so the new window's leading words
+    usually repeat the tail of the running transcript. Returns
+    ``(merged, new_text)``.
+    """
+    prev_words = previous.split()
+    new_words = window_text.split()
+    if not prev_words:
+        return window_text.strip(), window_text.strip()
+
+    def norm(words):
+        return [w.strip(".,!?;:").lower() for w in words]
+
+    tail = norm(prev_words[-max_overlap:])
+    head = norm(new_words[:max_overlap])
+    overlap = 0
+    # Longest suffix of the transcript that is a prefix of the window
+    for size in range(min(len(tail), len(head)), 0, -1):
+        if tail[-size:] == head[:size]:
+            overlap = size
+            break
+    if overlap == 0:
+        # Otherwise look for the tail's last words anywhere in the window
+        for size in range(min(len(tail), 8), 2, -1):
+            needle = tail[-size:]
+            for start in range(len(head) - size, -1, -1):
+                if head[start:start + size] == needle:
+                    overlap = start + size
+                    break
+            if overlap:
+                break
+
+    added = " ".join(new_words[overlap:])
+    if not added:
+        return previous, ""
+    return f"{previous} {added}", added
+
+
+async def put_latest(queue: asyncio.Queue, item) -> int:
+    """Enqueue ``item``, dropping the oldest waiting items if the queue is full.
+
+    Newer windows cover the audio of older ones, so a transcriber that falls
+    behind skips ahead instead of letting the backlog grow. Returns the
+    number of items dropped.
+    """
+    dropped = 0
+    while queue.full():
+        try:
+            queue.get_nowait()
+            queue.task_done()
+            dropped += 1
+        except asyncio.QueueEmpty:
+            break
+    await queue.put(item)
+    return dropped
@@ -0,0 +1,320 @@
+"""Gateway for every Groq call the app makes.
+
+Each call goes through, in order:
+  - single-flight: identical in-flight requests share one call
+  - a circuit breaker per model, which fails fast while the model keeps failing
+  - an optional token bucket per model (``LLM_RATE_LIMIT`` requests/second)
+  - the concurrency semaphore and timeout
+  - jittered exponential retries on rate limits, timeouts and 5xx errors
+  - fallback to a smaller model (``FALLBACK_MODELS``) once retries or the breaker give up
+
+The async functions are used by the API. ``run_sync`` lets threaded code
+such as the realtime CLI use them too. Point ``GROQ_BASE_URL`` at
+fake_services.py to exercise all of this offline.
+"""
+import asyncio
+import json
+import os
+import random
+import threading
+import time
+
+import groq
+from groq import AsyncGroq
+
+import metrics
+from cache import make_key
+
+# Max in-flight Groq calls per worker and the per-call timeout (seconds)
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "32"))
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "30"))
+# Requests per second allowed per model, with bursts of twice that; 0 turns the limit off
+LLM_RATE_LIMIT = float(os.getenv("LLM_RATE_LIMIT", "0"))
+# Retries after the first attempt, with full-jitter backoff from BASE doubling up to MAX seconds
+LLM_RETRIES = int(os.getenv("LLM_RETRIES", "2"))
+LLM_RETRY_BASE = float(os.getenv("LLM_RETRY_BASE", "0.5"))
+LLM_RETRY_MAX = float(os.getenv("LLM_RETRY_MAX", "8"))
+# A model's breaker opens after this many failed attempts in a row (timeouts, connection
+# errors, 5xx; not 429s), and then lets one call through per RESET seconds
+LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "5"))
+LLM_BREAKER_RESET = float(os.getenv("LLM_BREAKER_RESET", "30"))
+
+FALLBACK_MODELS = {"llama-3.3-70b-versatile": "llama-3.1-8b-instant"}
+
+# Failures worth retrying (or falling back on); anything else is the caller's bug
+RETRYABLE_ERRORS = (asyncio.TimeoutError, groq.RateLimitError, groq.APIConnectionError,
+                    groq.InternalServerError)
+
+metrics.registry.describe("llm_attempts_total", "LLM calls made, by model and outcome")
+metrics.registry.describe("llm_coalesced_total", "LLM requests served by an identical in-flight call")
+metrics.registry.describe("llm_fallbacks_total", "LLM requests answered by a fallback model")
+
+_client = None
+_semaphore = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+
+
+def get_client():
+    """Return the shared async Groq client, creating it on first use."""
+    global _client
+    if _client is None:
+        # Retries happen here, where they are counted and feed the breaker, not in the SDK
+        _client = AsyncGroq(api_key=os.getenv("GROQ_API_KEY"), timeout=LLM_TIMEOUT, max_retries=0)
+    return _client
+
+
+# ---------------- RATE LIMITING ---------------- #
+class TokenBucket:
+    """Allow ``rate`` acquisitions per second with bursts of up to ``capacity``."""
+
+    def __init__(self, rate: float, capacity: float = None):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        if self.capacity < 1:
+            raise ValueError("TokenBucket capacity must be at least 1, or nothing can be acquired")
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+# ---------------- CIRCUIT BREAKER ---------------- #
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling a model whose breaker is open."""
+
+
+class CircuitBreaker:
+    """Stop calling a model after ``failures`` failed attempts in a row.
+
+    While open, calls fail at once. Every ``reset`` seconds one call is let
+    through as a probe; its success closes the breaker, its failure keeps
+    it open for another ``reset`` seconds.
+    """
+
+    def __init__(self, failures: int = LLM_BREAKER_FAILURES, reset: float = LLM_BREAKER_RESET):
+        self.failures = failures
+        self.reset = reset
+        self.count = 0
+        self.opened = None
+
+    @property
+    def is_open(self) -> bool:
+        return self.opened is not None
+
+    def allow(self) -> bool:
+        if self.opened is None:
+            return True
+        now = time.monotonic()
+        if now - self.opened < self.reset:
+            return False
+        self.opened = now  # this call is the probe; the next one waits another period
+        return True
+
+    def success(self):
+        self.count = 0
+        self.opened = None
+
+    def failure(self):
+        self.count += 1
+        if self.count >= self.failures:
+            self.opened = time.monotonic()
+
+
+_buckets = {}
+_breakers = {}
+_inflight = {}
+
+
+def _bucket(model: str):
+    if LLM_RATE_LIMIT <= 0:
+        return None
+    if model not in _buckets:
+        # Under 0.5 requests/second a burst of twice the rate would be less than one request
+        _buckets[model] = TokenBucket(LLM_RATE_LIMIT, max(1.0, 2 * LLM_RATE_LIMIT))
+    return _buckets[model]
+
+
+def configure(rate_limit: float = None, retries: int = None):
+    """Override ``LLM_RATE_LIMIT`` / ``LLM_RETRIES`` for this process (None keeps the current value).
+
+    Buckets are created on first use with the rate of the time, so changing
+    the rate drops them and the next call builds one at the new rate.
+    """
+    global LLM_RATE_LIMIT, LLM_RETRIES
+    if rate_limit is not None and rate_limit != LLM_RATE_LIMIT:
+        LLM_RATE_LIMIT = float(rate_limit)
+        _buckets.clear()
+    if retries is not None:
+        LLM_RETRIES = int(retries)
+
+
+def breaker(model: str) -> CircuitBreaker:
+    if model not in _breakers:
+        _breakers[model] = CircuitBreaker()
+    return _breakers[model]
+
+
+def breaker_states() -> dict:
+    """{model: True if its breaker is open} for every model called so far."""
+    return {model: b.is_open for model, b in _breakers.items()}
+
+
+def _backoff(attempt: int, error: Exception) -> float:
+    delay = random.uniform(0, min(LLM_RETRY_MAX, LLM_RETRY_BASE * 2 ** attempt))
+    # Never retry sooner than a 429 asks us to
+    response = getattr(error, "response", None)
+    try:
+        delay = max(delay, float(response.headers.get("retry-after", 0)))
+    except (AttributeError, TypeError, ValueError):
+        pass
+    return min(delay, LLM_RETRY_MAX)
+
+
+async def _attempts(model: str, call):
+    """``call(model)`` with the model's breaker, rate limit and jittered retries."""
+    guard = breaker(model)
+    for attempt in range(LLM_RETRIES + 1):
+        if not guard.allow():
+            raise CircuitOpenError(f"{model} is failing; circuit open")
+        bucket = _bucket(model)
+        if bucket is not None:
+            await bucket.acquire()
+        try:
+            result = await call(model)
+        except RETRYABLE_ERRORS as e:
+            # A 429 means slow down, not down: back off without tripping the breaker
+            if not isinstance(e, groq.RateLimitError):
+                guard.failure()
+            metrics.registry.inc("llm_attempts_total", model=model, outcome=type(e).__name__)
+            if attempt == LLM_RETRIES or guard.is_open:
+                raise
+            await asyncio.sleep(_backoff(attempt, e))
+        except Exception:
+            # The model answered (e.g. 400 for a bad request) - it is up, the request is wrong
+            guard.success()
+            metrics.registry.inc("llm_attempts_total", model=model, outcome="rejected")
+            raise
+        else:
+            guard.success()
+            metrics.registry.inc("llm_attempts_total", model=model, outcome="ok")
+            return result
+
+
+async def _resilient(model: str, call):
+    """``_attempts`` on ``model``, then on its fallback if it stays unavailable."""
+    try:
+        return await _attempts(model, call)
+    except (CircuitOpenError,) + RETRYABLE_ERRORS:
+        fallback = FALLBACK_MODELS.get(model)
+        if fallback is None:
+            raise
+    metrics.registry.inc("llm_fallbacks_total", model=model, fallback=fallback)
+    return await _attempts(fallback, call)
+
+
+def _forget(key, future):
+    if _inflight.get(key) is future:
+        del _inflight[key]
+    # Mark the outcome as seen even if every waiter was cancelled
+    if not future.cancelled():
+        future.exception()
+
+
+async def _single_flight(key: str, factory):
+    """Await ``factory()``, sharing the call with any identical one already in flight."""
+    future = _inflight.get(key)
+    if future is None:
+        future = asyncio.ensure_future(factory())
+        _inflight[key] = future
+        future.add_done_callback(lambda f: _forget(key, f))
+    else:
+        metrics.registry.inc("llm_coalesced_total")
+    # One waiter giving up must not cancel the call for the others
+    return await asyncio.shield(future)
+
+
+async def _call(coro_factory, timeout):
+    async with _semaphore:
+        return await asyncio.wait_for(coro_factory(), timeout or LLM_TIMEOUT)
+
+
+# ---------------- PUBLIC API ---------------- #
+async def chat(model: str, messages: list, timeout: float = None, **kwargs):
+    """Run a chat completion without blocking the event loop."""
+    key = make_key("chat", model, json.dumps(messages, sort_keys=True),
+                   json.dumps(kwargs, sort_keys=True, default=str))
+    return await _single_flight(key, lambda: _resilient(model, lambda m: _call(
+        lambda: get_client().chat.completions.create(model=m, messages=messages, **kwargs),
+        timeout,
+    )))
+
+
+async def chat_text(model: str, messages: list, timeout: float = None, **kwargs) -> str:
+    """Run a chat completion and return the stripped message content."""
+    response = await chat(model, messages, timeout=timeout, **kwargs)
+    return (response.choices[0].message.content or "").strip()
+
+
+async def transcribe(file, model: str = "whisper-large-v3", timeout: float = None) -> str:
+    """Transcribe ``file`` (a file object or ``(name, bytes)`` tuple) with Whisper.
+
+    Only ``(name, bytes)`` uploads are coalesced and retried; a file object
+    can't be re-read.
+    """
+    def call(m):
+        return _call(lambda: get_client().audio.transcriptions.create(model=m, file=file), timeout)
+
+    if not (isinstance(file, tuple) and isinstance(file[1], (bytes, bytearray))):
+        transcription = await call(model)
+        return transcription.text
+    transcription = await _single_flight(make_key("transcribe", model, file[1]),
+                                         lambda: _resilient(model, call))
+    return transcription.text
+
+
+async def chat_stream(model: str, messages: list, timeout: float = None, **kwargs):
+    """Yield the completion's content as it is generated.
+
+    ``timeout`` bounds the wait for the stream to open; the concurrency slot
+    is held until the stream is exhausted or closed. Retries and fallback
+    apply to opening the stream only, never once text has been yielded.
+    """
+    async with _semaphore:
+        stream = await _resilient(model, lambda m: asyncio.wait_for(
+            get_client().chat.completions.create(model=m, messages=messages, stream=True, **kwargs),
+            timeout or LLM_TIMEOUT,
+        ))
+        try:
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        finally:
+            await stream.close()
+
+
+# ---------------- SYNC BRIDGE ---------------- #
+_loop = None
+_loop_lock = threading.Lock()
+
+
+def run_sync(coro, timeout: float = None):
+    """Run a gateway coroutine from a plain thread and return its result.
+
+    Every caller shares one background event loop, so the semaphore,
+    buckets, breakers and single-flight map are shared too.
+    """
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="llm-gateway", daemon=True).start()
+    return asyncio.run_coroutine_threadsafe(coro, _loop).result(timeout)
@@ -1,19 +1,34 @@
 from dotenv import load_dotenv
 load_dotenv()
 
-from fastapi import FastAPI, UploadFile, File
+from fastapi import FastAPI, UploadFile, File, WebSocket, WebSocketDisconnect
+from fastapi import Request
 from fastapi.middleware.cors import CORSMiddleware
-from groq import Groq
-from collections import defaultdict
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from datetime import datetime
+import asyncio
+import json
 import os
-import pandas as pd
-import shutil
-import tempfile
-
-# Google Sheets
-import gspread
-from google.oauth2.service_account import Credentials
+import time
+import uuid
+
+import llm
+import metrics
+import vad
+from sheet_logger import SheetLogger
+from sinks import make_sink
+from live_audio import AudioWindow, LIVE_MAX_CHUNK_BYTES, LIVE_MAX_PENDING, merge_transcript, put_latest
+from history_store import HistoryStore
+from sentiment import SENTIMENT_MODEL, SENTIMENT_PROMPT, classify_many, parse_result, split_sentences
+from recommendations import Recommender
+from customer_search import SEARCH_LIMIT, CustomerSearch
+from summary import summarize
+from sessions import SessionStore
+from sentiment_timeline import SentimentTimeline
+from analytics import ANALYTICS_RETENTION_SECONDS, Analytics
+from cache import make_key, normalize_text, sentiment_cache, transcription_cache
+from crm_store import CRMStore, normalize_email, normalize_phone
 
 app = FastAPI()
 
@@ -26,140 +41,317 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize Groq client
-client = Groq(api_key=os.getenv("GROQ_API_KEY"))
-
-# In-memory history + analytics
-conversation_history = []
-sentiment_counts = defaultdict(int)
-
-# Prompt template for sentiment
-SENTIMENT_PROMPT = """
-You are a sentiment detection engine.
-Analyze the following text and respond in this exact format:
+@app.middleware("http")
+async def time_requests(request: Request, call_next):
+    """Record end-to-end latency per route and collect per-stage timings for the request."""
+    metrics.begin_request()
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        metrics.registry.observe(
+            "http_request_seconds", time.perf_counter() - started,
+            route=getattr(route, "path", "unmatched"), method=request.method, status=status,
+        )
 
-Sentiment: Positive / Negative / Neutral
-Tone: Friendly / Upset / Angry / Polite / Neutral
-Explanation: Short plain explanation
 
-Text: "{}"
-"""
+# Conversation history (SQLite, shared by every worker) + analytics
+history = HistoryStore()
+analytics = Analytics(history.path)
 
-# ---------------- GOOGLE SHEETS SETUP ---------------- #
-SCOPES = ["https://www.googleapis.com/auth/spreadsheets"]
-creds = Credentials.from_service_account_file("cred.json", scopes=SCOPES)
-gs_client = gspread.authorize(creds)
+# ---------------- LOG SINKS (Google Sheets / CSV / SQLite / none) ---------------- #
+# Backend is picked with LOG_BACKEND; nothing connects until the first row is written
 
 # Sheet 1: Conversation transcript logging
-SHEET_ID = "1v0zVvH1nF4O-Kxr-WA91_Xj-vdOHsdQ7AS8iaSCsPvM"
-sheet = gs_client.open_by_key(SHEET_ID).sheet1
+SHEET_ID = os.getenv("SHEET_ID", "1v0zVvH1nF4O-Kxr-WA91_Xj-vdOHsdQ7AS8iaSCsPvM")
+sheet = make_sink("transcripts", SHEET_ID, ["Transcript", "Sentiment", "Tone", "Date"])
 
 # Sheet 2: AI Response logging
-SHEET2_ID = "1eattCsIt1yytAWgc8I3qWfqIuJ3cQYY_3jYsmaBYOhE"
-sheet_ai = gs_client.open_by_key(SHEET2_ID).sheet1
+SHEET2_ID = os.getenv("SHEET2_ID", "1eattCsIt1yytAWgc8I3qWfqIuJ3cQYY_3jYsmaBYOhE")
+sheet_ai = make_sink("ai_responses", SHEET2_ID, ["Name", "Email", "Query", "AI Response", "Date"])
+
+# Rows are batched and written from background threads, off the request path
+transcript_log = SheetLogger.from_env(sheet, name="transcripts")
+ai_response_log = SheetLogger.from_env(sheet_ai, name="ai_responses")
+
+
+@app.on_event("startup")
+def start_sheet_loggers():
+    transcript_log.start()
+    ai_response_log.start()
+
+
+@app.on_event("shutdown")
+def flush_sheet_loggers():
+    transcript_log.close()
+    ai_response_log.close()
+    sheet.close()
+    sheet_ai.close()
+    history.close()
+    analytics.close()
 # ----------------------------------------------------- #
 
-CRM_FILE = "crm_data.xlsx"  # Your CRM file
-
-def parse_result(result: str):
-    """Extract Sentiment, Tone, and Explanation from LLM output."""
-    sentiment, tone, explanation = "Neutral", "Neutral", ""
-    for line in result.split("\n"):
-        if line.lower().startswith("sentiment"):
-            sentiment = line.split(":", 1)[1].strip()
-        elif line.lower().startswith("tone"):
-            tone = line.split(":", 1)[1].strip()
-        elif line.lower().startswith("explanation"):
-            explanation = line.split(":", 1)[1].strip()
-    return sentiment, tone, explanation
-
-
-# ---------------- RECOMMENDATION HELPER ---------------- #
-def generate_recommendation(product: str):
-    """Generate complementary product recommendations instead of repeating same product."""
-    product_lower = product.lower()
-
-    mapping = {
-        "bag": ("Travel Pillow", "Since the customer bought a Bag, a Travel Pillow could be useful for comfort."),
-        "grocer": ("Snacks & Beverages", "Groceries often pair with snacks or beverages that customers may enjoy."),
-        "home essentials": ("Cleaning Supplies", "Home essentials buyers might also need reliable cleaning products."),
-        "kitchen": ("Cookware Set", "Kitchenware customers may also be interested in advanced cookware."),
-        "laptop": ("Laptop Bag", "Since they purchased a Laptop, a protective Laptop Bag could be helpful."),
-        "phone": ("Phone Case", "A Phone purchase often goes with a protective Case."),
-        "tablet": ("Tablet Stand", "A Tablet Stand could improve usability for a Tablet buyer."),
-        "shoes": ("Shoe Cleaner", "Customers buying Shoes may also want Shoe Cleaner or Care Kits.")
-    }
+CRM_FILE = os.getenv("CRM_FILE", "crm_data.xlsx")  # Your CRM file (.xlsx, .csv or .parquet)
+crm = CRMStore(CRM_FILE)
+recommender = Recommender()
+customer_search = CustomerSearch()
+crm.on_load(analytics.load_crm)
+crm.on_load(recommender.rebuild)
+crm.on_load(customer_search.rebuild)
+
+# Call sessions: the customer, recommendations, transcript and sentiment of each ongoing call
+sessions = SessionStore()
 
-    for key, (rec_name, rec_desc) in mapping.items():
-        if key in product_lower:
-            return rec_name, rec_desc
 
-    # Default fallback
-    return "Gift Voucher", f"A gift voucher could be a nice add-on for {product} buyers."
+def resolve_customer(session, email: str = "", phone: str = ""):
+    """CRM record for the call; a session's recommendations are reused until the record changes.
+
+    Without an email or phone, the session's earlier lookup is used.
+    """
+    if session is not None:
+        email = email or session.email
+        phone = phone or session.phone
+    if not email and not phone:
+        return None
+    with metrics.timer("crm_lookup"):
+        customer = crm.find(email=email, phone=phone)
+    if session is not None and customer is not None and customer is not session.customer:
+        session.set_customer(customer, recommender.for_customer(customer), email, phone)
+    return customer
+
+
+def recommendations_for(session, customer: dict) -> list:
+    if session is not None:
+        return session.recommendations
+    return recommender.for_customer(customer)
+
+
+@app.on_event("startup")
+def load_crm():
+    """Parse the CRM once up front instead of on every request."""
+    crm.load()
+
+
+@app.on_event("startup")
+def seed_analytics():
+    """Backfill the shared counters from the history DB the first time they are created."""
+    if analytics.is_empty():
+        cutoff = time.time() - ANALYTICS_RETENTION_SECONDS
+        analytics.seed(history.count_by_label(until=cutoff), history.events_since(cutoff))
+
+# ---------------- CACHED SENTIMENT / TRANSCRIPTION ---------------- #
+WHISPER_MODEL = "whisper-large-v3"
+
+
+async def classify_sentiment(text: str) -> str:
+    """Raw sentiment completion for ``text``, cached on (normalized text, model, prompt)."""
+    key = make_key(normalize_text(text), SENTIMENT_MODEL, SENTIMENT_PROMPT)
+    result = sentiment_cache.get(key)
+    if result is None:
+        with metrics.timer("sentiment"):
+            result = await llm.chat_text(
+                model=SENTIMENT_MODEL,
+                messages=[{"role": "user", "content": SENTIMENT_PROMPT.format(text)}],
+                temperature=0
+            )
+        sentiment_cache.set(key, result)
+    return result
+
+
+async def detect_sentiment(text: str):
+    """Classify ``text`` and return (sentiment, tone, explanation)."""
+    return parse_result(await classify_sentiment(text))
+
+
+async def transcribe_audio(filename: str, audio: bytes) -> str:
+    """Whisper transcript of ``audio``, cached on a hash of the raw bytes."""
+    key = make_key(audio, WHISPER_MODEL)
+    text = transcription_cache.get(key)
+    if text is None:
+        with metrics.timer("transcription"):
+            text = await llm.transcribe((filename, audio), model=WHISPER_MODEL)
+        transcription_cache.set(key, text)
+    return text
 
 
 # ---------------- AUDIO TRANSCRIPTION ---------------- #
+# Largest accepted upload; Groq's Whisper endpoint itself stops at 25 MB
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(25 * 1024 * 1024)))
+UPLOAD_READ_SIZE = 64 * 1024
+
+
+async def read_upload(file: UploadFile, max_bytes: int) -> bytes:
+    """Read an upload into memory in chunks, refusing anything over ``max_bytes``."""
+    buf = bytearray()
+    while True:
+        chunk = await file.read(UPLOAD_READ_SIZE)
+        if not chunk:
+            return bytes(buf)
+        buf += chunk
+        if len(buf) > max_bytes:
+            raise ValueError(f"Upload exceeds {max_bytes} bytes")
+
+
 @app.post("/analyze-audio")
-async def analyze_audio(file: UploadFile = File(...)):
+async def analyze_audio(file: UploadFile = File(...), timings: bool = False):
     """Receive audio file, transcribe it, detect sentiment."""
     try:
-        # Save uploaded file temporarily
-        suffix = os.path.splitext(file.filename)[1] or ".webm"
-        with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as temp_file:
-            shutil.copyfileobj(file.file, temp_file)
-            temp_file_path = temp_file.name
+        # Read the upload straight into memory - no temp file to write, reopen or leak
+        started = time.perf_counter()
+        audio = await read_upload(file, MAX_UPLOAD_BYTES)
+        upload_metrics = {
+            "upload_bytes": len(audio),
+            "upload_ms": round((time.perf_counter() - started) * 1000, 2),
+        }
+        filename = os.path.basename(file.filename or "") or "recording.webm"
+
+        # Drop silent clips and cut long pauses before paying for Whisper (PCM WAV uploads)
+        vad_info = None
+        if vad.is_wav(audio):
+            try:
+                samples, rate = vad.read_wav(audio)
+                speech = vad.compact(samples, rate)
+            except Exception:
+                # Float, 24-bit or extensible WAVs that `wave` can't decode go to Whisper as they are
+                speech = None
+            if speech is not None:
+                vad_info = {
+                    "input_ms": int(len(samples) * 1000 / rate),
+                    "speech_ms": int(len(speech) * 1000 / rate),
+                }
+                if speech.size == 0:
+                    return {"text": "No speech detected.", "sentiment": "Neutral", "vad": vad_info, "metrics": upload_metrics}
+                audio = vad.to_wav_bytes(speech, rate)
 
         # Transcribe using Groq Whisper
-        with open(temp_file_path, "rb") as f:
-            transcription = client.audio.transcriptions.create(
-                model="whisper-large-v3",
-                file=f
-            )
+        text = (await transcribe_audio(filename, audio)).strip()
 
-        text = transcription.text.strip()
         if not text:
             text = "No transcription."
 
         # Sentiment detection
-        response = client.chat.completions.create(
-            model="llama-3.1-8b-instant",
-            messages=[{"role": "user", "content": SENTIMENT_PROMPT.format(text)}],
-            temperature=0
-        )
-        sentiment = response.choices[0].message.content.strip()
+        sentiment = await classify_sentiment(text)
 
-        # Clean up temp file
-        os.remove(temp_file_path)
-
-        return {"text": text, "sentiment": sentiment}
+        result = {"text": text, "sentiment": sentiment, "metrics": upload_metrics}
+        if timings:
+            result["timings"] = metrics.request_timings()
+        if vad_info:
+            result["vad"] = vad_info
+        return result
 
     except Exception as e:
         return {"text": "No transcription.", "sentiment": "Neutral", "error": str(e)}
+    finally:
+        await file.close()
+
+
+@app.websocket("/ws/analyze-audio")
+async def analyze_audio_stream(websocket: WebSocket):
+    """Live transcription over timesliced recorder chunks.
+
+    The client sends binary audio chunks and finally the text message "stop".
+    The server replies with JSON messages:
+      {"type": "partial", "seq", "text", "transcript"}  - after each window
+      {"type": "sentiment", "seq", "sentiment", "tone", "explanation", "score", "state"}
+      {"type": "shift", "from", "to", "score", "index", "ts", "text"}  - smoothed sentiment changed
+      {"type": "error", "seq", "error"}                   - a window's transcription or sentiment failed
+      {"type": "final", "transcript", "dropped"}          - after "stop"
+
+    Connect with ``?session_id=`` from /get_customer to keep the transcript and
+    sentiment on that call session.
+    """
+    await websocket.accept()
+    session = sessions.get(websocket.query_params.get("session_id"))
+    timeline = session.timeline if session is not None else SentimentTimeline()
+    window = AudioWindow()
+    windows = asyncio.Queue(maxsize=LIVE_MAX_PENDING)
+    state = {"transcript": "", "dropped": 0}
+
+    async def transcriber():
+        while True:
+            item = await windows.get()
+            try:
+                if item is None:
+                    return
+                seq, audio = item
+                try:
+                    text = (await transcribe_audio(f"live-{seq}.webm", audio)).strip()
+                except Exception as e:
+                    await websocket.send_json({"type": "error", "seq": seq, "error": str(e)})
+                    continue
+                state["transcript"], new_text = merge_transcript(state["transcript"], text)
+                if session is not None:
+                    session.live_transcript = state["transcript"]
+                await websocket.send_json({
+                    "type": "partial", "seq": seq, "text": text, "transcript": state["transcript"],
+                })
+                # Only the words this window added need classifying
+                if new_text:
+                    try:
+                        sentiment, tone, explanation = await detect_sentiment(new_text)
+                    except Exception as e:
+                        await websocket.send_json({"type": "error", "seq": seq, "error": str(e)})
+                        continue
+                    shift = timeline.add(sentiment, tone, new_text)
+                    await websocket.send_json({
+                        "type": "sentiment", "seq": seq, "sentiment": sentiment,
+                        "tone": tone, "explanation": explanation,
+                        "score": round(timeline.score, 3), "state": timeline.state,
+                    })
+                    if shift:
+                        await websocket.send_json(shift)
+            finally:
+                windows.task_done()
+
+    worker = asyncio.ensure_future(transcriber())
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            chunk = message.get("bytes")
+            if chunk:
+                if len(chunk) > LIVE_MAX_CHUNK_BYTES:
+                    await websocket.send_json({"type": "error", "error": "Audio chunk too large"})
+                    continue
+                ready = window.add(chunk)
+                if ready:
+                    state["dropped"] += await put_latest(windows, ready)
+            elif message.get("text") == "stop":
+                ready = window.flush()
+                if ready:
+                    state["dropped"] += await put_latest(windows, ready)
+                await windows.put(None)
+                await worker
+                await websocket.send_json({
+                    "type": "final", "transcript": state["transcript"] or "No transcription.",
+                    "dropped": state["dropped"],
+                })
+                await websocket.close()
+                break
+    except WebSocketDisconnect:
+        pass
+    finally:
+        worker.cancel()
 
 
 # ---------------- CRM ---------------- #
 @app.post("/get_customer")
 async def get_customer(data: dict):
-    """Fetch customer details from CRM by email or phone."""
-    email = data.get("email", "").strip().lower()
-    phone = data.get("phone", "").strip().replace(" ", "").replace("-", "")
-    if not email and not phone:
+    """Fetch customer details from CRM by email or phone, and open a call session for them."""
+    email = normalize_email(data.get("email", ""))
+    phone = normalize_phone(data.get("phone", ""))
+    if not email and not phone and sessions.get(data.get("session_id")) is None:
         return {"error": "Email or phone is required"}, 400
     try:
-        df = pd.read_excel(CRM_FILE)
-
-        # Lookup by email first
-        customer = None
-        if email:
-            customer_row = df[df["Email"].str.lower().str.strip() == email]
-            if not customer_row.empty:
-                customer = customer_row.iloc[0].to_dict()
-        # Lookup by phone if email not found or not provided
-        if not customer and phone:
-            df["PhoneClean"] = df["Phone"].astype(str).str.replace(" ", "").str.replace("-", "")
-            customer_row = df[df["PhoneClean"] == phone]
-            if not customer_row.empty:
-                customer = customer_row.iloc[0].to_dict()
+        # Continue the caller's session if it is still live, otherwise start one
+        session = sessions.open(data.get("session_id"))
+        # Lookup by email first, then by phone
+        customer = resolve_customer(session, email, phone)
 
         if not customer:
             return {"error": "Customer not found"}, 404
@@ -173,37 +365,159 @@ async def get_customer(data: dict):
             "Query": customer.get("Call Feedback", "—"),
             "PreviousPurchases": customer.get("Previous Purchases", "—"),
             "Notes": customer.get("Notes", "—"),
+            "Recommendations": session.recommendations,
+            "session_id": session.id,
         }
+        if data.get("timings"):
+            customer_data["timings"] = metrics.request_timings()
         return customer_data
     except Exception as e:
         return {"error": str(e)}, 500
 
 
+@app.get("/search_customers")
+async def search_customers(q: str = "", limit: int = SEARCH_LIMIT):
+    """Best matches for a partial or misspelt name, email, phone (prefix or suffix) or invoice."""
+    if not q.strip():
+        return {"error": "q is required"}, 400
+    with metrics.timer("customer_search"):
+        results = customer_search.search(q, limit)
+    return {"query": q, "results": results}
+
+
 # ---------------- AI RESPONSE ---------------- #
+# Results of `defer_sentiment` requests live in history.db, so the follow-up GET can
+# land on any worker; only the newest are kept. The tasks themselves are per-process
+MAX_DEFERRED_RESULTS = 1000
+deferred_tasks = {}
+
+
+def build_reply_prompt(customer_info: dict, text: str) -> str:
+    customer_text = f"Customer Name: {customer_info['Name']}, Product: {customer_info['Product']}"
+    return f"""
+        You are a polite, soft, friendly AI Sales Assistant.
+        {customer_text}
+        Customer Query: "{text}"
+        Respond in a helpful, soft, friendly, and polite manner.
+        """
+
+
+def analysis_result(customer_info: dict, text: str, ai_response: str, recommendations: list) -> dict:
+    """The /analyze-text response body, with sentiment still pending."""
+    timestamp = datetime.now().strftime("%d/%m/%Y, %I:%M:%S %p")
+    return {
+        "Name": customer_info.get("Name", "Unknown"),
+        "Product": customer_info.get("Product", "—"),
+        "Email": customer_info.get("Email", "—"),
+        "Phone": customer_info.get("Phone", "—"),
+        "Query": text,
+        "ai_response": ai_response,
+        "sentiment": "Pending",
+        "tone": "Pending",
+        "explanation": "",
+        "timestamp": timestamp,
+        "Recommendations": recommendations
+    }
+
+
+REPLY_MODEL = "llama-3.1-8b-instant"
+
+
+async def generate_reply(prompt: str) -> str:
+    """Generate the sales assistant reply for a prepared prompt."""
+    with metrics.timer("reply"):
+        return await llm.chat_text(
+            model=REPLY_MODEL,
+            messages=[{"role": "user", "content": prompt}],
+            temperature=0.7
+        )
+
+
+def save_analysis(return_data: dict):
+    """Add an analysis to the history and the analytics counters (blocking)."""
+    history.add(return_data)
+    analytics.record(return_data["sentiment"], return_data["tone"])
+
+
+async def record_analysis(customer_info: dict, return_data: dict, session=None):
+    """Log a finished analysis to the sheets, history, analytics and the call's sentiment timeline."""
+    text = return_data["Query"]
+    sentiment = return_data["sentiment"]
+    timestamp = return_data["timestamp"]
+    if session is not None:
+        # The shift (if any) this utterance caused in the call's smoothed sentiment
+        return_data["shift"] = session.add_sentiment(text, sentiment, return_data["tone"])
+
+    # Log to conversation sheet
+    transcript_log.log([text, sentiment, return_data["tone"], timestamp])
+
+    # Log to AI response sheet
+    ai_response_log.log([
+        customer_info.get("Name", ""),
+        customer_info.get("Email", ""),
+        text,
+        return_data["ai_response"],
+        timestamp
+    ])
+
+    # Save history & analytics; history.db is shared, so another worker's write lock
+    # can hold the writes up, and that wait must not block the event loop
+    await run_in_threadpool(save_analysis, return_data)
+
+
+async def _remember_deferred(request_id: str, result: dict):
+    await run_in_threadpool(history.save_deferred, request_id, result, MAX_DEFERRED_RESULTS)
+
+
+async def _finish_deferred(request_id, result, sentiment_task, customer_info, session=None):
+    try:
+        try:
+            sentiment, tone, explanation = await sentiment_task
+            result.update(sentiment=sentiment, tone=tone, explanation=explanation)
+            await record_analysis(customer_info, result, session)
+        except Exception as e:
+            result.update(sentiment="Neutral", tone="Neutral", error=str(e))
+        await _remember_deferred(request_id, result)
+    finally:
+        deferred_tasks.pop(request_id, None)
+
+
+@app.get("/analyze-text/{request_id}")
+async def get_deferred_analysis(request_id: str):
+    """Return the full result of an `/analyze-text` call made with `defer_sentiment`."""
+    result = await run_in_threadpool(history.deferred, request_id)
+    if result is None:
+        return {"error": "Unknown request id"}, 404
+    return result
+
+
 @app.post("/analyze-text")
 async def analyze_text(data: dict):
-    """Fetch query from CRM if not provided and generate AI response."""
-    email = data.get("email", "").strip().lower()
-    phone = data.get("phone", "").strip().replace(" ", "").replace("-", "")
+    """Fetch query from CRM if not provided and generate AI response.
+
+    With a `session_id` from `/get_customer`, email/phone may be left out;
+    the customer and recommendations come from the session, and the text
+    and its sentiment are added to the call's transcript and timeline.
+    Without one nothing is kept between requests.
+    """
+    email = normalize_email(data.get("email", ""))
+    phone = normalize_phone(data.get("phone", ""))
     text = data.get("text", "").strip()
 
-    if not email and not phone:
+    if not email and not phone and sessions.get(data.get("session_id")) is None:
         return {"error": "Email or phone is required"}, 400
 
     try:
-        df = pd.read_excel(CRM_FILE)
-
-        # Lookup by email or phone
-        customer_row = None
-        if email:
-            customer_row = df[df["Email"].str.lower().str.strip() == email]
-        if (customer_row is None or customer_row.empty) and phone:
-            df["PhoneClean"] = df["Phone"].astype(str).str.replace(" ", "").str.replace("-", "")
-            customer_row = df[df["PhoneClean"] == phone]
-        if customer_row.empty:
+        # Lookup by email or phone, or reuse the session's customer
+        session = sessions.get(data.get("session_id"))
+        customer_info = resolve_customer(session, email, phone)
+        if not customer_info:
             return {"error": "Customer not found"}, 404
 
-        customer_info = customer_row.iloc[0].to_dict()
+        # Only what the customer actually said belongs in the call transcript
+        said = bool(text)
+        if said and session is not None:
+            session.add_turn(text)
 
         # Use stored Call Feedback if text is empty
         if not text:
@@ -212,91 +526,174 @@ async def analyze_text(data: dict):
             text = "No query provided by customer."
 
         # Construct AI prompt
-        customer_text = f"Customer Name: {customer_info['Name']}, Product: {customer_info['Product']}"
-        PROMPT = f"""
-        You are a polite, soft, friendly AI Sales Assistant.
-        {customer_text}
-        Customer Query: "{text}"
-        Respond in a helpful, soft, friendly, and polite manner.
-        """
+        PROMPT = build_reply_prompt(customer_info, text)
+
+        # Sentiment and the sales reply don't depend on each other - run both at once
+        sentiment_task = asyncio.ensure_future(detect_sentiment(text))
+        reply_task = asyncio.ensure_future(generate_reply(PROMPT))
+
+        try:
+            ai_response = await reply_task
+        except Exception:
+            sentiment_task.cancel()
+            raise
+
+        return_data = analysis_result(customer_info, text, ai_response, recommendations_for(session, customer_info))
+        if session is not None:
+            return_data["session_id"] = session.id
+
+        # Optionally hand the reply back now and finish sentiment in the background
+        if data.get("defer_sentiment"):
+            request_id = uuid.uuid4().hex
+            return_data["request_id"] = request_id
+            pending = dict(return_data)
+            # Stored before replying, so a GET on another worker already finds it
+            await _remember_deferred(request_id, pending)
+            deferred_tasks[request_id] = asyncio.ensure_future(
+                _finish_deferred(request_id, pending, sentiment_task, customer_info, session if said else None)
+            )
+            return return_data
 
-        # Sentiment detection
-        response = client.chat.completions.create(
-            model="llama-3.1-8b-instant",
-            messages=[{"role": "user", "content": SENTIMENT_PROMPT.format(text)}],
-            temperature=0
-        )
-        sentiment, tone, explanation = parse_result(response.choices[0].message.content.strip())
+        sentiment, tone, explanation = await sentiment_task
+        return_data.update(sentiment=sentiment, tone=tone, explanation=explanation)
+        await record_analysis(customer_info, return_data, session if said else None)
+        if data.get("timings"):
+            return_data = {**return_data, "timings": metrics.request_timings()}
+        return return_data
 
-        # Generate AI response
-        ai_response = client.chat.completions.create(
-            model="llama-3.1-8b-instant",
-            messages=[{"role": "user", "content": PROMPT}],
-            temperature=0.7
-        ).choices[0].message.content.strip()
-
-        # Product Recommendations based on previous purchases
-        prev_products = customer_info.get("Previous Purchases", "")
-        recommendations = []
-        if prev_products and prev_products != "—":
-            prev_list = [p.strip() for p in prev_products.split(",")]
-            for p in prev_list:
-                rec_name, rec_desc = generate_recommendation(p)
-                recommendations.append({
-                    "name": rec_name,
-                    "desc": rec_desc
-                })
+    except Exception as e:
+        return {"error": str(e)}
 
-        timestamp = datetime.now().strftime("%d/%m/%Y, %I:%M:%S %p")
-
-        return_data = {
-            "Name": customer_info.get("Name", "Unknown"),
-            "Product": customer_info.get("Product", "—"),
-            "Email": customer_info.get("Email", "—"),
-            "Phone": customer_info.get("Phone", "—"),
-            "Query": text,
-            "ai_response": ai_response,
-            "sentiment": sentiment,
-            "tone": tone,
-            "explanation": explanation,
-            "timestamp": timestamp,
-            "Recommendations": recommendations
-        }
 
-        # Log to conversation sheet
-        sheet.append_row([text, sentiment, tone, timestamp])
+def sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
 
-        # Log to AI response sheet
-        sheet_ai.append_row([
-            customer_info.get("Name", ""),
-            customer_info.get("Email", ""),
-            text,
-            ai_response,
-            timestamp
-        ])
 
-        # Save history & analytics
-        conversation_history.append(return_data)
-        sentiment_counts[sentiment] += 1
+@app.post("/analyze-text/stream")
+async def analyze_text_stream(data: dict):
+    """Same as `/analyze-text`, but the reply is streamed as Server-Sent Events.
 
-        return return_data
+    Events, in order:
+      customer - customer info and recommendations, sent before the LLM is called
+      token    - {"text"} for each piece of the reply as it is generated
+      done     - the full `/analyze-text` result, once sentiment is in and logged
+      error    - {"error"} if the reply fails; no done event follows
+    """
+    email = normalize_email(data.get("email", ""))
+    phone = normalize_phone(data.get("phone", ""))
+    text = data.get("text", "").strip()
+
+    if not email and not phone and sessions.get(data.get("session_id")) is None:
+        return {"error": "Email or phone is required"}, 400
 
+    try:
+        session = sessions.get(data.get("session_id"))
+        customer_info = resolve_customer(session, email, phone)
     except Exception as e:
         return {"error": str(e)}
+    if not customer_info:
+        return {"error": "Customer not found"}, 404
+    recommendations = recommendations_for(session, customer_info)
+
+    said = bool(text)
+    if said and session is not None:
+        session.add_turn(text)
+    text = text or customer_info.get("Call Feedback", "") or "No query provided by customer."
+    prompt = build_reply_prompt(customer_info, text)
+    session_id = session.id if session is not None else None
+
+    async def events():
+        sentiment_task = asyncio.ensure_future(detect_sentiment(text))
+        try:
+            yield sse("customer", {
+                "Name": customer_info.get("Name", "Unknown"),
+                "Product": customer_info.get("Product", "—"),
+                "Email": customer_info.get("Email", "—"),
+                "Phone": customer_info.get("Phone", "—"),
+                "Query": text,
+                "Recommendations": recommendations,
+                "session_id": session_id,
+            })
+
+            parts = []
+            started = time.perf_counter()
+            try:
+                with metrics.timer("reply"):
+                    async for piece in llm.chat_stream(
+                        model=REPLY_MODEL,
+                        messages=[{"role": "user", "content": prompt}],
+                        temperature=0.7
+                    ):
+                        if not parts:
+                            metrics.registry.observe("stage_seconds", time.perf_counter() - started,
+                                                     stage="reply_first_token")
+                        parts.append(piece)
+                        yield sse("token", {"text": piece})
+            except Exception as e:
+                yield sse("error", {"error": str(e)})
+                return
+
+            # The reply is out; sentiment and logging finish behind it
+            return_data = analysis_result(customer_info, text, "".join(parts).strip(), recommendations)
+            if session is not None:
+                return_data["session_id"] = session.id
+            try:
+                sentiment, tone, explanation = await sentiment_task
+                return_data.update(sentiment=sentiment, tone=tone, explanation=explanation)
+                await record_analysis(customer_info, return_data, session if said else None)
+            except Exception as e:
+                return_data.update(sentiment="Neutral", tone="Neutral", error=str(e))
+            yield sse("done", return_data)
+        finally:
+            sentiment_task.cancel()
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+# ---------------- BATCH SENTIMENT ---------------- #
+MAX_BATCH_TEXTS = int(os.getenv("MAX_BATCH_TEXTS", "1000"))
+
+
+@app.post("/analyze-batch")
+async def analyze_batch(data: dict):
+    """Classify many utterances in a few packed LLM calls.
+
+    Send either {"texts": [...]} or {"transcript": "..."} to classify a
+    transcript sentence by sentence. Texts that could not be classified come
+    back with null sentiment, tone and explanation and an "error".
+    """
+    texts = data.get("texts")
+    if texts is None and data.get("transcript"):
+        texts = split_sentences(data["transcript"])
+    if not isinstance(texts, list) or not texts:
+        return {"error": "texts (list) or transcript is required"}, 400
+    if len(texts) > MAX_BATCH_TEXTS:
+        return {"error": f"At most {MAX_BATCH_TEXTS} texts per request"}, 400
 
+    try:
+        texts = [str(t) for t in texts]
+        results, calls = await classify_many(texts, cache=sentiment_cache)
+        items = []
+        for text, result in zip(texts, results):
+            if result is None:
+                items.append({"text": text, "sentiment": None, "tone": None, "explanation": None,
+                              "error": "Sentiment could not be classified"})
+            else:
+                sentiment, tone, explanation = result
+                items.append({"text": text, "sentiment": sentiment, "tone": tone, "explanation": explanation})
+        return {
+            "results": items,
+            "llm_calls": calls,
+            "failed": sum(result is None for result in results),
+        }
+    except Exception as e:
+        return {"error": str(e)}
 
-# ---------------- POST-CALL SUMMARY ---------------- #
-# ---------------- POST-CALL SUMMARY ---------------- #
-@app.post("/generate-summary")
-async def generate_summary(payload: dict):
-    transcript = payload.get("transcript", "")
-    sentiment = payload.get("sentiment", "Not provided")
-    customer = payload.get("customer", "Unknown")
 
-    # ✅ Always handle empty transcript gracefully
-    if not transcript.strip():
-        return {
-            "summary": f"""Post-Call Summary: {customer}  
+# ---------------- POST-CALL SUMMARY ---------------- #
+def fallback_summary(customer: str, sentiment: str, purchases: str = "Not mentioned") -> str:
+    return f"""Post-Call Summary: {customer}  
 Date of Call: Not specified  
 Customer: {customer} - Unknown Industry  
 Overall Sentiment: {sentiment}  
@@ -304,81 +701,101 @@ Key Topics:
 - Budget: Not mentioned  
 - Phone Requirements: Not mentioned  
 - Battery Life: Not mentioned  
-- Previous Purchases: Not mentioned"""
-        }
-
-    # ✅ Prevent token overflow (truncate if huge)
-    MAX_CHARS = 5000
-    if len(transcript) > MAX_CHARS:
-        transcript = transcript[:MAX_CHARS] + " ... [transcript truncated]"
-
-    try:
-        client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+- Previous Purchases: {purchases}"""
 
-        prompt = f"""
-You are an AI assistant that generates professional **Post-Call Summaries**.
 
-Transcript:
-{transcript}
-
-Format the summary exactly like this:
+@app.post("/generate-summary")
+async def generate_summary(payload: dict):
+    """Post-call summary; with a `session_id`, missing fields come from the call session.
+
+    The session supplies the customer, their previous purchases from the
+    CRM, the running transcript and the overall sentiment of the call.
+    """
+    session = sessions.get(payload.get("session_id"))
+    record = session.customer if session is not None and session.customer else {}
+    customer = payload.get("customer") or record.get("Name") or "Unknown"
+    if isinstance(customer, dict):
+        customer = customer.get("Name") or record.get("Name") or "Unknown"
+    transcript = payload.get("transcript", "") or (session.transcript if session is not None else "")
+    sentiment = payload.get("sentiment") or (
+        session.overall_sentiment() if session is not None else "Not provided")
+    purchases = record.get("Previous Purchases")
+    purchases = None if purchases in (None, "", "—", "None") else str(purchases)
 
-Post-Call Summary: {customer}  
-Date of Call: [Insert Date of Call Here]  
-Customer: {customer} - [Industry if found]  
-Overall Sentiment: {sentiment}  
-Key Topics:  
-- Budget: [Budget Info if found, else "Not mentioned"]  
-- Phone Requirements: [Requirements Info if found, else "Not mentioned"]  
-- Battery Life: [Battery-related Info if found, else "Not mentioned"]  
-- Previous Purchases: [Mention past purchases if available]
-"""
-
-        response = client.chat.completions.create(
-            model="llama-3.3-70b-versatile",  # ✅ faster, reliable
-            messages=[
-                {"role": "system", "content": "You are a helpful assistant for call center summaries."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.3,
-            max_tokens=600,
-        )
+    # ✅ Always handle empty transcript gracefully
+    if not transcript.strip():
+        return {"summary": fallback_summary(customer, sentiment, purchases or "Not mentioned")}
 
-        # ✅ Defensive check (avoid 'object not subscriptable' errors)
-        summary_text = (
-            response.choices[0].message.content.strip()
-            if response and response.choices and response.choices[0].message.content
-            else None
-        )
+    try:
+        # Long transcripts are chunked and summarized map-reduce style instead of truncated
+        with metrics.timer("summary"):
+            summary_text = await summarize(transcript, customer, sentiment, previous_purchases=purchases)
 
         if not summary_text:
-            summary_text = f"""Post-Call Summary: {customer}  
-Date of Call: Not specified  
-Customer: {customer} - Unknown Industry  
-Overall Sentiment: {sentiment}  
-Key Topics:  
-- Budget: Not mentioned  
-- Phone Requirements: Not mentioned  
-- Battery Life: Not mentioned  
-- Previous Purchases: Not mentioned"""
+            summary_text = fallback_summary(customer, sentiment, purchases or "Not mentioned")
 
-        return {"summary": summary_text}
+        result = {"summary": summary_text}
+        if payload.get("timings"):
+            result["timings"] = metrics.request_timings()
+        return result
 
     except Exception as e:
         return {"summary": f"Error generating summary: {str(e)}"}
 
 
+@app.get("/session/{session_id}")
+async def get_session(session_id: str):
+    """Customer, recommendations, transcript and sentiment timeline of a call session."""
+    session = sessions.get(session_id)
+    if session is None:
+        return {"error": "Unknown or expired session"}, 404
+    return session.to_dict()
 
 
 # ---------------- HISTORY & ANALYTICS ---------------- #
 @app.get("/history")
-async def get_history():
-    return conversation_history
+async def get_history(limit: int = 50, cursor: int = None, email: str = None,
+                      sentiment: str = None, since: str = None, until: str = None):
+    """Newest-first page of history; pass `next_cursor` back as `cursor` for the next page."""
+    try:
+        return history.page(limit=limit, cursor=cursor, email=email,
+                            sentiment=sentiment, since=since, until=until)
+    except ValueError as e:
+        return {"error": str(e)}, 400
 
 @app.get("/analytics")
-async def get_analytics():
-    total = sum(sentiment_counts.values())
+async def get_analytics(window: str = None):
+    """Sentiment/tone counts for a rolling window (15m, 1h, 24h, 7d ...) or all time."""
+    try:
+        result = await run_in_threadpool(analytics.window, window)
+    except ValueError as e:
+        return {"error": str(e)}, 400
+    result["crm"] = analytics.crm
+    return result
+
+
+@app.get("/cache-stats")
+async def get_cache_stats():
     return {
-        "total": total,
-        "distribution": dict(sentiment_counts)
+        "sentiment": sentiment_cache.stats(),
+        "transcription": transcription_cache.stats(),
     }
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Prometheus text exposition of stage latencies, errors, caches and log queues."""
+    caches = {"sentiment": sentiment_cache.stats(), "transcription": transcription_cache.stats()}
+    loggers = {"transcripts": transcript_log.stats, "ai_responses": ai_response_log.stats}
+    return metrics.registry.render({
+        "cache_hits": {(("cache", name),): stats["hits"] for name, stats in caches.items()},
+        "cache_misses": {(("cache", name),): stats["misses"] for name, stats in caches.items()},
+        "cache_size": {(("cache", name),): stats["size"] for name, stats in caches.items()},
+        "sheet_log_rows": {
+            (("log", name), ("outcome", outcome)): count
+            for name, stats in loggers.items() for outcome, count in stats.items()
+        },
+        "sheet_log_queue_depth": {(("log", name),): log.queue_depth() for name, log in
+                                  (("transcripts", transcript_log), ("ai_responses", ai_response_log))},
+        "llm_circuit_open": {(("model", model),): int(is_open) for model, is_open in llm.breaker_states().items()},
+    })
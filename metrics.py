@@ -0,0 +1,133 @@
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+METRIC_PREFIX = "sales_assistant"
+# Histogram bucket upper bounds in seconds
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Per-request {stage: ms} collected while a request is being handled
+_request_timings = contextvars.ContextVar("request_timings", default=None)
+
+
+class Histogram:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        for i, bound in enumerate(BUCKETS):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.sum += value
+        self.count += 1
+
+
+class Registry:
+    """Process-wide histograms and counters, rendered in Prometheus text format."""
+
+    def __init__(self):
+        self._histograms = {}
+        self._counters = {}
+        self._help = {}
+        self._lock = threading.Lock()
+
+    def describe(self, name: str, help_text: str):
+        self._help[name] = help_text
+
+    def observe(self, name: str, value: float, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def render(self, extra: dict = None) -> str:
+        """Prometheus exposition text; ``extra`` adds gauges as {name: {labels_tuple: value}}."""
+        lines = []
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+            counters = sorted(self._counters.items())
+
+        last = None
+        for (name, labels), h in histograms:
+            full = f"{METRIC_PREFIX}_{name}"
+            if name != last:
+                lines += [f"# HELP {full} {self._help.get(name, name)}", f"# TYPE {full} histogram"]
+                last = name
+            cumulative = 0
+            for bound, count in zip(BUCKETS, h.counts):
+                cumulative += count
+                lines.append(f"{full}_bucket{_labels(labels, le=bound)} {cumulative}")
+            lines.append(f"{full}_bucket{_labels(labels, le='+Inf')} {h.count}")
+            lines.append(f"{full}_sum{_labels(labels)} {h.sum:.6f}")
+            lines.append(f"{full}_count{_labels(labels)} {h.count}")
+
+        last = None
+        for (name, labels), value in counters:
+            full = f"{METRIC_PREFIX}_{name}"
+            if name != last:
+                lines += [f"# HELP {full} {self._help.get(name, name)}", f"# TYPE {full} counter"]
+                last = name
+            lines.append(f"{full}{_labels(labels)} {value}")
+
+        for name, series in (extra or {}).items():
+            full = f"{METRIC_PREFIX}_{name}"
+            lines += [f"# HELP {full} {self._help.get(name, name)}", f"# TYPE {full} gauge"]
+            for labels, value in series.items():
+                lines.append(f"{full}{_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def _labels(labels, **more) -> str:
+    items = list(labels) + list(more.items())
+    if not items:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"') for _, v in items)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(items, escaped)) + "}"
+
+
+registry = Registry()
+registry.describe("stage_seconds", "Time spent in each pipeline stage")
+registry.describe("stage_errors_total", "Exceptions raised by each pipeline stage")
+registry.describe("http_request_seconds", "End-to-end request handling time by route")
+
+
+@contextmanager
+def timer(stage: str):
+    """Time a block as ``stage``: histogram, error counter and per-request timings."""
+    started = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        registry.inc("stage_errors_total", stage=stage)
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        registry.observe("stage_seconds", elapsed, stage=stage)
+        timings = _request_timings.get()
+        if timings is not None:
+            timings[stage] = round(timings.get(stage, 0.0) + elapsed * 1000, 2)
+
+
+def begin_request() -> dict:
+    """Start collecting timings for the current request (call from middleware)."""
+    timings = {}
+    _request_timings.set(timings)
+    return timings
+
+
+def request_timings() -> dict:
+    """Stage timings (ms) recorded so far in the current request."""
+    return dict(_request_timings.get() or {})
@@ -1,79 +1,306 @@
-import pyaudio 
-import wave
-import os
+import argparse
 import threading
-from groq import Groq
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
-client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+import numpy as np
+
+import llm
+import vad
+from cache import make_key, normalize_text, sentiment_cache, transcription_cache
+from sentiment import SENTIMENT_MODEL, SENTIMENT_PROMPT, parse_result
+from sentiment_timeline import SentimentTimeline
 
 CHUNK = 1024
-FORMAT = pyaudio.paInt16
 CHANNELS = 1
 RATE = 16000
 RECORD_SECONDS = 5
-OUTPUT_FILE = "chunk.wav"
+BUFFER_SECONDS = 60
+WORKERS = 2
 
-SENTIMENT_PROMPT = """
-You are a sentiment detection engine.
-Classify the following text as Positive, Negative, or Neutral.
-Text: "{}"
-"""
+running = True
 
-running = True  
 
-def record_chunk(filename):
-    p = pyaudio.PyAudio()
-    stream = p.open(format=FORMAT, channels=CHANNELS, rate=RATE,
-                    input=True, frames_per_buffer=CHUNK)
-    print("Listening...")
-    frames = []
-    for _ in range(0, int(RATE / CHUNK * RECORD_SECONDS)):
-        data = stream.read(CHUNK)
-        frames.append(data)
-    stream.stop_stream()
-    stream.close()
-    p.terminate()
-
-    wf = wave.open(filename, 'wb')
-    wf.setnchannels(CHANNELS)
-    wf.setsampwidth(p.get_sample_size(FORMAT))
-    wf.setframerate(RATE)
-    wf.writeframes(b''.join(frames))
-    wf.close()
-
-def transcribe_audio(filename):
-    with open(filename, "rb") as f:
-        transcription = client.audio.transcriptions.create(
-            model="whisper-large-v3",
-            file=f
-        )
-    return transcription.text
+# ---------------- AUDIO SOURCES ---------------- #
+class MicSource:
+    """Microphone input; the PyAudio stream stays open for the whole session."""
+
+    def __init__(self, rate=RATE, chunk=CHUNK):
+        import pyaudio
+
+        self.rate = rate
+        self.chunk = chunk
+        self._pa = pyaudio.PyAudio()
+        self._stream = self._pa.open(format=pyaudio.paInt16, channels=CHANNELS, rate=rate,
+                                     input=True, frames_per_buffer=chunk)
+
+    def read(self):
+        data = self._stream.read(self.chunk, exception_on_overflow=False)
+        return np.frombuffer(data, dtype=np.int16)
+
+    def close(self):
+        self._stream.stop_stream()
+        self._stream.close()
+        self._pa.terminate()
+
+
+class NpySource:
+    """Replay samples from a .npy file (e.g. temp_audio.npy) as if from a microphone.
+
+    With ``realtime=False`` chunks are returned as fast as they are read,
+    which is what tests want. ``read()`` returns None once the file is used up.
+    """
+
+    def __init__(self, path, rate=RATE, chunk=CHUNK, realtime=True, loop=False):
+        self.samples = vad.to_int16(np.load(path))
+        self.rate = rate
+        self.chunk = chunk
+        self.realtime = realtime
+        self.loop = loop
+        self._pos = 0
+        self._next = time.monotonic()
+
+    def read(self):
+        if self._pos >= len(self.samples):
+            if not self.loop:
+                return None
+            self._pos = 0
+        data = self.samples[self._pos:self._pos + self.chunk]
+        self._pos += len(data)
+        if self.realtime:
+            self._next += len(data) / self.rate
+            delay = self._next - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        return data
+
+    def close(self):
+        pass
+
+
+# ---------------- RING BUFFER ---------------- #
+class RingBuffer:
+    """Preallocated int16 ring buffer addressed by absolute sample position."""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._data = np.zeros(capacity, dtype=np.int16)
+        self.written = 0
+        self.closed = False
+        self._cond = threading.Condition()
+
+    def write(self, samples):
+        with self._cond:
+            n = len(samples)
+            if n > self.capacity:
+                self.written += n - self.capacity
+                samples = samples[-self.capacity:]
+                n = self.capacity
+            start = self.written % self.capacity
+            first = min(n, self.capacity - start)
+            self._data[start:start + first] = samples[:first]
+            self._data[:n - first] = samples[first:]
+            self.written += n
+            self._cond.notify_all()
+
+    def close(self):
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+    def wait_for(self, position, timeout=None):
+        """Block until ``position`` samples have been written or the buffer is closed."""
+        with self._cond:
+            self._cond.wait_for(lambda: self.written >= position or self.closed, timeout)
+            return self.written
+
+    def read(self, start, end):
+        """Copy samples [start, end); data older than ``capacity`` has been overwritten."""
+        with self._cond:
+            start = max(start, self.written - self.capacity)
+            end = min(end, self.written)
+            if end <= start:
+                return np.empty(0, dtype=np.int16)
+            idx = np.arange(start, end) % self.capacity
+            return self._data[idx]
+
+
+# ---------------- TRANSCRIBE / CLASSIFY ---------------- #
+# Worker threads call the async gateway (retries, rate limits, breaker) through llm.run_sync
+def transcribe_audio(audio):
+    """Whisper transcript for in-memory WAV bytes."""
+    key = make_key(audio, "whisper-large-v3")
+    text = transcription_cache.get(key)
+    if text is None:
+        text = llm.run_sync(llm.transcribe(("chunk.wav", audio), model="whisper-large-v3"))
+        transcription_cache.set(key, text)
+    return text
 
 def detect_sentiment(text):
-    response = client.chat.completions.create(
-        model="llama-3.1-8b-instant",
-        messages=[{"role": "user", "content": SENTIMENT_PROMPT.format(text)}],
-        temperature=0
-    )
-    return response.choices[0].message.content.strip()
-
-def main():
-    global running
-    last_sentiment = None
-    while running:
-        record_chunk(OUTPUT_FILE)
+    """(sentiment, tone, explanation) for ``text``, with the API's prompt and parser."""
+    key = make_key(normalize_text(text), SENTIMENT_MODEL, SENTIMENT_PROMPT)
+    result = sentiment_cache.get(key)
+    if result is None:
+        result = llm.run_sync(llm.chat_text(
+            model=SENTIMENT_MODEL,
+            messages=[{"role": "user", "content": SENTIMENT_PROMPT.format(text)}],
+            temperature=0
+        ))
+        sentiment_cache.set(key, result)
+    return parse_result(result)
+
+
+# ---------------- PIPELINE ---------------- #
+class Pipeline:
+    """Capture -> segment -> (transcribe + classify) with no gaps in recording.
+
+    One capture thread keeps the source open and fills the ring buffer. The
+    segmenter cuts RECORD_SECONDS windows out of it, drops silence with VAD
+    and hands in-memory WAV bytes to a worker pool, so audio keeps being
+    captured while earlier chunks are still being transcribed. At most
+    ``workers * 2`` chunks are queued or in flight; past that new chunks are
+    dropped (counted in ``stats["dropped"]``) rather than piling up behind a
+    slow API. ``classify(text)`` returns ``(sentiment, tone, explanation)``.
+    Results are reported in capture order through ``on_result(text,
+    sentiment)`` and the parsed labels fed to ``self.timeline``; shifts in
+    the smoothed sentiment go to ``on_shift(event)``.
+    """
+
+    def __init__(self, source, transcribe=transcribe_audio, classify=detect_sentiment,
+                 on_result=None, on_shift=None, rate=RATE, chunk_seconds=RECORD_SECONDS,
+                 buffer_seconds=BUFFER_SECONDS, workers=WORKERS):
+        self.source = source
+        self.transcribe = transcribe
+        self.classify = classify
+        self.on_result = on_result or print_result
+        self.on_shift = on_shift or print_shift
+        self.timeline = SentimentTimeline()
+        self.rate = rate
+        self.window = int(rate * chunk_seconds)
+        self.ring = RingBuffer(int(rate * buffer_seconds))
+        self.pool = ThreadPoolExecutor(max_workers=workers)
+        self.pending = deque()
+        # One slot per chunk submitted and not yet reported
+        self._slots = threading.BoundedSemaphore(workers * 2)
+        self.stats = {"chunks": 0, "silent": 0, "transcribed": 0, "dropped": 0, "overruns": 0}
+        self._stats_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._has_pending = threading.Condition()
+        self._threads = []
+
+    def start(self):
+        for target, name in ((self._capture, "capture"), (self._segment, "segment"), (self._report, "report")):
+            t = threading.Thread(target=target, name=name, daemon=True)
+            t.start()
+            self._threads.append(t)
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def join(self):
+        for t in self._threads:
+            t.join()
+        self.pool.shutdown(wait=True)
+
+    def _count(self, stat):
+        with self._stats_lock:
+            self.stats[stat] += 1
+
+    def _capture(self):
         try:
-            text = transcribe_audio(OUTPUT_FILE)
-            if not text.strip():
+            while not self._stop.is_set():
+                data = self.source.read()
+                if data is None:
+                    break
+                self.ring.write(data)
+        finally:
+            self.source.close()
+            self.ring.close()
+
+    def _segment(self):
+        position = 0
+        while True:
+            written = self.ring.wait_for(position + self.window, timeout=0.5)
+            if written < position + self.window and not self.ring.closed:
+                continue
+            if written <= position:
+                break
+            if written - position > self.ring.capacity:
+                # This thread stalled for a whole buffer - skip to the oldest audio still held
+                self._count("overruns")
+                position = written - self.ring.capacity
+            end = min(position + self.window, written)
+            samples = self.ring.read(position, end)
+            position = end
+            self._count("chunks")
+            self._submit(samples)
+        with self._has_pending:
+            self.pending.append(None)
+            self._has_pending.notify()
+
+    def _submit(self, samples):
+        # Skip silent chunks entirely; otherwise send only the speech
+        if vad.is_silent(samples, self.rate):
+            self._count("silent")
+            return
+        # Workers are behind; drop this chunk instead of queueing without bound
+        if not self._slots.acquire(blocking=False):
+            self._count("dropped")
+            return
+        audio = vad.to_wav_bytes(vad.compact(samples, self.rate), self.rate)
+        future = self.pool.submit(self._process, audio)
+        with self._has_pending:
+            self.pending.append(future)
+            self._has_pending.notify()
+
+    def _process(self, audio):
+        text = self.transcribe(audio)
+        if not text.strip():
+            return None
+        self._count("transcribed")
+        return text, self.classify(text)
+
+    def _report(self):
+        while True:
+            with self._has_pending:
+                self._has_pending.wait_for(lambda: self.pending)
+                future = self.pending.popleft()
+            if future is None:
+                return
+            try:
+                result = future.result()
+            except Exception as e:
+                print("Error:", e)
                 continue
-            sentiment = detect_sentiment(text)
-            print(f" Text: {text}")
-            print(f" Sentiment: {sentiment}")
-            if last_sentiment and sentiment != last_sentiment:
-                print(f"⚠ Sentiment shift detected: {last_sentiment} → {sentiment}")
-            last_sentiment = sentiment
-        except Exception as e:
-            print("Error:", e)
+            finally:
+                self._slots.release()
+            if result:
+                text, (sentiment, tone, _) = result
+                self.on_result(text, sentiment)
+                shift = self.timeline.add(sentiment, tone, text)
+                if shift:
+                    self.on_shift(shift)
+
+
+def print_result(text, sentiment):
+    print(f" Text: {text}")
+    print(f" Sentiment: {sentiment}")
+
+
+def print_shift(event):
+    print(f"⚠ Sentiment shift detected: {event['from']} → {event['to']} (smoothed score {event['score']:+.2f})")
+
+
+def main(source=None):
+    global running
+    pipeline = Pipeline(source or MicSource()).start()
+    print("Listening...")
+    while running and any(t.is_alive() for t in pipeline._threads):
+        time.sleep(0.2)
+    pipeline.stop()
+    pipeline.join()
 
 def wait_for_stop():
     global running
@@ -81,7 +308,12 @@ def wait_for_stop():
     running = False
 
 if __name__ == "__main__":
-    t = threading.Thread(target=main)
+    parser = argparse.ArgumentParser(description="Live call transcription with sentiment.")
+    parser.add_argument("--replay", help="replay a .npy recording instead of the microphone")
+    args = parser.parse_args()
+
+    source = NpySource(args.replay) if args.replay else None
+    t = threading.Thread(target=main, args=(source,))
     t.start()
     wait_for_stop()
     t.join()
@@ -0,0 +1,157 @@
+import os
+import threading
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+RECOMMENDATION_COUNT = int(os.getenv("RECOMMENDATION_COUNT", "3"))
+# Neighbours kept per product in the co-purchase index
+NEIGHBOURS_PER_PRODUCT = 20
+# Up to this many distinct products a basket's contents fit in one int64 bitmask
+MAX_BITMASK_PRODUCTS = 62
+
+# Hand-written complements, used when the CRM has no co-purchase signal
+RULES = {
+    "bag": ("Travel Pillow", "Since the customer bought a Bag, a Travel Pillow could be useful for comfort."),
+    "grocer": ("Snacks & Beverages", "Groceries often pair with snacks or beverages that customers may enjoy."),
+    "home essentials": ("Cleaning Supplies", "Home essentials buyers might also need reliable cleaning products."),
+    "kitchen": ("Cookware Set", "Kitchenware customers may also be interested in advanced cookware."),
+    "laptop": ("Laptop Bag", "Since they purchased a Laptop, a protective Laptop Bag could be helpful."),
+    "phone": ("Phone Case", "A Phone purchase often goes with a protective Case."),
+    "tablet": ("Tablet Stand", "A Tablet Stand could improve usability for a Tablet buyer."),
+    "shoes": ("Shoe Cleaner", "Customers buying Shoes may also want Shoe Cleaner or Care Kits.")
+}
+
+
+def generate_recommendation(product: str):
+    """Generate complementary product recommendations instead of repeating same product."""
+    product_lower = product.lower()
+    for key, (rec_name, rec_desc) in RULES.items():
+        if key in product_lower:
+            return rec_name, rec_desc
+
+    # Default fallback
+    return "Gift Voucher", f"A gift voucher could be a nice add-on for {product} buyers."
+
+
+def split_products(value) -> list:
+    """'Books, Furniture' -> ['Books', 'Furniture']; blanks, '—' and 'None' give []."""
+    if not isinstance(value, str):
+        return []
+    return [p.strip() for p in value.split(",") if p.strip() and p.strip() not in ("—", "None")]
+
+
+class RecommendationIndex:
+    """Co-purchase statistics over every customer's basket, built once per CRM load.
+
+    A basket is the customer's ``Product`` plus their ``Previous Purchases``.
+    For each product we keep the products most often bought alongside it,
+    scored by confidence P(other | product). Recommendations for a set of
+    owned products sum those scores, skip what the customer already has,
+    and are memoized per product set.
+
+    Customers with the same basket contribute the same pairs, so pairs are
+    counted once per distinct basket (whatever order or repeats its
+    purchases were listed in) and weighted by how many customers have it. A CRM of millions of customers over a few products has only
+    a few hundred distinct baskets to pair up.
+    """
+
+    def __init__(self, neighbours: dict = None, popularity: dict = None):
+        self.neighbours = neighbours or {}
+        self.popularity = popularity or {}
+        self._recommend = lru_cache(maxsize=4096)(self._compute)
+
+    @classmethod
+    def build(cls, df: pd.DataFrame, per_product: int = NEIGHBOURS_PER_PRODUCT):
+        baskets = (
+            df["Product"].fillna("").astype(str)
+            + ","
+            + df["Previous Purchases"].fillna("").astype(str)
+        )
+        # Identical basket strings are split once; basket ids below index `customers`
+        basket_counts = baskets.value_counts(sort=False)
+        customers = basket_counts.to_numpy()
+        items = pd.Series(basket_counts.index).str.split(",").explode().str.strip()
+        items = items[(items != "") & (items != "—") & (items != "None")]
+        pairs = pd.DataFrame({"basket": items.index, "product": items.values}).drop_duplicates()
+        if pairs.empty:
+            return cls()
+
+        # One signature per basket: a bitmask of its products, or their sorted codes past 62
+        codes, uniques = pd.factorize(pairs["product"])
+        baskets = pairs["basket"].to_numpy()
+        if len(uniques) <= MAX_BITMASK_PRODUCTS:
+            signature = pd.Series(np.left_shift(1, codes.astype(np.int64)), index=baskets).groupby(level=0).sum()
+        else:
+            signature = pd.Series(codes, index=baskets).groupby(level=0).agg(
+                lambda c: ",".join(map(str, sorted(c))))
+        weights = pd.Series(customers[signature.index.to_numpy()], index=signature.to_numpy()).groupby(level=0).sum()
+
+        # Pair up one representative basket per signature, weighted by its customers
+        representatives = signature.drop_duplicates()
+        distinct = pairs[pairs["basket"].isin(representatives.index)].copy()
+        distinct["weight"] = distinct["basket"].map(representatives).map(weights).to_numpy()
+        popularity = distinct.groupby("product")["weight"].sum()
+        co = distinct.merge(distinct[["basket", "product"]], on="basket", suffixes=("", "_other"))
+        co = co[co["product"] != co["product_other"]]
+        counts = co.groupby(["product", "product_other"])["weight"].sum().rename("count").reset_index()
+        counts["score"] = counts["count"] / counts["product"].map(popularity)
+        counts = counts.sort_values(["product", "score", "count"], ascending=[True, False, False])
+
+        neighbours = {
+            product: list(zip(group["product_other"].head(per_product), group["score"].head(per_product)))
+            for product, group in counts.groupby("product", sort=False)
+        }
+        return cls(neighbours, popularity.to_dict())
+
+    def recommend(self, products, k: int = RECOMMENDATION_COUNT) -> list:
+        """Top-``k`` ``{"name", "desc"}`` recommendations for the products a customer owns."""
+        owned = frozenset(p for p in products if p)
+        return [dict(r) for r in self._recommend(owned, k)]
+
+    def _compute(self, owned: frozenset, k: int) -> tuple:
+        scores, anchors = {}, {}
+        for product in owned:
+            for other, score in self.neighbours.get(product, ()):
+                if other in owned:
+                    continue
+                scores[other] = scores.get(other, 0.0) + score
+                if score > anchors.get(other, ("", 0.0))[1]:
+                    anchors[other] = (product, score)
+
+        ranked = sorted(scores, key=lambda p: (-scores[p], -self.popularity.get(p, 0), p))
+        results, seen = [], set()
+        for other in ranked[:k]:
+            anchor = anchors[other][0]
+            seen.add(other)
+            results.append((("name", other),
+                            ("desc", f"Customers who bought {anchor} often also buy {other}.")))
+
+        # Fall back to the hand-written complements when co-purchase data runs out
+        for product in sorted(owned):
+            if len(results) >= k:
+                break
+            name, desc = generate_recommendation(product)
+            if name not in seen and name not in owned:
+                seen.add(name)
+                results.append((("name", name), ("desc", desc)))
+        return tuple(results)
+
+
+class Recommender:
+    """Holds the current index and swaps in a fresh one whenever the CRM reloads."""
+
+    def __init__(self):
+        self.index = RecommendationIndex()
+        self._lock = threading.Lock()
+
+    def rebuild(self, df: pd.DataFrame):
+        index = RecommendationIndex.build(df)
+        with self._lock:
+            self.index = index
+
+    def for_customer(self, customer: dict, k: int = RECOMMENDATION_COUNT) -> list:
+        products = split_products(customer.get("Previous Purchases"))
+        products += split_products(customer.get("Product"))
+        return self.index.recommend(products, k)
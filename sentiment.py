@@ -0,0 +1,181 @@
+# Sentiment prompt and parser shared by the API and the batch backfill
+import asyncio
+import os
+import re
+
+import llm
+import metrics
+from cache import make_key, normalize_text
+
+SENTIMENT_MODEL = "llama-3.1-8b-instant"
+
+# Prompt template for sentiment
+SENTIMENT_PROMPT = """
+You are a sentiment detection engine.
+Analyze the following text and respond in this exact format:
+
+Sentiment: Positive / Negative / Neutral
+Tone: Friendly / Upset / Angry / Polite / Neutral
+Explanation: Short plain explanation
+
+Text: "{}"
+"""
+
+
+def _parse_fields(text: str, result: dict):
+    """Pick Sentiment/Tone/Explanation out of one line, "|" separated or not."""
+    for part in text.split("|"):
+        if ":" not in part:
+            continue
+        name, value = part.split(":", 1)
+        name = name.strip().strip("*").strip().lower()
+        if name in ("sentiment", "tone", "explanation"):
+            result[name] = value.strip().strip("*").strip()
+
+
+def parse_result(result: str):
+    """Extract Sentiment, Tone, and Explanation from LLM output."""
+    fields = {}
+    for line in result.split("\n"):
+        _parse_fields(line, fields)
+    return fields.get("sentiment", "Neutral"), fields.get("tone", "Neutral"), fields.get("explanation", "")
+
+
+# ---------------- BATCH CLASSIFICATION ---------------- #
+BATCH_SENTIMENT_PROMPT = """
+You are a sentiment detection engine.
+Analyze each numbered text below independently. Respond with exactly one
+line per text, in the same order, in this exact format:
+
+<number>. Sentiment: Positive / Negative / Neutral | Tone: Friendly / Upset / Angry / Polite / Neutral | Explanation: Short plain explanation
+
+Texts:
+{}
+"""
+
+# Budget for one batched call: estimated prompt tokens in, max_tokens out per text
+BATCH_MAX_INPUT_TOKENS = int(os.getenv("BATCH_MAX_INPUT_TOKENS", "3000"))
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "40"))
+BATCH_OUTPUT_TOKENS_PER_ITEM = 40
+
+_ITEM_START = re.compile(r"^\s*[\[(]?(\d+)[\]).:\-]\s*(.*)$")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token for English)."""
+    return len(text) // 4 + 1
+
+
+def split_sentences(transcript: str) -> list:
+    return [s.strip() for s in _SENTENCE_END.split(transcript) if s.strip()]
+
+
+def build_batch_prompt(texts: list) -> str:
+    numbered = "\n".join(f'{i}. "{" ".join(t.split())}"' for i, t in enumerate(texts, 1))
+    return BATCH_SENTIMENT_PROMPT.format(numbered)
+
+
+def split_batches(texts: list, max_tokens: int = BATCH_MAX_INPUT_TOKENS,
+                  max_items: int = BATCH_MAX_ITEMS) -> list:
+    """Group texts into batches that fit the token budget, preserving order."""
+    overhead = estimate_tokens(BATCH_SENTIMENT_PROMPT)
+    batches, current, used = [], [], overhead
+    for text in texts:
+        cost = estimate_tokens(text) + 4
+        if current and (used + cost > max_tokens or len(current) >= max_items):
+            batches.append(current)
+            current, used = [], overhead
+        current.append(text)
+        used += cost
+    if current:
+        batches.append(current)
+    return batches
+
+
+def parse_batch_result(result: str, count: int) -> list:
+    """Parse numbered batch output into ``count`` (sentiment, tone, explanation) tuples.
+
+    Tolerates "1." / "1)" / "[1]" numbering, fields spread over several lines,
+    markdown bold and extra chatter. Items the model skipped come back as None.
+    """
+    parsed = {}
+    current = None
+    for line in result.split("\n"):
+        match = _ITEM_START.match(line)
+        if match and 1 <= int(match.group(1)) <= count:
+            current = parsed.setdefault(int(match.group(1)), {})
+            _parse_fields(match.group(2), current)
+        elif current is not None:
+            _parse_fields(line, current)
+
+    items = []
+    for i in range(1, count + 1):
+        fields = parsed.get(i)
+        if not fields or "sentiment" not in fields:
+            items.append(None)
+        else:
+            items.append((fields["sentiment"], fields.get("tone", "Neutral"), fields.get("explanation", "")))
+    return items
+
+
+async def _classify_batch(texts: list, model: str):
+    with metrics.timer("sentiment_batch"):
+        result = await llm.chat_text(
+            model=model,
+            messages=[{"role": "user", "content": build_batch_prompt(texts)}],
+            temperature=0,
+            max_tokens=BATCH_OUTPUT_TOKENS_PER_ITEM * len(texts) + 50,
+        )
+    return parse_batch_result(result, len(texts))
+
+
+async def classify_many(texts: list, model: str = SENTIMENT_MODEL, cache=None) -> tuple:
+    """Classify many utterances with as few LLM calls as the token budget allows.
+
+    Duplicates (after normalization) and cached texts are not sent again;
+    the remaining texts are packed into batches that run concurrently. Items
+    a batch fails to return (the call failed or the model skipped them) are
+    packed into fresh batches and tried once more; any still missing come
+    back as None rather than a made-up label. Returns ``(results, llm_calls)``.
+    """
+    keys = [make_key(normalize_text(t), model, BATCH_SENTIMENT_PROMPT) for t in texts]
+    known = {}
+    todo = {}
+    for key, text in zip(keys, texts):
+        if key in known or key in todo:
+            continue
+        cached = cache.get(key) if cache is not None else None
+        if cached is not None:
+            known[key] = cached
+        elif text.strip():
+            todo[key] = text
+        else:
+            known[key] = ("Neutral", "Neutral", "")
+
+    calls = 0
+    pending = list(todo.items())
+    for attempt in range(2):
+        if not pending:
+            break
+        batches = split_batches([text for _, text in pending])
+        calls += len(batches)
+        outputs = await asyncio.gather(*(_classify_batch(b, model) for b in batches),
+                                       return_exceptions=True)
+        missing, offset = [], 0
+        for batch, output in zip(batches, outputs):
+            for i in range(len(batch)):
+                key, text = pending[offset + i]
+                item = None if isinstance(output, BaseException) else output[i]
+                if item is None:
+                    missing.append((key, text))
+                else:
+                    known[key] = item
+                    if cache is not None:
+                        cache.set(key, item)
+            offset += len(batch)
+        pending = missing
+
+    for key, _ in pending:
+        known[key] = None
+    return [known[key] for key in keys], calls
@@ -0,0 +1,123 @@
+# Smoothed sentiment over a call, with structured shift events
+import os
+import time
+from collections import Counter, deque
+
+import numpy as np
+
+from analytics import Sentiment, normalize_sentiment
+
+# Classified chunks kept per call; older ones are overwritten in place
+TIMELINE_SIZE = int(os.getenv("SENTIMENT_TIMELINE_SIZE", "256"))
+# Weight of the newest chunk in the moving average
+SENTIMENT_SMOOTHING = float(os.getenv("SENTIMENT_SMOOTHING", "0.4"))
+# Hysteresis: the smoothed score must pass +-ENTER to become Positive/Negative,
+# and falls back to Neutral only once it is back inside +-EXIT
+SHIFT_ENTER = float(os.getenv("SENTIMENT_SHIFT_ENTER", "0.5"))
+SHIFT_EXIT = float(os.getenv("SENTIMENT_SHIFT_EXIT", "0.15"))
+MAX_SHIFTS = 100
+# Numeric value of each label for the moving average
+SCORES = {Sentiment.POSITIVE: 1.0, Sentiment.NEUTRAL: 0.0, Sentiment.NEGATIVE: -1.0}
+
+
+class SentimentTimeline:
+    """Per-chunk sentiment scores in a fixed-size ring, smoothed as they arrive.
+
+    Each chunk's result (a label or the raw model answer) is scored +1 / 0 / -1
+    and folded into an exponential moving average. The call's state only
+    changes when the average crosses the hysteresis thresholds, so a single
+    off chunk or a reworded answer no longer reads as a shift. Adding a
+    chunk is O(1) and returns the shift event it caused, if any:
+
+        {"type": "shift", "from", "to", "score", "index", "ts", "text"}
+    """
+
+    def __init__(self, size: int = TIMELINE_SIZE, alpha: float = SENTIMENT_SMOOTHING,
+                 enter: float = SHIFT_ENTER, exit: float = SHIFT_EXIT):
+        self.size = size
+        self.alpha = alpha
+        self.enter = enter
+        self.exit = exit
+        self.scores = np.zeros(size)
+        self.smoothed = np.zeros(size)
+        self.times = np.zeros(size)
+        self.labels = [None] * size
+        self.tones = [None] * size
+        self.texts = [None] * size
+        self.count = 0
+        self.score = 0.0
+        self.state = "Neutral"
+        self.shifts = deque(maxlen=MAX_SHIFTS)
+
+    def _next_state(self, score: float) -> str:
+        if self.state == "Positive" and score >= self.exit:
+            return "Positive"
+        if self.state == "Negative" and score <= -self.exit:
+            return "Negative"
+        if score >= self.enter:
+            return "Positive"
+        if score <= -self.enter:
+            return "Negative"
+        return "Neutral"
+
+    def add(self, sentiment: str, tone: str = "", text: str = "", ts: float = None):
+        """Record one classified chunk; returns a shift event or None."""
+        label = normalize_sentiment(sentiment)
+        raw = SCORES[label]
+        label = label.value
+        ts = time.time() if ts is None else ts
+        # The first chunk sets the starting point instead of shifting away from Neutral
+        first = self.count == 0
+        self.score = raw if first else self.alpha * raw + (1 - self.alpha) * self.score
+
+        i = self.count % self.size
+        self.scores[i], self.smoothed[i], self.times[i] = raw, self.score, ts
+        self.labels[i], self.tones[i], self.texts[i] = label, tone, text
+        self.count += 1
+
+        state = self._next_state(self.score)
+        if first or state == self.state:
+            self.state = state
+            return None
+        event = {
+            "type": "shift", "from": self.state, "to": state, "score": round(self.score, 3),
+            "index": self.count - 1, "ts": ts, "text": text,
+        }
+        self.state = state
+        self.shifts.append(event)
+        return event
+
+    def _order(self) -> np.ndarray:
+        """Ring slots of the chunks still held, oldest first."""
+        held = min(self.count, self.size)
+        return np.arange(self.count - held, self.count) % self.size
+
+    def majority(self, default: str = "Not provided") -> str:
+        """Most frequent label among the held chunks; ties go to the most recent."""
+        labels = [self.labels[i] for i in self._order()]
+        if not labels:
+            return default
+        counts = Counter(labels)
+        best = max(counts.values())
+        return next(label for label in reversed(labels) if counts[label] == best)
+
+    def points(self) -> list:
+        order = self._order().tolist()
+        start = self.count - len(order)
+        return [
+            {
+                "index": start + n, "ts": float(self.times[i]),
+                "sentiment": self.labels[i], "tone": self.tones[i], "text": self.texts[i],
+                "score": float(self.scores[i]), "smoothed": round(float(self.smoothed[i]), 3),
+            }
+            for n, i in enumerate(order)
+        ]
+
+    def to_dict(self) -> dict:
+        return {
+            "state": self.state,
+            "score": round(self.score, 3),
+            "count": self.count,
+            "points": self.points(),
+            "shifts": list(self.shifts),
+        }
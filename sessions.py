@@ -0,0 +1,107 @@
+# Per-call context: opened by /get_customer, then used by /analyze-text, the live audio
+# socket and /generate-summary
+import os
+import time
+import uuid
+from collections import deque
+
+from cache import TTLCache
+from sentiment_timeline import SentimentTimeline
+
+# Sessions idle for longer than this are dropped; every request that uses one resets the clock
+SESSION_TTL = float(os.getenv("SESSION_TTL", "1800"))
+MAX_SESSIONS = int(os.getenv("MAX_SESSIONS", "10000"))
+# Oldest turns are dropped past this, so one endless call can't grow without bound
+MAX_SESSION_EVENTS = 1000
+
+
+class CallSession:
+    """Everything learnt so far about one call.
+
+    ``customer`` is the CRM record itself. CRM records are shared and
+    replaced on every reload, so ``customer is not record`` is all it
+    takes to notice a different customer or a newer CRM.
+    """
+
+    def __init__(self, session_id: str):
+        self.id = session_id
+        self.created = time.time()
+        self.email = ""
+        self.phone = ""
+        self.customer = None
+        self.recommendations = []
+        self.turns = deque(maxlen=MAX_SESSION_EVENTS)  # analyzed customer utterances, in order
+        self.live_transcript = ""  # from /ws/analyze-audio, when the call is being recorded
+        self.timeline = SentimentTimeline()
+
+    def set_customer(self, customer: dict, recommendations: list, email: str = "", phone: str = ""):
+        self.customer = customer
+        self.recommendations = recommendations
+        self.email = email or self.email
+        self.phone = phone or self.phone
+
+    def add_turn(self, text: str):
+        self.turns.append(text)
+
+    def add_sentiment(self, text: str, sentiment: str, tone: str, ts: float = None):
+        """Add a classified utterance to the timeline; returns a shift event or None."""
+        return self.timeline.add(sentiment, tone, text, ts)
+
+    @property
+    def transcript(self) -> str:
+        """The recorded transcript if there is one, else the analyzed utterances."""
+        return self.live_transcript or "\n".join(self.turns)
+
+    def overall_sentiment(self, default: str = "Not provided") -> str:
+        """Most frequent sentiment so far; ties go to the most recent."""
+        return self.timeline.majority(default)
+
+    def to_dict(self) -> dict:
+        customer = self.customer or {}
+        return {
+            "session_id": self.id,
+            "created": self.created,
+            "customer": {
+                "Name": customer.get("Name"),
+                "Email": customer.get("Email"),
+                "Phone": customer.get("Phone"),
+                "PreviousPurchases": customer.get("Previous Purchases"),
+            } if self.customer else None,
+            "recommendations": self.recommendations,
+            "turns": list(self.turns),
+            "transcript": self.transcript,
+            "sentiment": self.timeline.to_dict(),
+            "overall_sentiment": self.overall_sentiment(),
+        }
+
+
+class SessionStore:
+    """Call sessions by id, evicted after ``ttl`` idle seconds or least recently used past ``maxsize``."""
+
+    def __init__(self, ttl: float = SESSION_TTL, maxsize: int = MAX_SESSIONS):
+        self._sessions = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    def get(self, session_id: str):
+        """The live session for ``session_id`` (its TTL restarted), or None."""
+        if not session_id:
+            return None
+        session_id = str(session_id)
+        session = self._sessions.get(session_id)
+        if session is not None:
+            self._sessions.set(session_id, session)
+        return session
+
+    def open(self, session_id: str = None) -> CallSession:
+        """The live session for ``session_id``, or a new one if it is unknown or expired.
+
+        New sessions always get a fresh random id; a client can only continue
+        a session the server handed out, never name its own.
+        """
+        session = self.get(session_id)
+        if session is None:
+            session = CallSession(uuid.uuid4().hex)
+            self._sessions.set(session.id, session)
+        return session
+
+    def __len__(self):
+        return len(self._sessions)
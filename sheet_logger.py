@@ -0,0 +1,189 @@
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class SheetLogger:
+    """Buffer rows in memory and write them to a worksheet in batches.
+
+    ``log()`` never touches the network: rows go onto a bounded queue and a
+    background thread flushes them with ``worksheet.append_rows`` once
+    ``batch_size`` rows are waiting or ``flush_interval`` seconds have passed.
+    Failed writes are retried with exponential backoff. When the queue is
+    full, rows are either dropped or spilled to a JSON-lines file
+    (``overflow="spill"``) and replayed after the next successful flush.
+
+    ``worksheet`` is anything with an ``append_rows(rows)`` method, so tests
+    can pass a local fake instead of a gspread worksheet.
+    """
+
+    def __init__(self, worksheet, name: str = "sheet", batch_size: int = 50,
+                 flush_interval: float = 2.0, max_queue: int = 10000,
+                 overflow: str = "drop", spill_path: str = None,
+                 max_retries: int = 5, backoff: float = 0.5):
+        if overflow not in ("drop", "spill"):
+            raise ValueError(f"Unknown overflow policy: {overflow}")
+        self.worksheet = worksheet
+        self.name = name
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow = overflow
+        self.spill_path = spill_path or f"{name}_spill.jsonl"
+        self.max_retries = max_retries
+        self.backoff = backoff
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._stop = threading.Event()
+        self._thread = None
+        self._write_lock = threading.Lock()
+        self._spill_lock = threading.Lock()
+        self.stats = {"logged": 0, "written": 0, "batches": 0, "retries": 0,
+                      "dropped": 0, "spilled": 0, "failed": 0}
+
+    @classmethod
+    def from_env(cls, worksheet, name: str):
+        """Build a logger using the SHEET_LOG_* environment settings."""
+        return cls(
+            worksheet,
+            name=name,
+            batch_size=int(os.getenv("SHEET_LOG_BATCH_SIZE", "50")),
+            flush_interval=float(os.getenv("SHEET_LOG_FLUSH_INTERVAL", "2")),
+            max_queue=int(os.getenv("SHEET_LOG_MAX_QUEUE", "10000")),
+            overflow=os.getenv("SHEET_LOG_OVERFLOW", "drop"),
+            spill_path=os.getenv("SHEET_LOG_SPILL_DIR") and os.path.join(
+                os.getenv("SHEET_LOG_SPILL_DIR"), f"{name}_spill.jsonl"),
+        )
+
+    # ---------------- producer side ---------------- #
+    def log(self, row: list) -> bool:
+        """Queue a row for writing. Returns False if it was dropped."""
+        self.stats["logged"] += 1
+        try:
+            self._queue.put_nowait(list(row))
+            return True
+        except queue.Full:
+            return self._overflow([row])
+
+    def _overflow(self, rows) -> bool:
+        if self.overflow == "spill":
+            try:
+                with self._spill_lock, open(self.spill_path, "a", encoding="utf-8") as f:
+                    for row in rows:
+                        f.write(json.dumps(row, default=str) + "\n")
+                self.stats["spilled"] += len(rows)
+                return True
+            except OSError:
+                pass
+        self.stats["dropped"] += len(rows)
+        return False
+
+    # ---------------- consumer side ---------------- #
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name=f"{self.name}-logger", daemon=True)
+            self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.is_set():
+            batch = self._take_batch()
+            if batch:
+                self._write(batch)
+
+    def _take_batch(self):
+        """Block for the first row, then gather more until full or the interval ends."""
+        try:
+            batch = [self._queue.get(timeout=self.flush_interval)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size and not self._stop.is_set():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _drain(self):
+        rows = []
+        while True:
+            try:
+                rows.append(self._queue.get_nowait())
+            except queue.Empty:
+                return rows
+
+    def _write(self, rows) -> bool:
+        with self._write_lock:
+            for start in range(0, len(rows), self.batch_size):
+                batch = rows[start:start + self.batch_size]
+                if not self._append_with_retry(batch):
+                    # The sheet is failing; don't retry the rest, spill (or count) every unwritten row
+                    unwritten = rows[start:]
+                    self.stats["failed"] += len(unwritten)
+                    self._overflow(unwritten)
+                    return False
+            self._replay_spill()
+            return True
+
+    def _append_with_retry(self, rows) -> bool:
+        for attempt in range(self.max_retries + 1):
+            try:
+                with metrics.timer("sheet_logging"):
+                    self.worksheet.append_rows(rows)
+                self.stats["written"] += len(rows)
+                self.stats["batches"] += 1
+                return True
+            except Exception as e:
+                if attempt == self.max_retries:
+                    logger.warning("[%s] giving up on %d rows: %s", self.name, len(rows), e)
+                    return False
+                self.stats["retries"] += 1
+                # Exponential backoff with jitter, e.g. 0.5s, 1s, 2s ...
+                time.sleep(self.backoff * (2 ** attempt) * random.uniform(0.5, 1.0))
+        return False
+
+    def _replay_spill(self):
+        """Send rows spilled during an overflow once the sheet accepts writes again."""
+        if self.overflow != "spill" or not os.path.exists(self.spill_path):
+            return
+        with self._spill_lock:
+            try:
+                with open(self.spill_path, encoding="utf-8") as f:
+                    rows = [json.loads(line) for line in f if line.strip()]
+                os.remove(self.spill_path)
+            except (OSError, ValueError):
+                return
+        for start in range(0, len(rows), self.batch_size):
+            batch = rows[start:start + self.batch_size]
+            if not self._append_with_retry(batch):
+                self._overflow(rows[start:])
+                return
+
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    # ---------------- lifecycle ---------------- #
+    def flush(self) -> bool:
+        """Synchronously write everything currently queued."""
+        rows = self._drain()
+        return self._write(rows) if rows else True
+
+    def close(self, timeout: float = 10.0):
+        """Stop the background thread and flush whatever is still buffered."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self.flush()
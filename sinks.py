@@ -0,0 +1,136 @@
+import abc
+import csv
+import os
+import sqlite3
+import threading
+
+# Which backend the transcript / AI-response logs go to (sheets, csv, sqlite or none) is read
+# from LOG_BACKEND, and local files go under LOG_DIR, each time a sink is built
+GOOGLE_CREDENTIALS_FILE = os.getenv("GOOGLE_CREDENTIALS_FILE", "cred.json")
+
+SCOPES = ["https://www.googleapis.com/auth/spreadsheets"]
+
+
+class Sink(abc.ABC):
+    """Somewhere log rows end up. Implementations connect lazily on first write."""
+
+    name = "sink"
+
+    @abc.abstractmethod
+    def append_rows(self, rows: list):
+        """Write ``rows`` (lists of cell values), raising if they could not be written."""
+
+    def close(self):
+        pass
+
+
+class NullSink(Sink):
+    """Discard every row - for local development and load tests."""
+
+    name = "none"
+
+    def append_rows(self, rows: list):
+        pass
+
+
+class SheetsSink(Sink):
+    """Google Sheet opened by key; credentials and network are only touched on first write."""
+
+    name = "sheets"
+
+    def __init__(self, sheet_id: str, cred_file: str = GOOGLE_CREDENTIALS_FILE):
+        self.sheet_id = sheet_id
+        self.cred_file = cred_file
+        self._worksheet = None
+        self._lock = threading.Lock()
+
+    @property
+    def worksheet(self):
+        if self._worksheet is None:
+            with self._lock:
+                if self._worksheet is None:
+                    # Imported here so the API can start without the Google libraries configured
+                    import gspread
+                    from google.oauth2.service_account import Credentials
+
+                    creds = Credentials.from_service_account_file(self.cred_file, scopes=SCOPES)
+                    gs_client = gspread.authorize(creds)
+                    self._worksheet = gs_client.open_by_key(self.sheet_id).sheet1
+        return self._worksheet
+
+    def append_rows(self, rows: list):
+        self.worksheet.append_rows(rows)
+
+
+class CSVSink(Sink):
+    """Append rows to a local CSV file, writing the header when the file is new."""
+
+    name = "csv"
+
+    def __init__(self, path: str, columns: list = None):
+        self.path = path
+        self.columns = columns
+        self._lock = threading.Lock()
+
+    def append_rows(self, rows: list):
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            is_new = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+            with open(self.path, "a", newline="", encoding="utf-8") as f:
+                writer = csv.writer(f)
+                if is_new and self.columns:
+                    writer.writerow(self.columns)
+                writer.writerows(rows)
+
+
+class SQLiteSink(Sink):
+    """Append rows to a table in a local SQLite database."""
+
+    name = "sqlite"
+
+    def __init__(self, path: str, table: str, columns: list):
+        self.path = path
+        self.table = table
+        self.columns = columns
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            cols = ", ".join(f'"{c}" TEXT' for c in self.columns)
+            conn.execute(f'CREATE TABLE IF NOT EXISTS "{self.table}" ({cols})')
+            self._conn = conn
+        return self._conn
+
+    def append_rows(self, rows: list):
+        placeholders = ", ".join("?" for _ in self.columns)
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.executemany(
+                    f'INSERT INTO "{self.table}" VALUES ({placeholders})',
+                    [[None if v is None else str(v) for v in row] for row in rows],
+                )
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+def make_sink(name: str, sheet_id: str, columns: list, backend: str = None) -> Sink:
+    """Build the sink for log ``name`` using ``backend``, or LOG_BACKEND as it is set now."""
+    backend = (backend or os.getenv("LOG_BACKEND", "sheets")).lower()
+    log_dir = os.getenv("LOG_DIR", "logs")
+    if backend == "sheets":
+        return SheetsSink(sheet_id)
+    if backend == "csv":
+        return CSVSink(os.path.join(log_dir, f"{name}.csv"), columns)
+    if backend == "sqlite":
+        return SQLiteSink(os.path.join(log_dir, "logs.db"), name, columns)
+    if backend in ("none", "null", "noop"):
+        return NullSink()
+    raise ValueError(f"Unknown LOG_BACKEND: {backend}")
@@ -18,3 +18,70 @@ export async function getJSON(path){
   const res = await fetch(`${API_BASE}${path}`);
   return res.json();
 }
+
+// The response carries a session_id; pass it to later calls about the same call
+export function getCustomerByEmail(email){
+  return postJSON('/get_customer', { email });
+}
+
+export function getCustomerByPhone(phone){
+  return postJSON('/get_customer', { phone });
+}
+
+// Ranked matches for a partial name / email / phone / invoice (typos allowed)
+export function searchCustomers(q, limit = 8){
+  return getJSON(`/search_customers?q=${encodeURIComponent(q)}&limit=${limit}`);
+}
+
+// Live transcription socket: send recorder chunks, receive partial transcripts/sentiment
+export function openAudioSocket(onMessage, sessionId){
+  const query = sessionId ? `?session_id=${encodeURIComponent(sessionId)}` : '';
+  const ws = new WebSocket(`${API_BASE.replace(/^http/, 'ws')}/ws/analyze-audio${query}`);
+  ws.binaryType = 'arraybuffer';
+  ws.onmessage = (e) => {
+    try { onMessage(JSON.parse(e.data)); } catch (err) { console.warn('bad socket message', err); }
+  };
+  return ws;
+}
+
+// POST and read a Server-Sent Events response as it arrives.
+// onEvent(name, data) is called for every event; resolves when the stream ends.
+export async function postSSE(path, payload, onEvent){
+  const res = await fetch(`${API_BASE}${path}`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json', 'Accept': 'text/event-stream' },
+    body: JSON.stringify(payload)
+  });
+  if (!(res.headers.get('content-type') || '').includes('text/event-stream')) {
+    // Validation errors come back as plain JSON
+    const body = await res.json();
+    onEvent('error', Array.isArray(body) ? body[0] : body);
+    return;
+  }
+
+  const reader = res.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  for (;;) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+    let end;
+    while ((end = buffer.indexOf('\n\n')) !== -1) {
+      const block = buffer.slice(0, end);
+      buffer = buffer.slice(end + 2);
+      let name = 'message';
+      const data = [];
+      for (const line of block.split('\n')) {
+        if (line.startsWith('event:')) name = line.slice(6).trim();
+        else if (line.startsWith('data:')) data.push(line.slice(5).trimStart());
+      }
+      try { onEvent(name, JSON.parse(data.join('\n'))); } catch (err) { console.warn('bad event', err); }
+    }
+  }
+}
+
+// Stream the AI sales reply: customer info first, then tokens, then the full result
+export function streamAnalyzeText(payload, onEvent){
+  return postSSE('/analyze-text/stream', payload, onEvent);
+}
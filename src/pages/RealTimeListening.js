@@ -1,7 +1,7 @@
 import React, { useRef, useState, useEffect } from "react";
 import Page from "../components/Page";
 import Card from "../components/Card";
-import { postForm, getCustomerByEmail, getCustomerByPhone, analyzeTextByEmail } from "../api";
+import { postForm, openAudioSocket, getCustomerByEmail, getCustomerByPhone, searchCustomers, streamAnalyzeText } from "../api";
 import "./RealTimeListening.css";
 
 export default function RealTimeListening({ history, setHistory }) {
@@ -15,7 +15,9 @@ export default function RealTimeListening({ history, setHistory }) {
   // CRM / AI states
   const [lookupValue, setLookupValue] = useState("");
   const [lookupBy, setLookupBy] = useState("email");
+  const [matches, setMatches] = useState([]);
   const [customer, setCustomer] = useState(null);
+  const [sessionId, setSessionId] = useState(null);
   const [aiSuggestions, setAiSuggestions] = useState("");
   const [recommendations, setRecommendations] = useState([]);
   const [postSummaryList, setPostSummaryList] = useState([]);
@@ -29,6 +31,7 @@ export default function RealTimeListening({ history, setHistory }) {
   const mediaRecorderRef = useRef(null);
   const streamRef = useRef(null);
   const chunksRef = useRef([]);
+  const socketRef = useRef(null);
 
   // ----------- Recording logic ------------
 
@@ -53,12 +56,39 @@ export default function RealTimeListening({ history, setHistory }) {
         const mr = new MediaRecorder(stream, { mimeType: "audio/webm;codecs=opus" });
         mediaRecorderRef.current = mr;
 
+        // Stream timesliced chunks for live partial transcripts
+        try {
+          socketRef.current = openAudioSocket((msg) => {
+            if (msg.type === "partial" && msg.transcript) {
+              setTranscript(msg.transcript);
+              setDate(new Date().toLocaleString());
+            } else if (msg.type === "sentiment" && msg.sentiment) {
+              // Smoothed call sentiment, so one odd chunk doesn't flip the badge
+              setSentiment(msg.state || msg.sentiment);
+            } else if (msg.type === "shift") {
+              setStatus(`⚠️ Sentiment shift: ${msg.from} → ${msg.to}`);
+            }
+          }, sessionId);
+          // Replay anything recorded before the socket opened (incl. the header chunk)
+          socketRef.current.onopen = (ev) => chunksRef.current.forEach((c) => ev.target.send(c));
+        } catch (err) {
+          console.warn("Live transcription unavailable:", err);
+          socketRef.current = null;
+        }
+
         mr.ondataavailable = (e) => {
-          if (e.data && e.data.size > 0) chunksRef.current.push(e.data);
+          if (e.data && e.data.size > 0) {
+            chunksRef.current.push(e.data);
+            const ws = socketRef.current;
+            if (ws && ws.readyState === WebSocket.OPEN) ws.send(e.data);
+          }
         };
 
         mr.onstop = async () => {
           setStatus("Processing audio...");
+          const ws = socketRef.current;
+          if (ws && ws.readyState === WebSocket.OPEN) ws.send("stop");
+          socketRef.current = null;
           if (!chunksRef.current.length) {
             setTranscript("No speech detected.");
             setSentiment("Neutral");
@@ -95,7 +125,7 @@ export default function RealTimeListening({ history, setHistory }) {
           }
         };
 
-        mr.start();
+        mr.start(1000);
         setRecording(true);
         setStatus("🎤 Listening...");
         setTranscript("Listening...");
@@ -128,6 +158,10 @@ export default function RealTimeListening({ history, setHistory }) {
         streamRef.current = null;
       }
     } catch (e) {}
+    try {
+      if (socketRef.current) socketRef.current.close();
+    } catch (e) {}
+    socketRef.current = null;
     mediaRecorderRef.current = null;
     chunksRef.current = [];
     setRecording(false);
@@ -145,9 +179,32 @@ export default function RealTimeListening({ history, setHistory }) {
   }, []);
 
   // ------------- CRM Lookup --------------
+  // Suggest customers while typing (partial name, email, phone suffix, typos)
+  useEffect(() => {
+    const q = lookupValue.trim();
+    if (q.length < 2) {
+      setMatches([]);
+      return;
+    }
+    let cancelled = false;
+    const timer = setTimeout(async () => {
+      try {
+        const res = await searchCustomers(q);
+        if (!cancelled) setMatches(res?.results || []);
+      } catch (err) {
+        if (!cancelled) setMatches([]);
+      }
+    }, 200);
+    return () => {
+      cancelled = true;
+      clearTimeout(timer);
+    };
+  }, [lookupValue]);
+
   const handleLookup = async () => {
     setError("");
     setCustomer(null);
+    setSessionId(null);
     setAiSuggestions("");
     setRecommendations([]);
     if (!lookupValue) {
@@ -169,6 +226,7 @@ export default function RealTimeListening({ history, setHistory }) {
         setCustomer(null);
       } else {
         setCustomer(res);
+        setSessionId(res.session_id || null);
       }
     } catch (err) {
       console.error("lookup error:", err);
@@ -183,6 +241,12 @@ export default function RealTimeListening({ history, setHistory }) {
     if (!customer) return;
     setLoadingReco(true);
     try {
+      // Prefer the backend's co-purchase recommendations when the lookup returned them
+      if (Array.isArray(customer.Recommendations) && customer.Recommendations.length) {
+        setRecommendations(customer.Recommendations);
+        return;
+      }
+
       const prevProducts = customer?.PreviousPurchases
         ? customer.PreviousPurchases.split(",").map((p) => p.trim())
         : [];
@@ -239,9 +303,19 @@ export default function RealTimeListening({ history, setHistory }) {
   const handleGenerateAIResponse = async () => {
     if (!customer) return;
     setLoadingAI(true);
+    setAiSuggestions("");
     try {
-      const aiRes = await analyzeTextByEmail(customer.Email || lookupValue);
-      if (aiRes?.ai_response) setAiSuggestions(aiRes.ai_response);
+      // Show the reply as it is generated instead of waiting for the whole answer
+      await streamAnalyzeText({ email: customer.Email || lookupValue, session_id: sessionId }, (event, data) => {
+        if (event === "token") {
+          setLoadingAI(false);
+          setAiSuggestions((prev) => prev + data.text);
+        } else if (event === "done" && data.ai_response) {
+          setAiSuggestions(data.ai_response);
+        } else if (event === "error") {
+          console.warn("AI analyze failed", data.error);
+        }
+      });
     } catch (err) {
       console.warn("AI analyze failed", err);
     } finally {
@@ -254,7 +328,9 @@ export default function RealTimeListening({ history, setHistory }) {
   
   setLoadingSummary(true);
   try {
-    const payload = { transcript, sentiment, customer };
+    // Without a recorded transcript the backend summarizes the session's analyzed turns
+    const spoken = transcript === "Waiting for input..." ? "" : transcript;
+    const payload = { transcript: spoken, sentiment, customer: customer?.Name, session_id: sessionId };
 
     const res = await fetch("http://localhost:8000/generate-summary", {
       method: "POST",
@@ -347,7 +423,14 @@ export default function RealTimeListening({ history, setHistory }) {
             </div>
 
             <div className="lookup-inputs">
-              <input className="input" placeholder={phoneOrEmailPlaceholder} value={lookupValue} onChange={(e) => setLookupValue(e.target.value)} />
+              <input className="input" placeholder={phoneOrEmailPlaceholder} value={lookupValue} onChange={(e) => setLookupValue(e.target.value)} list="customer-matches" />
+              <datalist id="customer-matches">
+                {matches.map((m) => (
+                  <option key={`${m.Email}-${m.Phone}`} value={lookupBy === "email" ? m.Email : String(m.Phone ?? "")}>
+                    {`${m.Name} · ${m.Email} · ${m.Phone}`}
+                  </option>
+                ))}
+              </datalist>
               <button className="btn primary" onClick={handleLookup} disabled={loadingLookup}>
                 {loadingLookup ? "Looking up..." : "Lookup"}
               </button>
@@ -0,0 +1,169 @@
+# Post-call summaries, with map-reduce for transcripts too long for one prompt
+import asyncio
+import os
+
+import llm
+import metrics
+from cache import make_key, summary_cache
+from sentiment import estimate_tokens, split_sentences
+
+SUMMARY_MODEL = "llama-3.3-70b-versatile"
+SUMMARY_SYSTEM = "You are a helpful assistant for call center summaries."
+
+# Transcripts (or merged notes) up to this many estimated tokens go into the final prompt as-is
+SUMMARY_DIRECT_MAX_TOKENS = int(os.getenv("SUMMARY_DIRECT_MAX_TOKENS", "1500"))
+# Budget for each chunk in the map step and each group of notes in a reduce round
+SUMMARY_CHUNK_TOKENS = int(os.getenv("SUMMARY_CHUNK_TOKENS", "1200"))
+SUMMARY_NOTES_TOKENS = 250
+SUMMARY_MAX_ROUNDS = 4
+
+SUMMARY_PROMPT = """
+You are an AI assistant that generates professional **Post-Call Summaries**.
+
+{heading}:
+{body}
+{record}
+Format the summary exactly like this:
+
+Post-Call Summary: {customer}  
+Date of Call: [Insert Date of Call Here]  
+Customer: {customer} - [Industry if found]  
+Overall Sentiment: {sentiment}  
+Key Topics:  
+- Budget: [Budget Info if found, else "Not mentioned"]  
+- Phone Requirements: [Requirements Info if found, else "Not mentioned"]  
+- Battery Life: [Battery-related Info if found, else "Not mentioned"]  
+- Previous Purchases: [Mention past purchases if available]
+"""
+
+CHUNK_PROMPT = """
+You are taking notes on one part of a sales call transcript for a post-call summary.
+Write short bullet notes with only what this part says about: the call date, the
+customer's industry, budget, product or phone requirements, battery life, previous
+purchases, concerns and mood. Leave out anything not mentioned.
+
+Transcript part:
+{}
+"""
+
+MERGE_PROMPT = """
+These are notes on consecutive parts of one sales call, in order. Combine them
+into one set of short bullet notes, keeping every distinct fact and dropping repeats.
+
+Notes:
+{}
+"""
+
+
+def _split_long(text: str, max_tokens: int) -> list:
+    """Break one over-long line into sentences, and over-long sentences into word runs."""
+    pieces = []
+    for sentence in split_sentences(text):
+        if estimate_tokens(sentence) <= max_tokens:
+            pieces.append(sentence)
+            continue
+        words, current = sentence.split(), []
+        for word in words:
+            if current and estimate_tokens(" ".join(current + [word])) > max_tokens:
+                pieces.append(" ".join(current))
+                current = []
+            current.append(word)
+        if current:
+            pieces.append(" ".join(current))
+    return pieces
+
+
+def pack(units: list, max_tokens: int, sep: str = "\n") -> list:
+    """Greedily join consecutive units into chunks of at most ``max_tokens``.
+
+    Boundaries depend only on the units before them, so when a transcript
+    grows at the end every chunk but the last stays byte-identical and its
+    cached notes are reused.
+    """
+    chunks, current, used = [], [], 0
+    for unit in units:
+        cost = estimate_tokens(unit)
+        if current and used + cost > max_tokens:
+            chunks.append(sep.join(current))
+            current, used = [], 0
+        current.append(unit)
+        used += cost
+    if current:
+        chunks.append(sep.join(current))
+    return chunks
+
+
+def chunk_transcript(transcript: str, max_tokens: int = SUMMARY_CHUNK_TOKENS) -> list:
+    """Split on speaker turns/lines, falling back to sentences, then words."""
+    units = []
+    for line in transcript.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        units.extend([line] if estimate_tokens(line) <= max_tokens else _split_long(line, max_tokens))
+    return pack(units, max_tokens)
+
+
+async def _notes(text: str, prompt: str, model: str) -> str:
+    """Notes for one chunk (or group of notes), cached on (text, model, prompt)."""
+    key = make_key(text, model, prompt)
+    notes = summary_cache.get(key)
+    if notes is None:
+        notes = await llm.chat_text(
+            model=model,
+            messages=[
+                {"role": "system", "content": SUMMARY_SYSTEM},
+                {"role": "user", "content": prompt.format(text)}
+            ],
+            temperature=0.2,
+            max_tokens=SUMMARY_NOTES_TOKENS,
+        )
+        summary_cache.set(key, notes)
+    return notes
+
+
+async def map_reduce_notes(transcript: str, model: str = SUMMARY_MODEL) -> str:
+    """Summarize chunks concurrently, then merge notes until they fit one prompt."""
+    with metrics.timer("summary_map"):
+        notes = await asyncio.gather(*(_notes(c, CHUNK_PROMPT, model) for c in chunk_transcript(transcript)))
+
+    with metrics.timer("summary_reduce"):
+        for _ in range(SUMMARY_MAX_ROUNDS):
+            if len(notes) == 1 or estimate_tokens("\n\n".join(notes)) <= SUMMARY_DIRECT_MAX_TOKENS:
+                break
+            groups = pack(notes, SUMMARY_CHUNK_TOKENS, sep="\n\n")
+            if len(groups) == len(notes):
+                break  # every note already fills a group on its own
+            notes = await asyncio.gather(*(_notes(g, MERGE_PROMPT, model) for g in groups))
+    return "\n\n".join(notes)
+
+
+async def summarize(transcript: str, customer: str, sentiment: str, model: str = SUMMARY_MODEL,
+                    previous_purchases: str = None):
+    """Post-Call Summary text for ``transcript``, or None if the model returned nothing.
+
+    Short transcripts are summarized in one call, as before. Longer ones
+    are chunked, summarized per chunk in parallel and reduced to notes
+    that replace the transcript in the same final prompt. The CRM's
+    ``previous_purchases``, when known, are given to the model too.
+    """
+    record = f"\nPrevious purchases on record: {previous_purchases}\n" if previous_purchases else ""
+    if estimate_tokens(transcript) <= SUMMARY_DIRECT_MAX_TOKENS:
+        heading, body = "Transcript", transcript
+    else:
+        heading, body = "Call notes (in order, from a long transcript)", await map_reduce_notes(transcript, model)
+
+    response = await llm.chat(
+        model=model,
+        messages=[
+            {"role": "system", "content": SUMMARY_SYSTEM},
+            {"role": "user", "content": SUMMARY_PROMPT.format(
+                heading=heading, body=body, record=record, customer=customer, sentiment=sentiment)}
+        ],
+        temperature=0.3,
+        max_tokens=600,
+    )
+    # Defensive check (avoid 'object not subscriptable' errors)
+    if response and response.choices and response.choices[0].message.content:
+        return response.choices[0].message.content.strip()
+    return None
@@ -0,0 +1,62 @@
+import time
+
+import pandas as pd
+import pytest
+
+from analytics import Analytics, Sentiment, Tone, normalize_sentiment, normalize_tone, parse_window
+
+NOW = time.time()
+
+
+def test_normalize():
+    assert normalize_sentiment("Sentiment: negative.") is Sentiment.NEGATIVE
+    assert normalize_sentiment("no idea") is Sentiment.NEUTRAL
+    assert normalize_tone("Tone: ANGRY") is Tone.ANGRY
+    assert parse_window("15m") == 900
+    with pytest.raises(ValueError):
+        parse_window("soon")
+
+
+def test_windows_and_totals(tmp_path):
+    analytics = Analytics(str(tmp_path / "history.db"))
+    analytics.record("Positive", "Friendly", ts=NOW - 30)
+    analytics.record("negative", "angry", ts=NOW - 2 * 3600)
+    analytics.record("Neutral", "", ts=NOW - 5 * 86400)
+
+    hour = analytics.window("1h", now=NOW)
+    assert hour["distribution"] == {"Positive": 1, "Negative": 0, "Neutral": 0}
+    assert hour["tones"]["Friendly"] == 1
+    assert analytics.window("24h", now=NOW)["total"] == 2
+    assert analytics.window("7d", now=NOW)["total"] == 3
+    assert analytics.window(now=NOW)["total"] == 3
+    with pytest.raises(ValueError):
+        analytics.window("60d")
+
+
+def test_counts_are_shared_between_workers(tmp_path):
+    path = str(tmp_path / "history.db")
+    first, second = Analytics(path), Analytics(path)
+    first.record("Positive", "Polite")
+    second.record("Negative", "Upset")
+    for worker in (first, second):
+        assert worker.window("15m")["distribution"] == {"Positive": 1, "Negative": 1, "Neutral": 0}
+
+
+def test_seed_only_once(tmp_path):
+    path = str(tmp_path / "history.db")
+    events = [(NOW - 60, "Positive", "Friendly")]
+    first, second = Analytics(path), Analytics(path)
+    assert first.is_empty()
+    older = [("Negative", "Angry", 3), ("negative", None, 1)]
+    assert first.seed(older, events)
+    assert not second.seed(older, events)
+    report = second.window()
+    assert report["distribution"] == {"Positive": 1, "Negative": 4, "Neutral": 0}
+    assert report["tones"] == {"Friendly": 1, "Upset": 0, "Angry": 3, "Polite": 0, "Neutral": 1}
+    assert sum(report["tones"].values()) == report["total"]
+
+
+def test_load_crm(tmp_path):
+    analytics = Analytics(str(tmp_path / "history.db"))
+    report = analytics.load_crm(pd.DataFrame({"Sentiment": ["Positive", " negative", "meh", None]}))
+    assert report == {"total": 4, "distribution": {"Positive": 1, "Negative": 1, "Neutral": 2}}
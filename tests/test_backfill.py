@@ -0,0 +1,92 @@
+import argparse
+import asyncio
+import json
+
+import pandas as pd
+import pytest
+
+import backfill
+import llm
+from cache import make_key, normalize_text
+from sentiment import SENTIMENT_MODEL, SENTIMENT_PROMPT
+
+FEEDBACK = ["Great service", "Too expensive", "great service ", None, "Battery died", "Too expensive"]
+
+
+def key(text):
+    return make_key(normalize_text(text), SENTIMENT_MODEL, SENTIMENT_PROMPT)
+
+
+def record(text, sentiment):
+    return json.dumps({"key": key(text), "text": text, "sentiment": sentiment,
+                       "tone": "Calm", "explanation": "stored"}) + "\n"
+
+
+@pytest.fixture
+def classified(monkeypatch):
+    """Stub the model, recording every text it is asked about."""
+    texts = []
+
+    async def classify(text):
+        texts.append(text)
+        return "Neutral", "Calm", "fresh"
+
+    monkeypatch.setattr(backfill, "classify", classify)
+    monkeypatch.setattr(llm, "LLM_RATE_LIMIT", llm.LLM_RATE_LIMIT)
+    monkeypatch.setattr(llm, "LLM_RETRIES", llm.LLM_RETRIES)
+    return texts
+
+
+def run(tmp_path, chunk_size=2):
+    crm = tmp_path / "crm.csv"
+    pd.DataFrame({"Name": list("abcdef"), "Call Feedback": FEEDBACK}).to_csv(crm, index=False)
+    args = argparse.Namespace(crm=str(crm), out=str(tmp_path / "out.csv"),
+                              checkpoint=str(tmp_path / "checkpoint.jsonl"), chunk_size=chunk_size,
+                              workers=2, rps=0, retries=None)
+    failures = asyncio.run(backfill.run(args))
+    return failures, pd.read_csv(args.out)
+
+
+@pytest.mark.parametrize("suffix", [".csv", ".xlsx", ".parquet"])
+def test_iter_crm_chunks(tmp_path, suffix):
+    df = pd.DataFrame({"Name": [f"n{i}" for i in range(5)], "Call Feedback": list("abcde")})
+    path = tmp_path / f"crm{suffix}"
+    {".csv": lambda p: df.to_csv(p, index=False), ".xlsx": lambda p: df.to_excel(p, index=False),
+     ".parquet": lambda p: df.to_parquet(p, index=False)}[suffix](path)
+    chunks = list(backfill.iter_crm_chunks(str(path), 2))
+    assert [len(c) for c in chunks] == [2, 2, 1]
+    assert pd.concat(chunks, ignore_index=True)["Call Feedback"].tolist() == list("abcde")
+    with pytest.raises(ValueError):
+        list(backfill.iter_crm_chunks(str(tmp_path / "crm.txt"), 2))
+
+
+def test_load_checkpoint_skips_a_torn_last_line(tmp_path):
+    path = tmp_path / "checkpoint.jsonl"
+    path.write_text(record("Great service", "Positive") + record("Too expensive", "Negative")[:30])
+    assert backfill.load_checkpoint(str(path)) == {key("Great service"): ("Positive", "Calm", "stored")}
+    assert backfill.load_checkpoint(str(tmp_path / "missing.jsonl")) == {}
+
+
+def test_resume_after_a_torn_checkpoint_reclassifies_nothing(tmp_path, classified):
+    checkpoint = tmp_path / "checkpoint.jsonl"
+    # Interrupted while writing "Battery died": everything before it is kept
+    checkpoint.write_text(record("Great service", "Positive") + record("Too expensive", "Negative")
+                          + record("Battery died", "Negative")[:25])
+    failures, out = run(tmp_path)
+    assert failures == 0
+    assert classified == ["Battery died"]
+    assert out["LLM Sentiment"].fillna("").tolist() == ["Positive", "Negative", "Positive", "",
+                                                        "Neutral", "Negative"]
+
+    # The record written after the torn line parses, so a second resume has nothing to do
+    classified.clear()
+    run(tmp_path)
+    assert classified == []
+    assert len(backfill.load_checkpoint(str(checkpoint))) == 3
+
+
+def test_run_classifies_each_distinct_text_once(tmp_path, classified):
+    failures, out = run(tmp_path, chunk_size=10)
+    assert failures == 0
+    assert sorted(normalize_text(t) for t in classified) == ["battery died", "great service", "too expensive"]
+    assert out["LLM Explanation"].fillna("").tolist() == ["fresh", "fresh", "fresh", "", "fresh", "fresh"]
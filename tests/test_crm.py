@@ -0,0 +1,63 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import crm
+from crm_store import CRMStore, CRMWriter, crm_records, read_crm
+
+END = datetime.date(2025, 1, 31)
+
+
+@pytest.mark.parametrize("ext", [".parquet", ".csv", ".xlsx"])
+def test_generate_round_trips(tmp_path, ext):
+    path = str(tmp_path / f"crm{ext}")
+    crm.generate(path, rows=50, seed=1, chunk_size=20, end_date=END)
+    df = read_crm(path)
+    assert list(df.columns) == crm.COLUMNS
+    assert len(df) == 50
+    assert df["Email"].is_unique
+    assert not list(tmp_path.glob("*.tmp*"))
+
+
+def test_generation_is_reproducible(tmp_path):
+    first, second = str(tmp_path / "a.csv"), str(tmp_path / "b.csv")
+    crm.generate(first, rows=30, seed=7, chunk_size=10, end_date=END)
+    crm.generate(second, rows=30, seed=7, chunk_size=10, end_date=END)
+    assert open(first).read() == open(second).read()
+
+
+def test_first_time_buyers_have_empty_history():
+    history = crm.previous_purchases(np.random.default_rng(0), 1000)
+    assert "None" not in set(history)
+    assert "" in set(history)
+
+
+def test_first_time_buyers_are_served_as_none(tmp_path):
+    path = str(tmp_path / "crm.csv")
+    crm.generate(path, rows=200, seed=3, end_date=END)
+    store = CRMStore(path)
+    store.load()
+    df = read_crm(path)
+    first_timer = df.loc[df["Previous Purchases"].isna(), "Email"].iloc[0]
+    assert store.find(email=first_timer)["Previous Purchases"] is None
+
+
+def test_crm_records_replace_nan():
+    records = crm_records(pd.DataFrame({"a": [1.0, np.nan], "b": ["x", None]}))
+    assert records == [{"a": 1.0, "b": "x"}, {"a": None, "b": None}]
+
+
+def test_parquet_writer_accepts_an_all_blank_first_chunk(tmp_path):
+    path = str(tmp_path / "out.parquet")
+    writer = CRMWriter(path)
+    writer.write(pd.DataFrame({"Name": ["a"], "Note": [np.nan]}))
+    writer.write(pd.DataFrame({"Name": ["b"], "Note": ["later"]}))
+    writer.close()
+    assert read_crm(path)["Note"].tolist()[1] == "later"
+
+
+def test_writer_rejects_unknown_formats(tmp_path):
+    with pytest.raises(ValueError):
+        CRMWriter(str(tmp_path / "crm.json"))
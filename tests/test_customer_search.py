@@ -0,0 +1,158 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import customer_search
+from customer_search import CustomerSearch, CustomerSearchIndex, SortedKeys, TrigramIndex, _encode, trigrams
+
+
+def crm_frame(phones=None):
+    return pd.DataFrame({
+        "Name": ["Alice Smith", "Bob Stone", "Carol Smithers", "alice cooper", None],
+        "Email": ["alice.smith@example.com", "bob@example.com", "carol@example.com",
+                  "acooper@example.com", None],
+        "Phone": phones if phones is not None else
+        ["+1 (555) 123-4567", "555-987-6543", "5551112222", "4445556666", None],
+        "Product": ["Books", "Toys", "Books, Games", "Garden", "Toys"],
+        "Invoice": ["INV1001", "INV1002", "INV2001", "INV1003", np.nan],
+    })
+
+
+@pytest.fixture
+def index():
+    return CustomerSearchIndex(crm_frame())
+
+
+def found(results):
+    return [(r["Name"], r["match"]) for r in results]
+
+
+def test_range_bumps_the_last_byte_for_the_prefix_upper_bound():
+    keys = SortedKeys(["ab", "abc", "abd", "ac", "b", ""], [0, 1, 2, 3, 4, 5])
+    # Empty keys are dropped; "ab" + 1 = "ac" bounds every key starting with "ab"
+    assert keys.keys.tolist() == [b"ab", b"abc", b"abd", b"ac", b"b"]
+    assert keys._range(b"ab", prefix=True) == (0, 3)
+    assert keys._range(b"ab", prefix=False) == (0, 1)
+    assert keys._range(b"a", prefix=True) == (0, 4)
+    assert keys._range(b"zz", prefix=True) == (5, 5)
+    assert keys._range(b"", prefix=True) == (0, 0)
+    # Wider than any stored key: nothing can match
+    assert keys._range(b"abcd", prefix=True) == (0, 0)
+    assert keys.prefix("ab").tolist() == [0, 1, 2]
+    assert keys.prefix("ab", limit=2).tolist() == [0, 1]
+    assert keys.exact("abd").tolist() == [2]
+    assert keys.distinct().tolist() == [b"ab", b"abc", b"abd", b"ac", b"b"]
+
+
+def test_trigram_postings_are_csr_over_distinct_values():
+    values = _encode(["abc", "abd", "xbc"])
+    fuzzy = TrigramIndex(values, chunk_size=2)
+    assert np.all(np.diff(fuzzy.codes) > 0)
+    assert fuzzy.offsets[0] == 0 and fuzzy.offsets[-1] == len(fuzzy.postings)
+    postings = {int(code).to_bytes(3, "big"): fuzzy.postings[lo:hi].tolist()
+                for code, lo, hi in zip(fuzzy.codes, fuzzy.offsets[:-1], fuzzy.offsets[1:])}
+    expected = {}
+    for i, value in enumerate([b"abc", b"abd", b"xbc"]):
+        for gram in trigrams(value):
+            expected.setdefault(gram, []).append(i)
+    assert postings == expected
+    assert fuzzy.sizes.tolist() == [len(trigrams(v)) for v in [b"abc", b"abd", b"xbc"]]
+
+
+def test_trigram_stop_byte_masks_the_rest_of_the_value():
+    values = _encode(["anna@example.com", "bob@example.com"])
+    fuzzy = TrigramIndex(values, stop=b"@")
+    grams = {int(code).to_bytes(3, "big") for code in fuzzy.codes}
+    assert grams == trigrams(b"anna@example.com", b"@") | trigrams(b"bob@example.com", b"@")
+    assert not any(b"@" in gram or b"exa" in gram for gram in grams)
+    assert fuzzy.search("anne@example.com")[0][0] == 0
+
+
+def test_trigram_search_ranks_by_similarity():
+    fuzzy = TrigramIndex(_encode(["jonathan", "jonathon", "jon", "mary"]))
+    results = fuzzy.search("jonathan")
+    assert [i for i, _ in results][:2] == [0, 1]
+    assert results[0][1] == 1.0
+    assert all(a[1] >= b[1] for a, b in zip(results, results[1:]))
+    assert all(s >= customer_search.FUZZY_MIN_SIMILARITY for _, s in results)
+    assert 3 not in [i for i, _ in results]
+
+
+def test_phone_lookups(index):
+    assert found(index.search("+1 555 123 4567"))[0] == ("Alice Smith", "phone")
+    assert found(index.search("1555"))[0] == ("Alice Smith", "phone prefix")
+    assert found(index.search("6543"))[0] == ("Bob Stone", "phone suffix")
+
+
+def test_name_token_prefixes(index):
+    assert found(index.search("smi")) == [("Alice Smith", "name prefix"),
+                                          ("Carol Smithers", "name prefix")]
+    # "alice" is also the start of Alice Smith's email, which scores higher
+    assert found(index.search("Alice")) == [("Alice Smith", "email prefix"),
+                                            ("alice cooper", "name prefix")]
+    assert found(index.search("alice smith"))[0] == ("Alice Smith", "name")
+
+
+def test_email_lookups_and_typos(index):
+    assert found(index.search("bob@example.com"))[0] == ("Bob Stone", "email")
+    assert found(index.search("acoop"))[0] == ("alice cooper", "email prefix")
+    # The shared domain adds nothing: only "alise.smith" is compared
+    result = index.search("alise.smith@example.com")[0]
+    assert (result["Name"], result["match"]) == ("Alice Smith", "fuzzy email")
+    assert result["score"] < 0.9
+
+
+def test_invoice_lookups(index):
+    assert found(index.search("inv2001")) == [("Carol Smithers", "invoice")]
+    assert found(index.search("INV100"))[:3] == [("Alice Smith", "invoice prefix"),
+                                                 ("Bob Stone", "invoice prefix"),
+                                                 ("alice cooper", "invoice prefix")]
+
+
+def test_empty_and_short_queries(index):
+    assert index.search("") == []
+    assert index.search("   ") == []
+    assert index.search(None) == []
+    # Too short for phone or fuzzy matching, but still a prefix
+    assert found(index.search("bo")) == [("Bob Stone", "email prefix")]
+    assert found(index.search("st")) == [("Bob Stone", "name prefix")]
+    assert index.search("55") == []
+    assert CustomerSearchIndex().search("alice") == []
+
+
+def test_ranking_and_limit(index):
+    results = index.search("alice", limit=1)
+    assert len(results) == 1
+    scores = [r["score"] for r in index.search("smith")]
+    assert scores == sorted(scores, reverse=True)
+
+
+@pytest.mark.parametrize("phones", [
+    [15551234567, 5559876543, 5551112222, 4445556666, np.nan],
+    [15551234567.0, 5559876543.0, 5551112222.0, 4445556666.0, np.nan],
+])
+def test_numeric_phone_columns(phones):
+    index = CustomerSearchIndex(crm_frame(phones))
+    assert found(index.search("15551234567"))[0] == ("Alice Smith", "phone")
+    assert found(index.search("2222"))[0] == ("Carol Smithers", "phone suffix")
+    # Missing phones are not indexed as "nan" or "0"
+    assert index.phone.keys.tolist() == sorted(index.phone.keys.tolist())
+    assert b"" not in index.phone.keys.tolist()
+    assert len(index.phone.keys) == 4
+
+
+def test_results_are_plain_json_values(index):
+    record = index.search("inv1002")[0]
+    assert record == {"Name": "Bob Stone", "Email": "bob@example.com", "Phone": "555-987-6543",
+                      "Product": "Toys", "Invoice": "INV1002", "score": 1.0, "match": "invoice"}
+    numeric = CustomerSearchIndex(crm_frame([1, 2, 3, 4, np.nan])).search("alice smith")[0]
+    assert type(numeric["Phone"]) is float
+
+
+def test_rebuild_swaps_the_index():
+    search = CustomerSearch()
+    assert search.search("alice") == []
+    search.rebuild(crm_frame())
+    # Limits are clamped to 1..SEARCH_MAX_LIMIT
+    assert len(search.search("alice", limit=0)) == 1
+    assert len(search.search("alice", limit=500)) == 2
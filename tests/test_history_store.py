@@ -0,0 +1,56 @@
+from history_store import HistoryStore
+
+
+def make_store(tmp_path):
+    store = HistoryStore(str(tmp_path / "history.db"))
+    for i, sentiment in enumerate(["Positive", "negative", "Neutral", "positive", "Negative"]):
+        store.add({"Email": f"User{i % 2}@Example.com", "sentiment": sentiment, "tone": "Polite", "n": i},
+                  ts=1000 + i)
+    return store
+
+
+def test_pages_newest_first_with_cursor(tmp_path):
+    store = make_store(tmp_path)
+    first = store.page(limit=2)
+    assert [item["n"] for item in first["items"]] == [4, 3]
+    second = store.page(limit=2, cursor=first["next_cursor"])
+    assert [item["n"] for item in second["items"]] == [2, 1]
+    last = store.page(limit=2, cursor=second["next_cursor"])
+    assert [item["n"] for item in last["items"]] == [0]
+    assert last["next_cursor"] is None
+
+
+def test_filters(tmp_path):
+    store = make_store(tmp_path)
+    assert [i["n"] for i in store.page(sentiment="POSITIVE")["items"]] == [3, 0]
+    assert [i["n"] for i in store.page(email=" user1@example.com")["items"]] == [3, 1]
+    assert [i["n"] for i in store.page(since=1001, until=1003)["items"]] == [2, 1]
+
+
+def test_sentiment_filter_uses_the_index(tmp_path):
+    store = make_store(tmp_path)
+    plan = store._connect().execute(
+        "EXPLAIN QUERY PLAN SELECT id, data FROM history WHERE sentiment = ? COLLATE NOCASE "
+        "ORDER BY id DESC LIMIT 10", ("positive",),
+    ).fetchall()
+    assert any("idx_history_sentiment_nocase" in row[-1] for row in plan)
+
+
+def test_aggregates(tmp_path):
+    store = make_store(tmp_path)
+    assert sorted(store.count_by_label(until=1002)) == [("Positive", "Polite", 1), ("negative", "Polite", 1)]
+    assert [row[1] for row in store.events_since(1003)] == ["positive", "Negative"]
+
+
+def test_deferred_results_are_shared_and_capped(tmp_path):
+    store = make_store(tmp_path)
+    store.save_deferred("a", {"ai_response": "Hi"}, keep=2)
+    # Another worker opens its own connection to the same file
+    other = HistoryStore(store.path)
+    assert other.deferred("a") == {"ai_response": "Hi"}
+    store.save_deferred("b", {}, keep=2)
+    store.save_deferred("a", {"ai_response": "Hi", "sentiment": "Positive"}, keep=2)
+    store.save_deferred("c", {}, keep=2)
+    assert other.deferred("a")["sentiment"] == "Positive"
+    assert other.deferred("b") is None
+    assert other.deferred("missing") is None
@@ -0,0 +1,46 @@
+import asyncio
+
+from live_audio import AudioWindow, merge_transcript, put_latest, split_init_segment
+
+UNKNOWN_SIZE = bytes.fromhex("01ffffffffffffff")
+INIT = (
+    bytes.fromhex("1a45dfa3") + b"\x84" + b"webm"              # EBML header
+    + bytes.fromhex("18538067") + UNKNOWN_SIZE                 # Segment, streamed
+    + bytes.fromhex("1549a966") + b"\x82" + b"in"              # Info
+    + bytes.fromhex("1654ae6b") + b"\x83" + b"trk"             # Tracks
+)
+CLUSTER = bytes.fromhex("1f43b675") + UNKNOWN_SIZE + b"first second of audio"
+
+
+def test_split_init_segment():
+    assert split_init_segment(INIT + CLUSTER) == (INIT, CLUSTER)
+
+
+def test_split_init_segment_keeps_unknown_containers_whole():
+    assert split_init_segment(b"OggS rest") == (b"OggS rest", b"")
+    assert split_init_segment(INIT[:6]) == (INIT[:6], b"")
+
+
+def test_first_chunk_audio_slides_out_of_the_window():
+    window = AudioWindow(window_chunks=2, step_chunks=1)
+    assert window.add(INIT + CLUSTER) == (1, INIT + CLUSTER)
+    assert window.add(b"b") == (2, INIT + CLUSTER + b"b")
+    assert window.add(b"c") == (3, INIT + b"bc")
+    assert window.flush() is None
+
+
+def test_merge_transcript_drops_the_overlap():
+    merged, added = merge_transcript("hello there how are", "How are you today")
+    assert merged == "hello there how are you today"
+    assert added == "you today"
+    assert merge_transcript(merged, "you today") == (merged, "")
+
+
+def test_put_latest_drops_the_oldest():
+    async def run():
+        queue = asyncio.Queue(maxsize=1)
+        await queue.put("old")
+        dropped = await put_latest(queue, "new")
+        return dropped, queue.get_nowait()
+
+    assert asyncio.run(run()) == (1, "new")
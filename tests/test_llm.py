@@ -0,0 +1,171 @@
+import asyncio
+import time
+
+import pytest
+
+import llm
+from fake_services import FakeSettings, ServerThread, make_groq_app
+
+
+@pytest.fixture(autouse=True)
+def gateway(monkeypatch):
+    """Fresh breakers, buckets and client per test, and no backoff sleeps."""
+    monkeypatch.setattr(llm, "_buckets", {})
+    monkeypatch.setattr(llm, "_breakers", {})
+    monkeypatch.setattr(llm, "_inflight", {})
+    monkeypatch.setattr(llm, "_client", None)
+    monkeypatch.setattr(llm, "LLM_RETRY_BASE", 0.0)
+    monkeypatch.setattr(llm, "LLM_RETRIES", 2)
+    monkeypatch.setattr(llm, "LLM_RATE_LIMIT", 0.0)
+
+
+def flaky(failures, calls):
+    """A call that times out ``failures`` times, then answers with the model it was given."""
+    async def call(model):
+        calls.append(model)
+        if len(calls) <= failures:
+            raise asyncio.TimeoutError()
+        return model
+    return call
+
+
+# ---------------- TOKEN BUCKET ---------------- #
+def test_bucket_allows_a_burst_then_paces():
+    async def run():
+        bucket = llm.TokenBucket(rate=20, capacity=2)
+        started = time.monotonic()
+        for _ in range(4):
+            await bucket.acquire()
+        return time.monotonic() - started
+
+    # Two from the burst, then two more at 20/s
+    assert 0.08 <= asyncio.run(run()) < 0.5
+
+
+def test_slow_rate_limit_still_allows_one_request(monkeypatch):
+    monkeypatch.setattr(llm, "LLM_RATE_LIMIT", 0.2)
+    bucket = llm._bucket("model")
+    assert bucket.capacity == 1.0
+    asyncio.run(asyncio.wait_for(bucket.acquire(), 1))
+
+
+def test_configure_rebuilds_buckets_at_the_new_rate():
+    llm.configure(rate_limit=2)
+    assert llm._bucket("model").rate == 2
+    llm.configure(retries=5)
+    assert llm._bucket("model").rate == 2 and llm.LLM_RETRIES == 5
+    llm.configure(rate_limit=10)
+    assert llm._bucket("model").rate == 10
+    llm.configure(rate_limit=0)
+    assert llm._bucket("model") is None
+
+
+def test_bucket_rejects_capacity_below_one():
+    with pytest.raises(ValueError):
+        llm.TokenBucket(rate=0.2, capacity=0.4)
+
+
+# ---------------- CIRCUIT BREAKER ---------------- #
+def test_breaker_opens_and_probes(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(llm.time, "monotonic", lambda: now[0])
+    breaker = llm.CircuitBreaker(failures=2, reset=10)
+    breaker.failure()
+    assert breaker.allow()
+    breaker.failure()
+    assert breaker.is_open and not breaker.allow()
+    now[0] += 10
+    assert breaker.allow()  # the probe
+    assert not breaker.allow()
+    breaker.success()
+    assert not breaker.is_open and breaker.allow()
+
+
+def test_retries_then_succeeds():
+    calls = []
+    assert asyncio.run(llm._attempts("m", flaky(2, calls))) == "m"
+    assert calls == ["m", "m", "m"]
+    assert not llm.breaker("m").is_open
+
+
+def test_open_breaker_fails_fast(monkeypatch):
+    monkeypatch.setattr(llm, "_breakers", {"m": llm.CircuitBreaker(failures=1, reset=60)})
+    calls = []
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(llm._attempts("m", flaky(10, calls)))
+    with pytest.raises(llm.CircuitOpenError):
+        asyncio.run(llm._attempts("m", flaky(10, calls)))
+    assert calls == ["m"]
+    assert llm.breaker_states() == {"m": True}
+
+
+def test_rejected_request_is_not_retried():
+    calls = []
+
+    async def call(model):
+        calls.append(model)
+        raise ValueError("bad request")
+
+    with pytest.raises(ValueError):
+        asyncio.run(llm._attempts("m", call))
+    assert calls == ["m"]
+
+
+# ---------------- FALLBACK ---------------- #
+def test_falls_back_to_the_smaller_model(monkeypatch):
+    monkeypatch.setattr(llm, "FALLBACK_MODELS", {"big": "small"})
+    calls = []
+    assert asyncio.run(llm._resilient("big", flaky(3, calls))) == "small"
+    assert calls == ["big", "big", "big", "small"]
+
+
+def test_no_fallback_model_raises(monkeypatch):
+    monkeypatch.setattr(llm, "FALLBACK_MODELS", {})
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(llm._resilient("big", flaky(3, [])))
+
+
+# ---------------- SINGLE-FLIGHT ---------------- #
+def test_identical_calls_share_one_request():
+    calls = []
+
+    async def factory():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "answer"
+
+    async def run():
+        return await asyncio.gather(*(llm._single_flight("key", factory) for _ in range(5)))
+
+    assert asyncio.run(run()) == ["answer"] * 5
+    assert calls == [1]
+    assert llm._inflight == {}
+
+
+def test_cancelled_waiter_does_not_cancel_the_call():
+    async def factory():
+        await asyncio.sleep(0.05)
+        return "answer"
+
+    async def run():
+        first = asyncio.ensure_future(llm._single_flight("key", factory))
+        second = asyncio.ensure_future(llm._single_flight("key", factory))
+        await asyncio.sleep(0)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(run()) == "answer"
+
+
+# ---------------- OVER HTTP ---------------- #
+def test_chat_falls_back_when_the_model_is_down(monkeypatch):
+    settings = FakeSettings(latency=0.0, jitter=0.0, down_models={"llama-3.3-70b-versatile"})
+    server = ServerThread(make_groq_app(settings)).start()
+    monkeypatch.setenv("GROQ_BASE_URL", server.url)
+    monkeypatch.setenv("GROQ_API_KEY", "test")
+    try:
+        text = asyncio.run(llm.chat_text("llama-3.3-70b-versatile", [{"role": "user", "content": "hi"}]))
+    finally:
+        server.stop()
+    assert text
+    assert settings.models["llama-3.1-8b-instant"] == 1
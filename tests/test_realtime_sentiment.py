@@ -0,0 +1,104 @@
+import asyncio
+import threading
+
+import numpy as np
+
+import realtime_sentiment
+from cache import TTLCache
+from realtime_sentiment import NpySource, Pipeline, RingBuffer
+
+RATE = 16000
+
+
+def speech_file(tmp_path, seconds):
+    t = np.arange(RATE * seconds) / RATE
+    samples = 0.3 * np.sin(2 * np.pi * 220 * t) * (0.55 + 0.45 * np.sin(2 * np.pi * 4 * t))
+    path = tmp_path / "call.npy"
+    np.save(path, samples.astype(np.float32))
+    return str(path)
+
+
+def run(pipeline):
+    return finish(pipeline.start())
+
+
+def finish(pipeline):
+    for t in pipeline._threads:
+        t.join(timeout=10)
+    pipeline.join()
+    return pipeline
+
+
+def test_results_are_reported_in_capture_order(tmp_path):
+    calls = iter(range(100))
+    results = []
+    pipeline = run(Pipeline(
+        NpySource(speech_file(tmp_path, 3), realtime=False),
+        transcribe=lambda audio: f"chunk {next(calls)}",
+        classify=lambda text: ("Positive", "Friendly", ""),
+        on_result=lambda text, sentiment: results.append(text),
+        on_shift=lambda event: None,
+        chunk_seconds=1, workers=2,
+    ))
+    assert results == ["chunk 0", "chunk 1", "chunk 2"]
+    assert pipeline.stats == {"chunks": 3, "silent": 0, "transcribed": 3, "dropped": 0, "overruns": 0}
+    assert pipeline.timeline.state == "Positive"
+
+
+def test_chunks_are_dropped_while_workers_are_busy(tmp_path):
+    release = threading.Event()
+    results = []
+
+    def transcribe(audio):
+        release.wait(5)
+        return "hello"
+
+    pipeline = Pipeline(
+        NpySource(speech_file(tmp_path, 6), realtime=False),
+        transcribe=transcribe, classify=lambda text: ("Neutral", "Polite", ""),
+        on_result=lambda text, sentiment: results.append(text),
+        on_shift=lambda event: None,
+        chunk_seconds=1, workers=1,
+    ).start()
+    pipeline._threads[1].join(timeout=10)  # the segmenter is done once the file is used up
+    release.set()
+    finish(pipeline)
+    # One worker means two chunks in flight; the rest are dropped, not queued
+    assert pipeline.stats["chunks"] == 6
+    assert pipeline.stats["dropped"] == 4
+    assert results == ["hello", "hello"]
+
+
+def test_silent_chunks_are_skipped(tmp_path):
+    path = tmp_path / "silence.npy"
+    np.save(path, np.zeros(RATE * 2, dtype=np.int16))
+    pipeline = run(Pipeline(
+        NpySource(str(path), realtime=False),
+        transcribe=lambda audio: "should not be called",
+        on_result=lambda text, sentiment: None,
+        chunk_seconds=1,
+    ))
+    assert pipeline.stats["silent"] == 2
+    assert pipeline.stats["transcribed"] == 0
+
+
+def test_ring_buffer_wraps():
+    ring = RingBuffer(4)
+    ring.write(np.arange(3, dtype=np.int16))
+    ring.write(np.arange(3, 6, dtype=np.int16))
+    assert ring.read(0, 6).tolist() == [2, 3, 4, 5]
+    assert ring.read(4, 5).tolist() == [4]
+
+
+def test_detect_sentiment_parses_the_api_format(monkeypatch):
+    answer = "Sentiment: Neutral\nTone: Polite\nExplanation: not Positive or Negative; it is Neutral"
+
+    async def chat_text(**kwargs):
+        return answer
+
+    monkeypatch.setattr(realtime_sentiment, "sentiment_cache", TTLCache())
+    monkeypatch.setattr(realtime_sentiment.llm, "chat_text", chat_text)
+    monkeypatch.setattr(realtime_sentiment.llm, "run_sync", asyncio.run)
+    assert realtime_sentiment.detect_sentiment("fine I guess") == (
+        "Neutral", "Polite", "not Positive or Negative; it is Neutral",
+    )
@@ -0,0 +1,86 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import crm
+import recommendations
+from recommendations import Recommender, RecommendationIndex, split_products
+
+
+def crm_frame(rows):
+    return pd.DataFrame(rows, columns=["Product", "Previous Purchases"])
+
+
+def naive_counts(df):
+    """Pair counts from the plain basket self-join, for comparison."""
+    counts = {}
+    for product, previous in zip(df["Product"], df["Previous Purchases"]):
+        basket = set(split_products(product)) | set(split_products(previous))
+        for a in basket:
+            for b in basket - {a}:
+                counts[a, b] = counts.get((a, b), 0) + 1
+    return counts
+
+
+def index_counts(index):
+    return {(a, b): round(score * index.popularity[a]) for a, others in index.neighbours.items()
+            for b, score in others}
+
+
+def test_split_products():
+    assert split_products("Books, Toys,, None, —") == ["Books", "Toys"]
+    assert split_products(None) == []
+
+
+@pytest.mark.parametrize("bitmask_limit", [recommendations.MAX_BITMASK_PRODUCTS, 0])
+def test_counts_match_the_full_self_join(monkeypatch, bitmask_limit):
+    monkeypatch.setattr(recommendations, "MAX_BITMASK_PRODUCTS", bitmask_limit)
+    df = crm.generate_chunk(np.random.default_rng(0), 0, 2000, datetime.date(2025, 1, 1))
+    index = RecommendationIndex.build(df, per_product=100)
+    assert index_counts(index) == naive_counts(df)
+
+
+def test_repeated_purchases_count_once():
+    index = RecommendationIndex.build(crm_frame([
+        ("Books", "Toys, Toys, Books"),
+        ("Books", ""),
+    ]))
+    assert index.popularity == {"Books": 2, "Toys": 1}
+    assert index.neighbours["Toys"] == [("Books", 1.0)]
+    assert index.neighbours["Books"] == [("Toys", 0.5)]
+
+
+def test_owned_products_are_skipped_and_rules_fill_in():
+    index = RecommendationIndex.build(crm_frame([
+        ("Books", "Toys"),
+        ("Books", "Toys, Kitchenware"),
+    ]))
+    names = [r["name"] for r in index.recommend(["Books", "Toys"], k=3)]
+    assert names[0] == "Kitchenware"
+    assert "Books" not in names and "Toys" not in names
+    # Nothing else co-occurs, so the hand-written rules fill the rest
+    assert "Gift Voucher" in names
+
+
+def test_rules_fallback_without_data():
+    names = [r["name"] for r in RecommendationIndex().recommend(["Kitchenware"], k=2)]
+    assert names == ["Cookware Set"]
+
+
+def test_recommendations_are_memoized():
+    index = RecommendationIndex.build(crm_frame([("Books", "Toys")]))
+    first = index.recommend(["Toys", "Books"])
+    second = index.recommend(["Books", "Toys"])
+    assert first == second
+    assert index._recommend.cache_info().hits == 1
+    first[0]["name"] = "changed"
+    assert index.recommend(["Books", "Toys"])[0]["name"] != "changed"
+
+
+def test_recommender_swaps_index_on_rebuild():
+    recommender = Recommender()
+    recommender.rebuild(crm_frame([("Books", "Toys"), ("Books", "Toys")]))
+    names = [r["name"] for r in recommender.for_customer({"Product": "Books", "Previous Purchases": None})]
+    assert names[0] == "Toys"
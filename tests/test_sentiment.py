@@ -0,0 +1,71 @@
+import asyncio
+
+import sentiment
+from cache import TTLCache
+
+
+def test_parse_result():
+    assert sentiment.parse_result("Sentiment: **Positive**\nTone: Polite\nExplanation: thanks") == \
+        ("Positive", "Polite", "thanks")
+    assert sentiment.parse_result("no idea") == ("Neutral", "Neutral", "")
+
+
+def test_parse_batch_result_marks_skipped_items():
+    output = "1. Sentiment: Positive | Tone: Friendly | Explanation: a\n[3] Sentiment: Negative\nTone: Angry"
+    assert sentiment.parse_batch_result(output, 3) == [
+        ("Positive", "Friendly", "a"), None, ("Negative", "Angry", ""),
+    ]
+
+
+def test_split_batches_respects_limits():
+    batches = sentiment.split_batches([f"text {i}" for i in range(5)], max_items=2)
+    assert [len(b) for b in batches] == [2, 2, 1]
+
+
+def fake_batches(monkeypatch, answer):
+    calls = []
+
+    async def classify_batch(texts, model):
+        calls.append(list(texts))
+        return answer(texts, len(calls))
+
+    monkeypatch.setattr(sentiment, "_classify_batch", classify_batch)
+    return calls
+
+
+def test_classify_many_dedupes_and_caches(monkeypatch):
+    calls = fake_batches(monkeypatch, lambda texts, n: [("Positive", "Friendly", "") for _ in texts])
+    cache = TTLCache()
+    results, count = asyncio.run(sentiment.classify_many(["Great!", "  great! ", "", "Thanks"], cache=cache))
+    assert results[0] == results[1] == results[3] == ("Positive", "Friendly", "")
+    assert results[2] == ("Neutral", "Neutral", "")
+    assert calls == [["Great!", "Thanks"]]
+    assert count == 1
+
+    asyncio.run(sentiment.classify_many(["Thanks"], cache=cache))
+    assert len(calls) == 1
+
+
+def test_missing_items_are_retried_together(monkeypatch):
+    def answer(texts, n):
+        if n == 1:
+            return [None, ("Negative", "Upset", ""), None]
+        return [("Neutral", "Polite", "") for _ in texts]
+
+    calls = fake_batches(monkeypatch, answer)
+    results, count = asyncio.run(sentiment.classify_many(["a", "b", "c"]))
+    assert calls == [["a", "b", "c"], ["a", "c"]]
+    assert results == [("Neutral", "Polite", ""), ("Negative", "Upset", ""), ("Neutral", "Polite", "")]
+    assert count == 2
+
+
+def test_items_that_keep_failing_are_none(monkeypatch):
+    def answer(texts, n):
+        raise RuntimeError("model down")
+
+    fake_batches(monkeypatch, answer)
+    cache = TTLCache()
+    results, count = asyncio.run(sentiment.classify_many(["a", "b"], cache=cache))
+    assert results == [None, None]
+    assert count == 2
+    assert len(cache) == 0
@@ -0,0 +1,34 @@
+from sentiment_timeline import SentimentTimeline
+
+
+def test_single_off_chunk_does_not_shift():
+    timeline = SentimentTimeline(alpha=0.4)
+    assert timeline.add("Positive", ts=1) is None
+    assert timeline.add("Sentiment: Negative\nTone: Upset", ts=2) is None
+    assert timeline.state == "Positive"
+
+
+def test_shift_events():
+    timeline = SentimentTimeline(alpha=0.5)
+    timeline.add("Positive", ts=1)
+    events = [timeline.add("negative.", text="too expensive", ts=ts) for ts in (2, 3, 4)]
+    shifts = [e for e in events if e]
+    assert [(e["from"], e["to"]) for e in shifts] == [("Positive", "Neutral"), ("Neutral", "Negative")]
+    assert timeline.state == "Negative"
+    assert timeline.to_dict()["shifts"] == shifts
+
+
+def test_ring_keeps_the_newest_chunks():
+    timeline = SentimentTimeline(size=3)
+    for label in ["Positive", "Negative", "Neutral", "Negative"]:
+        timeline.add(label)
+    points = timeline.points()
+    assert [p["index"] for p in points] == [1, 2, 3]
+    assert [p["sentiment"] for p in points] == ["Negative", "Neutral", "Negative"]
+    assert timeline.majority() == "Negative"
+
+
+def test_thresholds_are_configurable():
+    timeline = SentimentTimeline(alpha=0.5, enter=0.2, exit=0.1)
+    timeline.add("Neutral")
+    assert timeline.add("Positive")["to"] == "Positive"
@@ -0,0 +1,33 @@
+from sessions import SessionStore
+
+
+def test_open_issues_server_ids():
+    store = SessionStore()
+    session = store.open("my-own-id")
+    assert session.id != "my-own-id"
+    assert store.get("my-own-id") is None
+    assert store.open(session.id) is session
+    assert len(store) == 1
+
+
+def test_get_never_creates():
+    store = SessionStore()
+    assert store.get(None) is None
+    assert store.get("unknown") is None
+    assert len(store) == 0
+
+
+def test_idle_sessions_expire():
+    store = SessionStore(ttl=0)
+    session = store.open()
+    assert store.get(session.id) is None
+
+
+def test_transcript_and_sentiment():
+    session = SessionStore().open()
+    session.add_turn("hello")
+    session.add_sentiment("hello", "Negative", "Upset")
+    data = session.to_dict()
+    assert data["transcript"] == "hello"
+    assert data["overall_sentiment"] == "Negative"
+    assert data["customer"] is None
@@ -0,0 +1,88 @@
+import json
+
+import pytest
+
+from sheet_logger import SheetLogger
+
+
+class FakeWorksheet:
+    def __init__(self, fail_times=0):
+        self.fail_times = fail_times
+        self.batches = []
+
+    def append_rows(self, rows):
+        if self.fail_times:
+            self.fail_times -= 1
+            raise RuntimeError("quota exceeded")
+        self.batches.append(list(rows))
+
+
+def make_logger(worksheet, tmp_path, **kwargs):
+    kwargs.setdefault("batch_size", 2)
+    kwargs.setdefault("max_retries", 1)
+    return SheetLogger(worksheet, name="test", backoff=0, spill_path=str(tmp_path / "spill.jsonl"), **kwargs)
+
+
+def test_flush_writes_in_batches(tmp_path):
+    sheet = FakeWorksheet()
+    log = make_logger(sheet, tmp_path)
+    for i in range(5):
+        log.log([i])
+    assert log.flush()
+    assert sheet.batches == [[[0], [1]], [[2], [3]], [[4]]]
+    assert log.stats["written"] == 5
+    assert log.stats["batches"] == 3
+
+
+def test_failed_write_is_retried(tmp_path):
+    sheet = FakeWorksheet(fail_times=1)
+    log = make_logger(sheet, tmp_path)
+    log.log(["a"])
+    assert log.flush()
+    assert sheet.batches == [[["a"]]]
+    assert log.stats["retries"] == 1
+
+
+def test_giving_up_spills_every_unwritten_row(tmp_path):
+    sheet = FakeWorksheet(fail_times=100)
+    log = make_logger(sheet, tmp_path, overflow="spill")
+    for i in range(5):
+        log.log([i])
+    assert not log.flush()
+    assert log.stats["failed"] == 5
+    assert log.stats["spilled"] == 5
+    with open(tmp_path / "spill.jsonl") as f:
+        assert [json.loads(line) for line in f] == [[0], [1], [2], [3], [4]]
+
+
+def test_giving_up_counts_dropped_rows(tmp_path):
+    log = make_logger(FakeWorksheet(fail_times=100), tmp_path)
+    for i in range(5):
+        log.log([i])
+    assert not log.flush()
+    assert log.stats["failed"] == 5
+    assert log.stats["dropped"] == 5
+
+
+def test_spilled_rows_are_replayed_after_a_successful_write(tmp_path):
+    sheet = FakeWorksheet()
+    log = make_logger(sheet, tmp_path, overflow="spill", max_queue=1)
+    log.log(["queued"])
+    log.log(["spilled"])  # queue full
+    assert log.stats["spilled"] == 1
+    assert log.flush()
+    assert [row for batch in sheet.batches for row in batch] == [["queued"], ["spilled"]]
+    assert not (tmp_path / "spill.jsonl").exists()
+
+
+def test_background_thread_flushes_on_close(tmp_path):
+    sheet = FakeWorksheet()
+    log = make_logger(sheet, tmp_path, flush_interval=0.05).start()
+    log.log(["x"])
+    log.close()
+    assert [row for batch in sheet.batches for row in batch] == [["x"]]
+
+
+def test_unknown_overflow_policy():
+    with pytest.raises(ValueError):
+        SheetLogger(FakeWorksheet(), overflow="block")
@@ -0,0 +1,37 @@
+import pytest
+
+import sinks
+
+
+def test_sink_requires_append_rows():
+    class Incomplete(sinks.Sink):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_backend_is_read_when_the_sink_is_built(monkeypatch, tmp_path):
+    monkeypatch.setenv("LOG_DIR", str(tmp_path))
+    monkeypatch.setenv("LOG_BACKEND", "csv")
+    sink = sinks.make_sink("transcripts", "sheet-id", ["a", "b"])
+    assert isinstance(sink, sinks.CSVSink)
+    sink.append_rows([[1, 2]])
+    assert (tmp_path / "transcripts.csv").read_text().splitlines() == ["a,b", "1,2"]
+
+    monkeypatch.setenv("LOG_BACKEND", "none")
+    assert isinstance(sinks.make_sink("transcripts", "sheet-id", ["a", "b"]), sinks.NullSink)
+
+
+def test_sqlite_sink(monkeypatch, tmp_path):
+    monkeypatch.setenv("LOG_DIR", str(tmp_path))
+    sink = sinks.make_sink("responses", "sheet-id", ["a", "b"], backend="sqlite")
+    sink.append_rows([[1, None]])
+    rows = sink._connect().execute('SELECT * FROM "responses"').fetchall()
+    sink.close()
+    assert rows == [("1", None)]
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        sinks.make_sink("x", "sheet-id", [], backend="kafka")
@@ -0,0 +1,93 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+import llm
+import summary
+from cache import TTLCache
+from sentiment import estimate_tokens
+
+
+def turns(start, stop):
+    return "\n".join(f"{'Agent' if i % 2 else 'Customer'}: turn {i}, asking about battery life "
+                     f"and the budget for the field team" for i in range(start, stop))
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    """Stub the model: long notes per chunk (so a reduce round runs), short merged notes."""
+    calls = []
+
+    async def chat_text(model, messages, **kwargs):
+        prompt = messages[-1]["content"]
+        kind = "map" if prompt.startswith(summary.CHUNK_PROMPT.split("{}")[0]) else "reduce"
+        calls.append(kind)
+        if kind == "map":
+            return f"- notes on {len(prompt)} chars\n" + "- detail " * 250
+        return f"- merged {len(prompt)} chars"
+
+    async def chat(model, messages, **kwargs):
+        message = SimpleNamespace(content=" Post-Call Summary \n")
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+    monkeypatch.setattr(summary, "summary_cache", TTLCache())
+    monkeypatch.setattr(llm, "chat_text", chat_text)
+    monkeypatch.setattr(llm, "chat", chat)
+    return calls
+
+
+def test_pack_respects_the_budget():
+    units = ["a" * 39, "b" * 39, "c" * 39, "d" * 200]
+    assert summary.pack(units, 25) == ["a" * 39 + "\n" + "b" * 39, "c" * 39, "d" * 200]
+    assert summary.pack([], 25) == []
+
+
+def test_long_lines_split_on_sentences_then_words():
+    line = "First sentence here. " + "word " * 100
+    chunks = summary.chunk_transcript(line, max_tokens=20)
+    assert chunks[0].startswith("First sentence here.")
+    assert all(estimate_tokens(c) <= 20 for c in chunks)
+    assert " ".join(c.replace("\n", " ") for c in chunks).split() == line.split()
+
+
+def test_chunk_boundaries_stay_stable_as_turns_are_appended():
+    before = summary.chunk_transcript(turns(0, 300))
+    after = summary.chunk_transcript(turns(0, 300) + "\n" + turns(300, 310))
+    assert len(before) > 3
+    assert after[:len(before) - 1] == before[:-1]
+    assert after[len(before) - 1].startswith(before[-1])
+
+
+def test_resummarizing_a_longer_call_only_maps_the_tail(calls):
+    transcript = turns(0, 300)
+    chunks = len(summary.chunk_transcript(transcript))
+    text = asyncio.run(summary.summarize(transcript, "Meera", "Positive"))
+    assert text == "Post-Call Summary"
+    assert calls.count("map") == chunks
+    assert 0 < calls.count("reduce") < chunks
+
+    # Two more turns still fit the last chunk: only it is re-noted, then the one
+    # merge group that contains its notes
+    longer = transcript + "\n" + turns(300, 302)
+    assert len(summary.chunk_transcript(longer)) == chunks
+    calls.clear()
+    asyncio.run(summary.summarize(longer, "Meera", "Positive"))
+    assert calls == ["map", "reduce"]
+
+    # Enough for a new chunk: the last one fills up exactly as it did above, so its
+    # notes are reused and only the new chunk is mapped
+    longest = transcript + "\n" + turns(300, 310)
+    assert summary.chunk_transcript(longest)[:chunks] == summary.chunk_transcript(longer)
+    calls.clear()
+    asyncio.run(summary.summarize(longest, "Meera", "Positive"))
+    assert calls == ["map", "reduce"]
+
+    calls.clear()
+    asyncio.run(summary.summarize(transcript, "Meera", "Positive"))
+    assert calls == []
+
+
+def test_short_transcripts_skip_map_reduce(calls):
+    assert asyncio.run(summary.summarize(turns(0, 3), "Meera", "Neutral")) == "Post-Call Summary"
+    assert calls == []
@@ -0,0 +1,52 @@
+import numpy as np
+
+import vad
+
+RATE = 16000
+
+
+def silence(ms):
+    return np.zeros(RATE * ms // 1000, dtype=np.float32)
+
+
+def tone(ms, level=0.3):
+    t = np.arange(RATE * ms // 1000) / RATE
+    # Amplitude-modulated like syllables, so the clip has its own quiet dips
+    return (level * np.sin(2 * np.pi * 220 * t) * (0.55 + 0.45 * np.sin(2 * np.pi * 4 * t))).astype(np.float32)
+
+
+def test_click_is_not_speech():
+    click = np.concatenate([silence(500), np.full(RATE * 12 // 1000, 0.5, dtype=np.float32), silence(500)])
+    assert vad.speech_mask(click, RATE).any()  # padded for word edges...
+    assert vad.is_silent(click, RATE)  # ...but too short to count
+    assert vad.split_on_pauses(click, RATE) == []
+
+
+def test_stationary_noise_is_not_speech():
+    rng = np.random.default_rng(0)
+    level = 10 ** (-35 / 20)
+    noise = (rng.standard_normal(RATE * 2) * level).astype(np.float32)
+    assert not vad.speech_mask(noise, RATE).any()
+    assert vad.is_silent(noise, RATE)
+
+
+def test_split_on_pauses():
+    audio = np.concatenate([silence(300), tone(600), silence(100), tone(400), silence(900), tone(500), silence(300)])
+    segments = vad.split_on_pauses(audio, RATE)
+    # The 100 ms gap stays inside the first segment, the 900 ms one splits
+    assert len(segments) == 2
+    assert len(segments[0]) > RATE * 1.0
+    assert not vad.is_silent(audio, RATE)
+
+
+def test_compact_shortens_long_pauses():
+    audio = np.concatenate([tone(500), silence(2000), tone(500)])
+    compacted = vad.compact(audio, RATE)
+    assert 0 < len(compacted) < len(audio) - RATE
+
+
+def test_wav_round_trip():
+    audio = vad.to_int16(tone(100))
+    samples, rate = vad.read_wav(vad.to_wav_bytes(audio, RATE))
+    assert rate == RATE
+    assert np.array_equal(samples, audio)
@@ -0,0 +1,183 @@
+"""Energy-based voice activity detection on NumPy audio frames.
+
+Works on mono int16 or float32 samples (like ``temp_audio.npy``). Everything
+is vectorized over fixed-size frames: per-frame RMS in dBFS, an adaptive
+threshold, and a small dilation so word edges and short gaps survive. The
+minimum-speech checks count undilated frames only, so padding can't turn a
+click into speech.
+"""
+import io
+import os
+import wave
+
+import numpy as np
+
+VAD_FRAME_MS = int(os.getenv("VAD_FRAME_MS", "30"))
+# Frames quieter than this are always silence, whatever the noise floor
+VAD_THRESHOLD_DB = float(os.getenv("VAD_THRESHOLD_DB", "-45"))
+VAD_MARGIN_DB = float(os.getenv("VAD_MARGIN_DB", "10"))
+VAD_MIN_SPEECH_MS = int(os.getenv("VAD_MIN_SPEECH_MS", "200"))
+VAD_MIN_PAUSE_MS = int(os.getenv("VAD_MIN_PAUSE_MS", "500"))
+VAD_PAD_MS = int(os.getenv("VAD_PAD_MS", "150"))
+
+
+def to_float32(samples: np.ndarray) -> np.ndarray:
+    """Return mono float32 samples in [-1, 1]."""
+    samples = np.asarray(samples)
+    if samples.ndim > 1:
+        samples = samples.mean(axis=1)
+    if np.issubdtype(samples.dtype, np.integer):
+        return samples.astype(np.float32) / float(np.iinfo(samples.dtype).max + 1)
+    return samples.astype(np.float32, copy=False)
+
+
+def to_int16(samples: np.ndarray) -> np.ndarray:
+    if samples.dtype == np.int16:
+        return samples
+    return (np.clip(to_float32(samples), -1.0, 1.0) * 32767).astype(np.int16)
+
+
+def frame_energy_db(samples: np.ndarray, rate: int, frame_ms: int = VAD_FRAME_MS) -> np.ndarray:
+    """RMS level of each ``frame_ms`` frame in dBFS; a trailing partial frame is zero-padded."""
+    x = to_float32(samples)
+    frame = max(1, rate * frame_ms // 1000)
+    n_frames = -(-len(x) // frame)
+    if n_frames == 0:
+        return np.empty(0, dtype=np.float32)
+    padded = np.zeros(n_frames * frame, dtype=np.float32)
+    padded[:len(x)] = x
+    rms = np.sqrt(np.mean(np.square(padded.reshape(n_frames, frame)), axis=1))
+    return 20 * np.log10(np.maximum(rms, 1e-10))
+
+
+def voiced_mask(samples: np.ndarray, rate: int, frame_ms: int = VAD_FRAME_MS,
+                threshold_db: float = VAD_THRESHOLD_DB, margin_db: float = VAD_MARGIN_DB) -> np.ndarray:
+    """Boolean mask with one entry per frame, True where the frame is louder than the threshold."""
+    energy = frame_energy_db(samples, rate, frame_ms)
+    if energy.size == 0:
+        return np.zeros(0, dtype=bool)
+    # Adaptive threshold: a margin above the noise floor, but never below the absolute
+    # floor. Steady noise sits at its own floor, so none of it clears the margin.
+    noise_floor = np.percentile(energy, 10)
+    threshold = max(threshold_db, noise_floor + margin_db)
+    return energy > threshold
+
+
+def dilate(mask: np.ndarray, pad_frames: int) -> np.ndarray:
+    """Extend every True run by ``pad_frames`` on each side."""
+    if pad_frames <= 0 or not mask.any():
+        return mask
+    kernel = np.ones(2 * pad_frames + 1, dtype=np.int32)
+    return np.convolve(mask.astype(np.int32), kernel, mode="same") > 0
+
+
+def speech_mask(samples: np.ndarray, rate: int, frame_ms: int = VAD_FRAME_MS,
+                threshold_db: float = VAD_THRESHOLD_DB, margin_db: float = VAD_MARGIN_DB,
+                pad_ms: int = VAD_PAD_MS) -> np.ndarray:
+    """Boolean mask with one entry per frame, True where the frame holds speech."""
+    mask = voiced_mask(samples, rate, frame_ms, threshold_db, margin_db)
+    # Dilate by pad_ms on each side to keep soft word onsets/endings
+    return dilate(mask, pad_ms // frame_ms)
+
+
+def _runs(mask: np.ndarray):
+    """(start, end) frame indexes of each run of True values."""
+    edges = np.diff(np.concatenate(([0], mask.astype(np.int8), [0])))
+    return np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+
+
+def is_silent(samples: np.ndarray, rate: int, min_speech_ms: int = VAD_MIN_SPEECH_MS,
+              frame_ms: int = VAD_FRAME_MS) -> bool:
+    """True if there is less than ``min_speech_ms`` of speech in total."""
+    mask = voiced_mask(samples, rate, frame_ms)
+    return int(mask.sum()) * frame_ms < min_speech_ms
+
+
+def trim_silence(samples: np.ndarray, rate: int, frame_ms: int = VAD_FRAME_MS) -> np.ndarray:
+    """Drop leading and trailing silence; returns an empty array if nothing is speech."""
+    mask = speech_mask(samples, rate, frame_ms)
+    voiced = np.flatnonzero(mask)
+    if voiced.size == 0:
+        return samples[:0]
+    frame = rate * frame_ms // 1000
+    return samples[voiced[0] * frame:(voiced[-1] + 1) * frame]
+
+
+def split_on_pauses(samples: np.ndarray, rate: int, min_pause_ms: int = VAD_MIN_PAUSE_MS,
+                    min_speech_ms: int = VAD_MIN_SPEECH_MS, frame_ms: int = VAD_FRAME_MS) -> list:
+    """Split into speech segments separated by pauses of at least ``min_pause_ms``.
+
+    Shorter gaps stay inside a segment; segments with less than
+    ``min_speech_ms`` of voiced (unpadded) frames are dropped as clicks or
+    noise bursts.
+    """
+    voiced = voiced_mask(samples, rate, frame_ms)
+    mask = dilate(voiced, VAD_PAD_MS // frame_ms)
+    starts, ends = _runs(mask)
+    if starts.size == 0:
+        return []
+
+    # Merge runs whose gap is shorter than a real pause
+    min_gap = max(1, min_pause_ms // frame_ms)
+    gaps = starts[1:] - ends[:-1]
+    keep = np.concatenate(([True], gaps >= min_gap))
+    seg_starts = starts[keep]
+    seg_ends = ends[np.concatenate((keep[1:], [True]))]
+
+    frame = rate * frame_ms // 1000
+    min_frames = max(1, min_speech_ms // frame_ms)
+    # Voiced frames per segment, from a running count of the unpadded mask
+    counts = np.concatenate(([0], np.cumsum(voiced)))
+    return [
+        samples[s * frame:e * frame]
+        for s, e in zip(seg_starts, seg_ends)
+        if counts[e] - counts[s] >= min_frames
+    ]
+
+
+def compact(samples: np.ndarray, rate: int, gap_ms: int = 200, **kwargs) -> np.ndarray:
+    """Speech segments joined with a short fixed gap, i.e. long pauses removed."""
+    segments = split_on_pauses(samples, rate, **kwargs)
+    if not segments:
+        return samples[:0]
+    gap = np.zeros(rate * gap_ms // 1000, dtype=samples.dtype)
+    parts = []
+    for segment in segments:
+        if parts:
+            parts.append(gap)
+        parts.append(segment)
+    return np.concatenate(parts)
+
+
+# ---------------- WAV helpers ---------------- #
+def is_wav(data: bytes) -> bool:
+    return len(data) >= 12 and data[:4] == b"RIFF" and data[8:12] == b"WAVE"
+
+
+def read_wav(data: bytes):
+    """Decode PCM WAV bytes into (mono samples, sample rate)."""
+    with wave.open(io.BytesIO(data), "rb") as wf:
+        channels = wf.getnchannels()
+        width = wf.getsampwidth()
+        rate = wf.getframerate()
+        raw = wf.readframes(wf.getnframes())
+    dtype = {1: np.uint8, 2: np.int16, 4: np.int32}.get(width)
+    if dtype is None:
+        raise ValueError(f"Unsupported WAV sample width: {width}")
+    samples = np.frombuffer(raw, dtype=dtype)
+    if dtype == np.uint8:
+        samples = (samples.astype(np.int16) - 128) << 8
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1).astype(samples.dtype)
+    return samples, rate
+
+
+def to_wav_bytes(samples: np.ndarray, rate: int) -> bytes:
+    """Encode samples as 16-bit mono PCM WAV."""
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(rate)
+        wf.writeframes(to_int16(samples).tobytes())
+    return buf.getvalue()